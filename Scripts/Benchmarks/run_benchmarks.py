@@ -0,0 +1,383 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from bs4 import BeautifulSoup
+# Every stage module is imported by its file name from its own directory, as it sees itself when
+# run as a script (like synthetic_corpus from this one). processPDFs imports its own modules
+# from the repository root.
+ROOT = Path(__file__).resolve().parent.parent.parent
+for path in (ROOT, ROOT / "Scripts" / "ProcessPDFs", ROOT / "Scripts" / "CleanlinessMetrics",
+             ROOT / "Scripts" / "ProcessHTMLs"):
+    sys.path.insert(0, str(path))
+from synthetic_corpus import write_corpus
+from preprocessHTMLs import extract_with_soup, strip_unwanted_elements
+from lxml_extraction import extract_with_lxml
+from text_normalization import normalize_body
+from compute_metrics import compute_quality_score
+from processPDFs import PDF_SUPPORT, DocumentCleaner, extract_page_range
+
+# Bump when the stages or the way they are measured change: results of different versions are
+# not comparable
+BENCHMARK_VERSION = 2
+
+# Fewest timed passes per stage: the spread between them is what tells a slowdown from noise
+MIN_REPEAT = 3
+
+STAGES = (
+    "html.strip_unwanted_elements",
+    "html.extract_with_lxml",
+    "html.normalize_body",
+    "metrics.compute_quality_score",
+    "pdf.extract_pages",
+    "pdf.clean_text",
+    "e2e.preprocessHTMLs",
+    "e2e.processPDFs",
+)
+
+
+def megabytes(texts) -> float:
+    return sum(len(text.encode("utf-8")) for text in texts) / 1e6
+
+
+# Parsed page for the strip stage, which only times the pruning of it
+def parse_page(html: str):
+    return BeautifulSoup(html, "html.parser")
+
+
+# Inputs of every in-process stage, each computed from the previous one: the HTML pages, their
+# raw bodies, the normalized bodies, and the PDFs and their extracted text
+class Inputs:
+
+    def __init__(self, html_dir: Path, pdf_dir: Path):
+        self.html_paths = sorted(html_dir.glob("*.html"))
+        self.pdf_paths = sorted(pdf_dir.glob("*.pdf"))
+        self.htmls = [path.read_text(encoding="utf-8") for path in self.html_paths]
+        self.raw_bodies = [extract_with_soup(html)[1] for html in self.htmls]
+        self.bodies = [normalize_body(body) for body in self.raw_bodies]
+        self.pdf_texts = ["\n\n".join(extract_page_range(str(path))) for path in self.pdf_paths] if PDF_SUPPORT else []
+
+    def corpus(self):
+        return {
+            "html_docs": len(self.htmls),
+            "html_mb": round(megabytes(self.htmls), 3),
+            "pdf_docs": len(self.pdf_paths),
+            "pdf_mb": round(sum(path.stat().st_size for path in self.pdf_paths) / 1e6, 3),
+        }
+
+
+# One in-process stage: `run` over every item, wall time of `repeat` passes, then one more
+# pass under tracemalloc for the peak of Python allocations above what was live before it.
+# With `prepare`, every pass runs on fresh prepare(item) values made before it starts (for
+# stages that consume their input), so the preparation is neither timed nor counted.
+def time_stage(run, items, size_mb: float, repeat: int, prepare=None):
+    times = []
+    for _ in range(repeat + 1):
+        inputs = [prepare(item) for item in items] if prepare else items
+        # Garbage of the previous pass (parse trees are cyclic) is not collected in this one
+        gc.collect()
+        if len(times) < repeat:
+            start = time.perf_counter()
+            for item in inputs:
+                run(item)
+            times.append(time.perf_counter() - start)
+            continue
+
+        tracemalloc.start()
+        live = tracemalloc.get_traced_memory()[0]
+        for item in inputs:
+            run(item)
+        peak = tracemalloc.get_traced_memory()[1] - live
+        tracemalloc.stop()
+    return stage_result(len(items), size_mb, times, peak / 1e6)
+
+
+# Throughput of the best pass, and the spread of the passes: how much slower than the best
+# the slowest one was, as a fraction
+def stage_result(docs: int, size_mb: float, times, peak_mb):
+    seconds = min(times)
+    return {
+        "docs": docs,
+        "mb": round(size_mb, 3),
+        "seconds": round(seconds, 4),
+        "docs_per_sec": round(docs / seconds, 2) if seconds else None,
+        "mb_per_sec": round(size_mb / seconds, 3) if seconds else None,
+        "spread": round(max(times) / seconds - 1, 3) if seconds else None,
+        "peak_mb": round(peak_mb, 2) if peak_mb is not None else None,
+    }
+
+
+# Peak resident memory (VmHWM, MB) of a running process, or None where there is no /proc.
+# Unlike the rusage of a child, it starts from zero at exec instead of from the parent's size.
+def high_water_mark(pid: int):
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        return None
+    return None
+
+
+# Wall time and peak RSS (MB) of one script run. The RSS is sampled from another thread until
+# the script exits, so waiting for it (and its wall time) is not delayed by the sampling.
+def run_script(command, cwd: Path, interval: float = 0.01):
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=str(cwd), stdout=subprocess.DEVNULL, stderr=stderr)
+        peaks = []
+        done = threading.Event()
+
+        def sample():
+            while not done.is_set():
+                peak = high_water_mark(process.pid)
+                if peak is not None:
+                    peaks.append(peak)
+                done.wait(interval)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        returncode = process.wait()
+        elapsed = time.perf_counter() - start
+        done.set()
+        sampler.join()
+
+        if returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode("utf-8", "replace")
+            raise RuntimeError(f"{' '.join(command)} exited with status {returncode}:\n{message}")
+    return elapsed, max(peaks) if peaks else None
+
+
+# One end-to-end stage: wall time of `repeat` runs into a fresh output directory, and the
+# highest peak RSS of those runs
+def time_script(command, output_dir: Path, docs: int, size_mb: float, repeat: int):
+    times = []
+    peak = None
+    for _ in range(repeat):
+        shutil.rmtree(output_dir, ignore_errors=True)
+        elapsed, peak_mb = run_script(command, ROOT)
+        times.append(elapsed)
+        if peak_mb is not None:
+            peak = peak_mb if peak is None else max(peak, peak_mb)
+    return stage_result(docs, size_mb, times, peak)
+
+
+# Runs the selected stages over the corpus in `html_dir`/`pdf_dir`; end-to-end runs write into
+# `work_dir`. Stages whose dependency is missing are skipped with a note.
+def run_stages(stages, html_dir: Path, pdf_dir: Path, work_dir: Path, repeat: int, workers: int):
+    print("Preparing stage inputs...")
+    inputs = Inputs(html_dir, pdf_dir)
+    cleaner = DocumentCleaner()
+    html_mb = megabytes(inputs.htmls)
+    corpus = inputs.corpus()
+
+    in_process = {
+        "html.strip_unwanted_elements": (strip_unwanted_elements, inputs.htmls, html_mb),
+        "html.extract_with_lxml": (extract_with_lxml, inputs.htmls, html_mb),
+        "html.normalize_body": (normalize_body, inputs.raw_bodies, megabytes(inputs.raw_bodies)),
+        "metrics.compute_quality_score": (compute_quality_score, inputs.bodies, megabytes(inputs.bodies)),
+        "pdf.extract_pages": (lambda path: extract_page_range(str(path)), inputs.pdf_paths, corpus["pdf_mb"]),
+        "pdf.clean_text": (cleaner.clean_text, inputs.pdf_texts, megabytes(inputs.pdf_texts)),
+    }
+    # strip_unwanted_elements prunes the tree it is given: each pass gets freshly parsed pages
+    prepare = {"html.strip_unwanted_elements": parse_page}
+    scripts = {
+        "e2e.preprocessHTMLs": (
+            [sys.executable, str(ROOT / "Scripts" / "ProcessHTMLs" / "preprocessHTMLs.py"), "-i", str(html_dir),
+             "-o", str(work_dir / "html_output" / "Laws"), "--workers", str(workers)],
+            work_dir / "html_output", corpus["html_docs"], html_mb,
+        ),
+        "e2e.processPDFs": (
+            [sys.executable, "-m", "Scripts.ProcessPDFs.processPDFs", "-i", str(pdf_dir),
+             "-o", str(work_dir / "pdf_output"), "--workers", str(workers)],
+            work_dir / "pdf_output", corpus["pdf_docs"], corpus["pdf_mb"],
+        ),
+    }
+
+    results = {}
+    for name in stages:
+        if name.startswith("pdf.") or name == "e2e.processPDFs":
+            if not PDF_SUPPORT:
+                print(f"  {name}: skipped (pypdfium2 is not installed)")
+                continue
+            if not inputs.pdf_paths:
+                print(f"  {name}: skipped (no PDFs)")
+                continue
+        print(f"  {name}...")
+        if name in scripts:
+            results[name] = time_script(*scripts[name], repeat)
+        else:
+            results[name] = time_stage(*in_process[name], repeat, prepare.get(name))
+    return corpus, results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# Compares each stage with the same stage of a baseline results file: a throughput (docs/sec)
+# more than `threshold` below the baseline, or a peak memory more than `memory_threshold`
+# above it, is a regression. A stage whose passes spread wider than `threshold`, in this run or
+# in the baseline, is only a regression when it is slower by more than that spread: a smaller
+# drop cannot be told from noise. Returns the list of regressions.
+def compare_with_baseline(results, baseline, threshold: float, memory_threshold: float):
+    if baseline.get("benchmark_version") != results["benchmark_version"]:
+        print(f"Warning: baseline is benchmark version {baseline.get('benchmark_version')}, "
+              f"these results are version {results['benchmark_version']}")
+    if baseline.get("corpus") != results["corpus"]:
+        print("Warning: the corpus differs from the baseline's; docs/sec is only comparable on the same corpus")
+
+    regressions = []
+    print(f"\n{'Stage':<32} {'docs/s':>10} {'baseline':>10} {'change':>8} {'allowed':>8} "
+          f"{'peak MB':>9} {'baseline':>9} {'change':>8}")
+    for name, stage in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            print(f"{name:<32} {stage['docs_per_sec']:>10} {'(new)':>10}")
+            continue
+
+        speed = stage["docs_per_sec"] / base["docs_per_sec"] - 1 if base["docs_per_sec"] else 0.0
+        allowed = max(threshold, stage.get("spread") or 0.0, base.get("spread") or 0.0)
+        line = f"{name:<32} {stage['docs_per_sec']:>10} {base['docs_per_sec']:>10} {speed:>+8.1%} {-allowed:>+8.1%}"
+        if speed < -allowed:
+            noise = f" (passes spread {allowed:.1%})" if allowed > threshold else ""
+            regressions.append(f"{name}: {-speed:.1%} slower{noise}")
+
+        if stage["peak_mb"] is not None and base.get("peak_mb"):
+            memory = stage["peak_mb"] / base["peak_mb"] - 1
+            line += f" {stage['peak_mb']:>9} {base['peak_mb']:>9} {memory:>+8.1%}"
+            if memory > memory_threshold:
+                regressions.append(f"{name}: {memory:.1%} more peak memory")
+        print(line)
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'Stage':<32} {'docs':>6} {'MB':>8} {'seconds':>9} {'docs/s':>10} {'MB/s':>8} {'spread':>8} {'peak MB':>9}")
+    for name, stage in results["stages"].items():
+        peak = stage["peak_mb"] if stage["peak_mb"] is not None else "-"
+        print(f"{name:<32} {stage['docs']:>6} {stage['mb']:>8} {stage['seconds']:>9} "
+              f"{stage['docs_per_sec']:>10} {stage['mb_per_sec']:>8} {stage['spread']:>8.1%} {peak:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the HTML and PDF cleaning stages and scripts on a synthetic SUIN-like corpus"
+    )
+    parser.add_argument(
+        "--corpus",
+        help="Existing corpus directory with html/ and pdf/ (e.g. from synthetic_corpus.py or real "
+             "documents); by default a synthetic one is generated in a temporary directory",
+    )
+    parser.add_argument("--html-docs", type=int, default=200, help="Synthetic HTML pages (default: 200)")
+    parser.add_argument("--articles", type=int, default=40, help="Average articles per synthetic HTML page (default: 40)")
+    parser.add_argument("--pdf-docs", type=int, default=10, help="Synthetic PDFs (default: 10)")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per synthetic PDF (default: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus (default: 0)")
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=STAGES,
+        default=list(STAGES),
+        help="Stages to run (default: all)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=MIN_REPEAT,
+        help=f"Timed passes per stage, at least {MIN_REPEAT}; the best is kept and the spread of the "
+             f"passes is reported (default: {MIN_REPEAT})",
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="--workers passed to the end-to-end scripts (default: 1)",
+    )
+    parser.add_argument("--output", "-o", help="Write the results to this JSON file (e.g. to keep as a baseline)")
+    parser.add_argument(
+        "--baseline",
+        help="Results JSON of an earlier run to compare with; exits with status 1 on a regression",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="Largest allowed throughput drop against the baseline, as a fraction (default: 0.15)",
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=0.20,
+        help="Largest allowed peak memory growth against the baseline, as a fraction (default: 0.20)",
+    )
+    args = parser.parse_args()
+    if args.repeat < MIN_REPEAT:
+        parser.error(f"--repeat must be at least {MIN_REPEAT}: fewer passes cannot tell a slowdown from noise")
+
+    with tempfile.TemporaryDirectory(prefix="legal_docs_bench_") as temp_dir:
+        work_dir = Path(temp_dir)
+        if args.corpus:
+            corpus_dir = Path(args.corpus)
+            settings = {"source": str(corpus_dir)}
+        else:
+            corpus_dir = work_dir / "corpus"
+            print(f"Generating {args.html_docs} HTML pages and {args.pdf_docs} PDFs (seed {args.seed})...")
+            write_corpus(corpus_dir, args.html_docs, args.articles, args.pdf_docs, args.pages, args.seed)
+            settings = {"seed": args.seed, "articles": args.articles, "pages": args.pages}
+
+        corpus, stages = run_stages(args.stages, corpus_dir / "html", corpus_dir / "pdf", work_dir,
+                                    args.repeat, args.workers)
+
+    results = {
+        "benchmark_version": BENCHMARK_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "corpus": {**settings, **corpus},
+        "repeat": args.repeat,
+        "workers": args.workers,
+        "stages": stages,
+    }
+    print_results(results)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {output_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+# Example usage: python run_benchmarks.py --output bench/baseline.json
+#                python run_benchmarks.py --baseline bench/baseline.json --threshold 0.1
+if __name__ == "__main__":
+    main()
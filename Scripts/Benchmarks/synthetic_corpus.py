@@ -0,0 +1,239 @@
+import argparse
+import random
+from pathlib import Path
+
+WORDS = (
+    "el la los las de del que por para con sin sobre artículo ley decreto norma presente "
+    "República Colombia Congreso ministerio salud pública pesos moneda legal vigencia "
+    "disposición general transitorio numeral literal inciso entidad territorial régimen "
+    "Bogotá señor presidente secretario Honorable Cámara Senado código civil servicio "
+    "contrato función administración nacional departamento municipio recursos"
+).split()
+
+ORDINALS = ["primero", "segundo", "tercero", "cuarto", "quinto", "1o", "2°", "3", "4º", "10"]
+
+TIPOS = [("LEY", "LEY ORDINARIA", "CONGRESO DE LA REPUBLICA"),
+         ("DECRETO", "DECRETO LEY", "PRESIDENCIA DE LA REPUBLICA"),
+         ("RESOLUCION", "RESOLUCION", "MINISTERIO DE SALUD")]
+
+# Page furniture of Diario Oficial scans and SUIN printouts, as cleaningPatterns expects it
+PDF_NOISE = [
+    "Ir al portal SUIN-Juriscol", "Ayúdanos a mejorar", "Í N D I C E [Mostrar]",
+    "RESUMEN DE MODIFICACIONES [Mostrar]", "ESTADO DE VIGENCIA: Vigente",
+    "https://www.suin-juriscol.gov.co/viewDocument.asp?id=1234567", "Edición de 32 páginas",
+    "12/03/2021, 10:45 a. m.", "-----", "© 2024 SUIN",
+]
+
+SUIN_DISCLAIMER = (
+    "Los datos publicados en SUIN-Juriscol son de carácter informativo. Para su uso debe "
+    "consultarse la publicación oficial.\nMinisterio de Justicia y del Derecho"
+)
+
+
+def sentence(r: random.Random, words: int = None) -> str:
+    chosen = [r.choice(WORDS) for _ in range(words or r.randint(6, 30))]
+    chosen[0] = chosen[0].capitalize()
+    return " ".join(chosen) + r.choice([".", ".", ".", ";", ":"])
+
+
+def escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+# Metadata fields of one synthetic norm, as SUIN publishes them in span[field]
+def document_metadata(r: random.Random):
+    tipo, subtipo, entidad = r.choice(TIPOS)
+    anio = r.randint(1887, 2024)
+    return {
+        "tipo": tipo,
+        "numero": str(r.randint(1, 2500)),
+        "anio": str(anio),
+        "estado_documento": r.choice(["Vigente", "Vigencia en Estudio", "No vigente"]),
+        "entidad_emisora": entidad,
+        "subtipo": subtipo,
+        "fecha_expedicion": f"{r.randint(1, 28):02d}/{r.randint(1, 12):02d}/{anio}",
+        "fecha_diario_oficial": f"{r.randint(1, 28):02d}/{r.randint(1, 12):02d}/{anio}",
+        "documento_fuente": f"DIARIO OFICIAL. AÑO {r.choice(['XL', 'CXXXV'])}. N. {r.randint(1000, 50000)}. PÁG. {r.randint(1, 20)}.",
+    }
+
+
+# Lines of one article as SUIN renders it: a header in one of its spellings (including the
+# spaced-out "A R T I C U L O" of older scans and the number on its own line), a few
+# paragraphs, and sometimes parágrafos, literals or an amount
+def article_lines(r: random.Random, number: int):
+    style = r.randint(0, 5)
+    if style == 0:
+        header = f"A R T I C U L O {number}°. {sentence(r)}"
+    elif style == 1:
+        header = f"ARTICULO\n{number}\n{sentence(r)}"
+    elif style == 2:
+        header = f"ARTÍCULO {number}o. {sentence(r)}"
+    elif style == 3:
+        header = f"Artículo {number}. {sentence(r)}"
+    else:
+        header = f"ARTÍCULO {number}. {sentence(r)}"
+
+    lines = [header]
+    for _ in range(r.randint(1, 4)):
+        lines.append(sentence(r))
+    if r.random() < 0.3:
+        lines.append(f"PARÁGRAFO {r.choice(ORDINALS)}. {sentence(r)}")
+    if r.random() < 0.2:
+        lines.extend(f"{letter})\n{sentence(r)}" for letter in "abc")
+    if r.random() < 0.1:
+        lines.append(f"con\n$\n{r.randint(1, 999)}.{r.randint(100, 999)}")
+    if r.random() < 0.1:
+        lines.append(f"pal\na\nbra {sentence(r)}")
+    return lines
+
+
+# One SUIN-like HTML page with about `articles` articles: boilerplate header/nav/footer, hidden
+# metadata spans, a TOC table, notes and vigencia blocks, hidden paragraphs, chapter headers,
+# "TEXTO CORRESPONDIENTE A" blocks and inline markup inside the articles
+def generate_html(seed: int, articles: int = 40) -> str:
+    r = random.Random(seed)
+    metadata = document_metadata(r)
+    parts = [
+        "<!DOCTYPE html><html><head><title>SUIN-Juriscol</title><style>.toc{display:block}</style>"
+        "<script>var visor = {id: 1};</script></head><body>",
+        "<header>Ir al portal SUIN-Juriscol</header><nav><a href='#'>Inicio</a> | <a href='#'>Normas</a></nav>",
+        "<div style='display: none'>",
+    ]
+    parts.extend(f"<span field='{field}'>{escape(value)}</span>" for field, value in metadata.items())
+    parts.append("</div>")
+
+    toc_rows = "".join(
+        f"<tr><td><a href='#art{i}'>Artículo {i}</a></td></tr>" for i in range(1, min(articles, 30) + 1)
+    )
+    parts.append(f"<div id='toc'><span class='toctoggle'>[Mostrar]</span><table>{toc_rows}</table></div>")
+    parts.append("<div class='slider main'><p>Curso SUIN-Juriscol</p></div>")
+    parts.append(f"<div id='ResumenNotas'>{escape(' '.join(sentence(r) for _ in range(8)))}</div>")
+    parts.append(f"<p>{metadata['tipo']} {metadata['numero']} DE {metadata['anio']}</p>")
+    parts.append(f"<p>Subtipo:</p><p>{metadata['subtipo']}</p><p>{escape(metadata['documento_fuente'])}</p>")
+    parts.append(f"<p>{escape(sentence(r))}</p><p>DECRETA:</p>")
+
+    for number in range(1, articles + 1):
+        if number % 12 == 1:
+            chapter = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X"][(number // 12) % 10]
+            parts.append(f"<p>CAPÍTULO {chapter}</p><p>{escape(sentence(r, 5).upper())}</p>")
+
+        lines = article_lines(r, number)
+        kind = r.randint(0, 9)
+        if kind == 0:
+            parts.append(f"<p style='VISIBILITY: hidden'>{escape(sentence(r))}</p>")
+        elif kind == 1:
+            parts.append(f"<p>TEXTO CORRESPONDIENTE A <b>{escape(sentence(r))}</b></p>")
+        elif kind == 2:
+            parts.append(f"<div class='resumenvigencias'>{escape(sentence(r))}</div>")
+        elif kind == 3:
+            parts.append(f"<span field='nota'>{escape(sentence(r))}</span>")
+
+        body = "".join(f"<p>{escape(line)}</p>" for line in lines)
+        if kind == 4:
+            body = body.replace("</p><p>", "<br/>", 1)
+        elif kind == 5:
+            body = f"<div class='x' style='color:black'><span>{body}</span></div>"
+        elif kind == 6:
+            body = f"<table><tr><td>{body}</td><td>{r.randint(1, 999)}</td></tr></table>"
+        parts.append(f"<a name='art{number}'></a>{body}")
+
+    parts.append(f"<p>{escape(sentence(r))}</p><p>El Presidente de la República,</p><p>FIRMA</p>")
+    parts.append("<footer>Los datos publicados en SUIN-Juriscol son de carácter informativo</footer>")
+    parts.append("<form><input type='text'/></form></body></html>")
+    return "".join(parts)
+
+
+# Page texts of one Diario Oficial-like PDF: a gazette header and page footer on every page,
+# SUIN printout furniture, an index marker and the SUIN disclaimer, around running articles
+def generate_pdf_pages(seed: int, pages: int = 10, lines_per_page: int = 45):
+    r = random.Random(seed)
+    metadata = document_metadata(r)
+    number = 1
+    result = []
+    for page in range(1, pages + 1):
+        lines = [f"DIARIO OFICIAL. AÑO CXXXV. N. {r.randint(1000, 50000)}. PÁG. {page}"]
+        if page == 1:
+            lines.append(f"{metadata['tipo']} {metadata['numero']} DE {metadata['anio']}")
+            lines.append("Í N D I C E [Mostrar]")
+        while len(lines) < lines_per_page:
+            if r.random() < 0.1:
+                lines.append(r.choice(PDF_NOISE))
+            else:
+                lines.extend(article_lines(r, number))
+                number += 1
+        if page == pages:
+            lines.append(SUIN_DISCLAIMER)
+        lines.append(f"Página {page} de {pages}")
+        result.append("\n".join(lines))
+    return result
+
+
+def pdf_string(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+# Minimal PDF with one Helvetica text page per entry of `pages` (WinAnsi encoding, so Spanish
+# accents survive extraction); no dependency beyond the standard library
+def write_pdf(path: Path, pages, lines_per_page: int = 70):
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [" + " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+         + f"] /Count {len(pages)} >>").encode("ascii"),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, text in enumerate(pages):
+        lines = text.split("\n")[:lines_per_page]
+        content = "BT /F1 9 Tf 40 800 Td 11 TL " + " ".join(f"({pdf_string(line)}) '" for line in lines) + " ET"
+        data = content.encode("cp1252", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {5 + 2 * i} 0 R >>".encode("ascii")
+        )
+        objects.append(f"<< /Length {len(data)} >>\nstream\n".encode("ascii") + data + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode("ascii") + obj + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode("ascii")
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    path.write_bytes(bytes(output))
+
+
+# Writes `html_docs` HTML pages of about `articles` articles each to `output_dir/html` and
+# `pdf_docs` PDFs of `pages` pages each to `output_dir/pdf`. The same seed gives the same corpus.
+def write_corpus(output_dir: Path, html_docs: int = 200, articles: int = 40, pdf_docs: int = 10,
+                 pages: int = 20, seed: int = 0):
+    html_dir = output_dir / "html"
+    pdf_dir = output_dir / "pdf"
+    html_dir.mkdir(parents=True, exist_ok=True)
+    pdf_dir.mkdir(parents=True, exist_ok=True)
+
+    r = random.Random(seed)
+    for i in range(html_docs):
+        size = max(1, int(articles * r.uniform(0.5, 1.5)))
+        html = generate_html(seed * 1_000_003 + i, size)
+        (html_dir / f"{100000 + i}.html").write_text(html, encoding="utf-8")
+    for i in range(pdf_docs):
+        write_pdf(pdf_dir / f"gazette_{i:04d}.pdf", generate_pdf_pages(seed * 1_000_003 + i, pages))
+    return html_dir, pdf_dir
+
+
+# Example usage: python synthetic_corpus.py --output bench/corpus --html-docs 500 --articles 60
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic SUIN-like HTML and PDF corpus")
+    parser.add_argument("--output", "-o", required=True, help="Directory to write html/ and pdf/ into")
+    parser.add_argument("--html-docs", type=int, default=200, help="Number of HTML pages (default: 200)")
+    parser.add_argument("--articles", type=int, default=40, help="Average articles per HTML page (default: 40)")
+    parser.add_argument("--pdf-docs", type=int, default=10, help="Number of PDFs (default: 10)")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per PDF (default: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    html_dir, pdf_dir = write_corpus(Path(args.output), args.html_docs, args.articles, args.pdf_docs,
+                                     args.pages, args.seed)
+    print(f"Wrote {args.html_docs} HTML pages to {html_dir} and {args.pdf_docs} PDFs to {pdf_dir}")
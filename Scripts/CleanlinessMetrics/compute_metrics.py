@@ -1,8 +1,69 @@
+import argparse
 import re
+import time
 from typing import Dict
 import sys
 from pathlib import Path
 
+# Version of the scoring rules, reported with every result
+METRICS_VERSION = "V1"
+
+HEADER_PATTERN = (
+    r"^(?:"
+    # ARTICULO 1 / ARTÍCULO 1° / ART. 1
+    r"ART(?:[ÍI]CULO)?\.?\s+"
+    r"(?:\d+(?:\s*[º°o])?|[IVXLCDM]+|"
+    r"primero|segundo|tercero|cuarto|quinto|sexto|"
+    r"s[eé]ptimo|octavo|noveno|d[eé]cimo|"
+    r"und[eé]cimo|duod[eé]cimo)"
+    r"\.?"
+    r"|"
+    # CAPITULO I / CAPÍTULO
+    r"CAP[IÍ]TULO\s+(?:[IVXLCDM]+|[0-9]+|primero|segundo|tercero)"
+    r"|"
+    # PARAGRAFO 1 / PARÁGRAFO primero
+    r"PAR[AÁ]GRAFO(?:\s+"
+    r"(?:\d+|primero|segundo|tercero|cuarto|quinto|"
+    r"sexto|s[eé]ptimo|octavo|noveno|d[eé]cimo)"
+    r")?"
+    r"|"
+    # SECCIÓN I / SECCION
+    r"SECCI[OÓ]N\s+(?:[IVXLCDM]+|[0-9]+)"
+    r"|"
+    # TÍTULO I / TITULO
+    r"T[ÍI]TULO\s+(?:[IVXLCDM]+|[0-9]+)"
+    r"|"
+    # DISPOSICIÓN / DISPOSICIÓN GENERAL
+    r"DISPOSICI[OÓ]N(?:\s+\w+)?"
+    r"|"
+    # TRANSITORIO / TRANSITORIOS
+    r"TRANSITORIO(?:\s+[0-9]+|S)?"
+    r"|"
+    # Listas numéricas 1. 1.1 1)
+    r"\d+(?:\.\d+)*[\.)]"
+    r"|"
+    # Listas alfabéticas a) b) A) B)
+    r"[a-zA-Z]\)"
+    r"|"
+    # Romanas (i) (ii) (I) (II)
+    r"\([ivxlcdmIVXLCDM]+\)"
+    r"|"
+    # INCISO / LITERAL
+    r"(?:INCISO|LITERAL)\s+[a-z]"
+    r"|"
+    # NUMERAL / PUNTO
+    r"(?:NUMERAL|PUNTO)\s+\d+"
+    r")"
+)
+
+HEADER_REGEX = re.compile(HEADER_PATTERN, re.MULTILINE | re.IGNORECASE)
+
+# Words and fragmented words in one scan. A fragment (V1: \b(\w\s){2,}\w\b) is three or more
+# one-character words separated by single whitespace characters; longer words are consumed
+# whole first, so the scan only ever tries a fragment at a one-character word and never
+# backtracks. Only fragments are captured: every other match comes back as the same "".
+WORD_SCAN = re.compile(r"\w{2,}|(\w\s\w\s\w\b(?:\s\w\b)*)|\w")
+
 # Calculates the ratio of lines with 3 or fewer characters
 def short_lines_ratio(text: str) -> float:
     lines = [l for l in text.split("\n") if l.  strip()]
@@ -24,55 +85,7 @@ def fragmented_words_ratio(text: str) -> float:
 # Validates the integrity of legal headers and structured elements
 def header_integrity_ratio(text: str) -> float:
 
-    header_pattern = (
-        r"^(?:"
-        # ARTICULO 1 / ARTÍCULO 1° / ART. 1
-        r"ART(?:[ÍI]CULO)?\.?\s+"
-        r"(?:\d+(?:\s*[º°o])?|[IVXLCDM]+|"
-        r"primero|segundo|tercero|cuarto|quinto|sexto|"
-        r"s[eé]ptimo|octavo|noveno|d[eé]cimo|"
-        r"und[eé]cimo|duod[eé]cimo)"
-        r"\.?"
-        r"|"
-        # CAPITULO I / CAPÍTULO
-        r"CAP[IÍ]TULO\s+(?:[IVXLCDM]+|[0-9]+|primero|segundo|tercero)"
-        r"|"
-        # PARAGRAFO 1 / PARÁGRAFO primero
-        r"PAR[AÁ]GRAFO(?:\s+"
-        r"(?:\d+|primero|segundo|tercero|cuarto|quinto|"
-        r"sexto|s[eé]ptimo|octavo|noveno|d[eé]cimo)"
-        r")?"
-        r"|"
-        # SECCIÓN I / SECCION
-        r"SECCI[OÓ]N\s+(?:[IVXLCDM]+|[0-9]+)"
-        r"|"
-        # TÍTULO I / TITULO
-        r"T[ÍI]TULO\s+(?:[IVXLCDM]+|[0-9]+)"
-        r"|"
-        # DISPOSICIÓN / DISPOSICIÓN GENERAL
-        r"DISPOSICI[OÓ]N(?:\s+\w+)?"
-        r"|"
-        # TRANSITORIO / TRANSITORIOS
-        r"TRANSITORIO(?:\s+[0-9]+|S)?"
-        r"|"
-        # Listas numéricas 1. 1.1 1)
-        r"\d+(?:\.\d+)*[\.)]"
-        r"|"
-        # Listas alfabéticas a) b) A) B)
-        r"[a-zA-Z]\)"
-        r"|"
-        # Romanas (i) (ii) (I) (II)
-        r"\([ivxlcdmIVXLCDM]+\)"
-        r"|"
-        # INCISO / LITERAL
-        r"(?:INCISO|LITERAL)\s+[a-z]"
-        r"|"
-        # NUMERAL / PUNTO
-        r"(?:NUMERAL|PUNTO)\s+\d+"
-        r")"
-    )
-
-    headers = re.findall(header_pattern, text, flags=re.MULTILINE | re.IGNORECASE)
+    headers = re.findall(HEADER_PATTERN, text, flags=re.MULTILINE | re.IGNORECASE)
 
     if not headers:
         return 0.0
@@ -86,6 +99,59 @@ def header_integrity_ratio(text: str) -> float:
     return valid / len(headers)
 
 
+# Non-blank and short lines plus headers and valid headers, in one walk over the line starts:
+# headers can only begin at a line start that is not inside the previous header.
+def count_lines_and_headers(text: str):
+    lines = short = headers = valid = 0
+    header_end = 0
+    match = HEADER_REGEX.match
+    length = len(text)
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end == -1:
+            end = length
+
+        if start >= header_end:
+            header = match(text, start)
+            if header:
+                headers += 1
+                header_end = header.end()
+                if text.find("\n", start, header_end) == -1 and len(header.group().strip()) > 2:
+                    valid += 1
+
+        size = len(text[start:end].strip())
+        if size:
+            lines += 1
+            if size <= 3:
+                short += 1
+
+        if end == length:
+            return lines, short, headers, valid
+        start = end + 1
+
+
+# Words and fragmented words (see WORD_SCAN); a fragment of n words is 2n - 1 characters long.
+def count_words_and_fragments(text: str):
+    matches = WORD_SCAN.findall(text)
+    plain = matches.count("")
+    fragments = len(matches) - plain
+    fragment_words = (sum(map(len, matches)) + fragments) // 2
+    return plain + fragment_words, fragments
+
+
+# The three V1 ratios from two scans and plain counters; identical to short_lines_ratio,
+# fragmented_words_ratio and header_integrity_ratio.
+def compute_ratios(text: str):
+    lines, short, headers, valid = count_lines_and_headers(text)
+    words, fragments = count_words_and_fragments(text)
+    return (
+        short / lines if lines else 0.0,
+        fragments / words if words else 0.0,
+        valid / headers if headers else 0.0,
+    )
+
+
 # Assigns a score based on the ratio of short lines
 def score_lines(ratio: float) -> int:
     if ratio == 0:
@@ -136,11 +202,20 @@ def classify_score(score: int) -> str:
 
 # Computes overall quality score and returns metrics with individual ratios and classification
 def compute_quality_score(text: str) -> Dict:
+    return build_quality_report(*compute_ratios(text))
 
-    line_ratio = short_lines_ratio(text)
-    frag_ratio = fragmented_words_ratio(text)
-    header_ratio = header_integrity_ratio(text)
 
+# Same result from the one-pass-per-metric V1 functions
+def compute_quality_score_reference(text: str) -> Dict:
+    return build_quality_report(
+        short_lines_ratio(text),
+        fragmented_words_ratio(text),
+        header_integrity_ratio(text),
+    )
+
+
+# Combines the three ratios into the weighted score, its classification and the metrics version
+def build_quality_report(line_ratio: float, frag_ratio: float, header_ratio: float) -> Dict:
     total_score = (
         int(score_lines(line_ratio) * 45 / 30) +
         int(score_fragmentation(frag_ratio) * 45 / 30) +
@@ -153,25 +228,113 @@ def compute_quality_score(text: str) -> Dict:
         "header_integrity": round(header_ratio, 4),
         "quality_score": total_score,
         "quality_status": classify_score(total_score),
-        "version": "V1"
+        "version": METRICS_VERSION
     }
 
+# Times the V1 functions against the single-scan counters over a directory of cleaned TXT files
+# (the CONTENIDO section when present, which is what the pipeline scores) and checks that both
+# give the same metrics.
+def benchmark(input_dir: Path, repeat: int = 3):
+    texts = []
+    for file_path in sorted(input_dir.glob("*.txt")):
+        text = file_path.read_text(encoding="utf-8")
+        texts.append(text.split("CONTENIDO:\n", 1)[-1])
+
+    mismatches = sum(1 for text in texts if compute_quality_score(text) != compute_quality_score_reference(text))
+
+    timings = {}
+    for name, score in (("V1 (one pass per metric)", compute_quality_score_reference),
+                        ("Single scan", compute_quality_score)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for text in texts:
+                score(text)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+
+    print(f"Documents: {len(texts)} ({sum(map(len, texts)) / 1e6:.1f}M characters)")
+    print(f"Mismatches: {mismatches}")
+    for name, elapsed in timings.items():
+        print(f"{name}: {elapsed:.3f}s")
+    single = timings["Single scan"]
+    if single:
+        print(f"Speedup: {timings['V1 (one pass per metric)'] / single:.1f}x")
+    return mismatches
+
+
 # Example usage: python compute_metrics.py path/to/document.txt
 if __name__ == "__main__":
 
-    if len(sys.argv) != 2:
-        print("Usage: python compute_metrics.py file.txt")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Quality report for a cleaned legal document or corpus")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        help="Cleaned TXT file to score, or directories of them to score as a corpus",
+    )
+    parser.add_argument(
+        "--report",
+        default="quality_report.csv",
+        help="Corpus mode: per-document CSV report (default: quality_report.csv)",
+    )
+    parser.add_argument(
+        "--parquet",
+        help="Corpus mode: also write the report as Parquet to this path (requires pyarrow)",
+    )
+    parser.add_argument(
+        "--summary",
+        help="Corpus mode: write score histograms and percentiles, overall and per TIPO/ENTIDAD, "
+             "to this JSON file (requires numpy)",
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="Corpus mode: number of worker processes (default: 1, no pool)",
+    )
+    parser.add_argument(
+        "--benchmark",
+        metavar="DIR",
+        help="Time and compare the V1 and single-scan metrics over the TXT files of this directory",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Benchmark rounds; the fastest is reported (default: 3)",
+    )
+    args = parser.parse_args()
 
-    file_path = Path(sys.argv[1])
+    if args.benchmark:
+        sys.exit(1 if benchmark(Path(args.benchmark), args.repeat) else 0)
 
-    if not file_path.exists():
-        print("File not found.")
+    if not args.paths:
+        print("Usage: python compute_metrics.py file.txt | directory [directory ...]")
         sys.exit(1)
 
-    text = file_path.read_text(encoding="utf-8")
+    paths = [Path(path) for path in args.paths]
+    for path in paths:
+        if not path.exists():
+            print("File not found.")
+            sys.exit(1)
+
+    if any(path.is_dir() for path in paths):
+        from corpus_report import report_corpus
+
+        report_corpus(
+            paths,
+            Path(args.report),
+            parquet_path=Path(args.parquet) if args.parquet else None,
+            summary_path=Path(args.summary) if args.summary else None,
+            workers=args.workers,
+        )
+        sys.exit(0)
+
+    text = paths[0].read_text(encoding="utf-8")
     result = compute_quality_score(text)
 
     print("\nQUALITY REPORT")
     for k, v in result.items():
-        print(f"{k}: {v}")
\ No newline at end of file
+        print(f"{k}: {v}")
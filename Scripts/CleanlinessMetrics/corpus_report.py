@@ -0,0 +1,210 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from compute_metrics import compute_quality_score
+
+# Parquet report
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PARQUET_SUPPORT = True
+except ImportError:
+    PARQUET_SUPPORT = False
+
+# Aggregate distributions
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+
+# Header fields of the structured TXT files copied into the report
+HEADER_FIELDS = {
+    "TIPO": "tipo",
+    "NUMERO": "numero",
+    "ANIO": "anio",
+    "ESTADO": "estado",
+    "ENTIDAD": "entidad",
+    "QUALITY_SCORE": "previous_score",
+    "QUALITY_STATUS": "previous_status",
+}
+
+REPORT_FIELDS = (
+    "doc_id", "folder", "tipo", "numero", "anio", "estado", "entidad",
+    "line_ratio", "fragmented_ratio", "header_integrity", "quality_score", "quality_status",
+    "previous_score", "previous_status", "version",
+)
+
+RATIO_FIELDS = ("line_ratio", "fragmented_ratio", "header_integrity")
+STATUSES = ("HIGH", "MEDIUM", "LOW", "DEFECTIVE")
+PERCENTILES = (10, 25, 50, 75, 90)
+GROUP_FIELDS = ("tipo", "entidad")
+
+
+# Splits a structured TXT output into its header fields and the CONTENIDO section, which is
+# the text the pipeline scored. Files without the section are scored whole.
+def parse_structured_text(text: str):
+    header, marker, body = text.partition("CONTENIDO:\n")
+    if not marker:
+        return {}, text
+
+    fields = {}
+    for line in header.splitlines():
+        key, _, value = line.partition(":")
+        if key in HEADER_FIELDS:
+            fields[HEADER_FIELDS[key]] = value.strip()
+    return fields, body
+
+
+# Worker entry point: scores one TXT file and returns its report row
+def score_file(file_path: Path):
+    fields, body = parse_structured_text(file_path.read_text(encoding="utf-8"))
+    metrics = compute_quality_score(body)
+
+    previous_score = fields.get("previous_score", "")
+    row = {field: fields.get(field, "") for field in REPORT_FIELDS}
+    row.update(metrics)
+    row["doc_id"] = file_path.stem
+    row["folder"] = file_path.parent.name
+    row["previous_score"] = int(previous_score) if previous_score.isdigit() else None
+    return row
+
+
+# Scores every TXT file of the input directories, across `workers` processes (in order), and
+# returns the report as columns: one list per REPORT_FIELDS entry.
+def score_corpus(input_dirs, workers: int = 1, chunk_size: int = 64):
+    paths = [file_path for input_dir in input_dirs for file_path in sorted(Path(input_dir).glob("*.txt"))]
+    print(f"Found {len(paths)} TXT files.")
+
+    columns = {field: [] for field in REPORT_FIELDS}
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        rows = executor.map(score_file, paths, chunksize=chunk_size)
+    else:
+        executor = None
+        rows = map(score_file, paths)
+
+    try:
+        for row in rows:
+            for field in REPORT_FIELDS:
+                columns[field].append(row[field])
+    finally:
+        if executor:
+            executor.shutdown()
+    return columns
+
+
+def write_csv(columns, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_FIELDS)
+        writer.writerows(zip(*(columns[field] for field in REPORT_FIELDS)))
+
+
+def write_parquet(columns, path: Path):
+    if not PARQUET_SUPPORT:
+        raise ImportError("pyarrow is not installed. Install it with: pip install pyarrow")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pyarrow.parquet.write_table(pyarrow.table(columns), str(path))
+
+
+# Linear-interpolated percentiles of `values` within each group (np.percentile's default
+# method), for all groups at once: values are sorted by group then value, and each
+# percentile is read at its fractional offset inside the group's slice.
+def grouped_percentiles(values, groups, group_count: int, percentiles=PERCENTILES):
+    sorted_values = values[np.lexsort((values, groups))]
+    counts = np.bincount(groups, minlength=group_count)
+    starts = np.cumsum(counts) - counts
+
+    positions = starts[:, None] + (counts[:, None] - 1) * (np.asarray(percentiles) / 100)[None, :]
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.ceil(positions).astype(np.intp)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (positions - lower)
+
+
+# Score histogram (10-point bins), percentiles of the score and ratios, status counts, and the
+# same per TIPO and per ENTIDAD, with NumPy array operations over the report columns.
+def summarize(columns):
+    if not NUMPY_SUPPORT:
+        raise ImportError("numpy is not installed. Install it with: pip install numpy")
+
+    scores = np.asarray(columns["quality_score"], dtype=float)
+    if not len(scores):
+        return {"documents": 0}
+    statuses = (np.asarray(columns["quality_status"])[:, None] == np.asarray(STATUSES)).argmax(axis=1)
+
+    histogram, edges = np.histogram(scores, bins=np.arange(0, 101, 10))
+    summary = {
+        "documents": len(scores),
+        "score_histogram": {
+            f"{int(low)}-{int(high)}": int(count) for low, high, count in zip(edges[:-1], edges[1:], histogram)
+        },
+        "percentiles": {
+            field: dict(zip(map(str, PERCENTILES), np.percentile(values, PERCENTILES).round(4).tolist()))
+            for field, values in [("quality_score", scores)] + [
+                (field, np.asarray(columns[field], dtype=float)) for field in RATIO_FIELDS
+            ]
+        },
+        "status_counts": dict(zip(STATUSES, np.bincount(statuses, minlength=len(STATUSES)).tolist())),
+    }
+
+    for field in GROUP_FIELDS:
+        names, groups = np.unique(np.asarray(columns[field], dtype=str), return_inverse=True)
+        groups = groups.ravel()
+        counts = np.bincount(groups, minlength=len(names))
+        means = np.bincount(groups, weights=scores, minlength=len(names)) / counts
+        percentiles = grouped_percentiles(scores, groups, len(names))
+        status_counts = np.bincount(
+            groups * len(STATUSES) + statuses, minlength=len(names) * len(STATUSES)
+        ).reshape(len(names), len(STATUSES))
+
+        summary[f"by_{field}"] = {
+            name: {
+                "documents": int(count),
+                "mean_score": round(float(mean), 2),
+                "score_percentiles": dict(zip(map(str, PERCENTILES), group_percentiles.round(2).tolist())),
+                "status_counts": dict(zip(STATUSES, group_status.tolist())),
+            }
+            for name, count, mean, group_percentiles, group_status in zip(
+                names.tolist(), counts, means, percentiles, status_counts
+            )
+        }
+    return summary
+
+
+# Scores a corpus of structured TXT outputs and writes the per-document report (CSV, plus
+# Parquet if requested) and, if requested, the JSON summary of the distributions.
+def report_corpus(input_dirs, report_path: Path, parquet_path: Path = None, summary_path: Path = None,
+                  workers: int = 1):
+    if parquet_path and not PARQUET_SUPPORT:
+        raise ImportError("pyarrow is not installed. Install it with: pip install pyarrow")
+    if summary_path and not NUMPY_SUPPORT:
+        raise ImportError("numpy is not installed. Install it with: pip install numpy")
+
+    columns = score_corpus(input_dirs, workers)
+
+    write_csv(columns, report_path)
+    print(f"Report written to {report_path}")
+    if parquet_path:
+        write_parquet(columns, parquet_path)
+        print(f"Parquet report written to {parquet_path}")
+
+    statuses = columns["quality_status"]
+    changed = sum(
+        1 for score, previous in zip(columns["quality_score"], columns["previous_score"])
+        if previous is not None and score != previous
+    )
+    print("Status counts: " + ", ".join(f"{status} {statuses.count(status)}" for status in STATUSES))
+    print(f"Scores changed since the files were written: {changed}")
+
+    if summary_path:
+        summary = summarize(columns)
+        summary_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"Summary written to {summary_path}")
+        if summary["documents"]:
+            percentiles = summary["percentiles"]["quality_score"]
+            print("Score percentiles: " + ", ".join(f"p{p} {v}" for p, v in percentiles.items()))
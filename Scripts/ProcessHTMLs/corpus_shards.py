@@ -0,0 +1,252 @@
+import argparse
+import gzip
+import io
+import json
+from pathlib import Path
+
+# zstd compression
+try:
+    import zstandard
+    ZSTD_SUPPORT = True
+except ImportError:
+    ZSTD_SUPPORT = False
+
+# Parquet shards
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PARQUET_SUPPORT = True
+except ImportError:
+    PARQUET_SUPPORT = False
+
+INDEX_NAME = "corpus_index.json"
+SHARD_PREFIX = "corpus"
+
+# Every record field and its type: the metadata header, the quality metrics and the body
+RECORD_FIELDS = (
+    ("doc_id", "string"),
+    ("usable", "bool"),
+    ("duplicate_of", "string"),
+    ("tipo", "string"),
+    ("numero", "string"),
+    ("anio", "int32"),
+    ("estado", "string"),
+    ("entidad", "string"),
+    ("subtipo", "string"),
+    ("fecha_expedicion", "string"),
+    ("fecha_publicacion", "string"),
+    ("fuente", "string"),
+    ("quality_score", "int32"),
+    ("quality_status", "string"),
+    ("line_ratio", "float64"),
+    ("fragmented_ratio", "float64"),
+    ("header_integrity", "float64"),
+    ("metrics_version", "string"),
+    ("pipeline_version", "string"),
+    ("content", "string"),
+)
+
+JSONL_SUFFIXES = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+# Arrow type of each RECORD_FIELDS type (all nullable)
+def parquet_schema():
+    types = {"string": pyarrow.string(), "bool": pyarrow.bool_(), "int32": pyarrow.int32(),
+             "float64": pyarrow.float64()}
+    return pyarrow.schema([(name, types[kind]) for name, kind in RECORD_FIELDS])
+
+
+# Rolling JSONL shard: a new file starts once the current one holds `shard_size` bytes on disk
+class JsonlShards:
+
+    def __init__(self, path: Path, compression: str, shard_size: int):
+        if compression == "zstd" and not ZSTD_SUPPORT:
+            raise ImportError("zstandard is not installed. Install it with: pip install zstandard")
+        if compression not in JSONL_SUFFIXES:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.path = path
+        self.compression = compression
+        self.shard_size = shard_size
+        self.shards = []
+        self.raw = None
+        self.writer = None
+
+    def _open(self):
+        name = f"{SHARD_PREFIX}-{len(self.shards):05d}{JSONL_SUFFIXES[self.compression]}"
+        self.raw = open(self.path / name, "wb")
+        if self.compression == "zstd":
+            self.writer = zstandard.ZstdCompressor(level=10).stream_writer(self.raw, closefd=False)
+        elif self.compression == "gzip":
+            self.writer = gzip.GzipFile(fileobj=self.raw, mode="wb", compresslevel=6)
+        else:
+            self.writer = self.raw
+        self.shards.append({"file": name, "format": "jsonl", "records": 0})
+
+    def write(self, record):
+        if self.writer is None:
+            self._open()
+        self.writer.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.shards[-1]["records"] += 1
+        if self.raw.tell() >= self.shard_size:
+            self.close()
+
+    def close(self):
+        if self.writer is None:
+            return
+        if self.writer is not self.raw:
+            self.writer.close()
+        self.raw.close()
+        self.shards[-1]["bytes"] = (self.path / self.shards[-1]["file"]).stat().st_size
+        self.raw = None
+        self.writer = None
+
+
+# Rolling Parquet shard: records are buffered into row groups of `row_group_size` and a new
+# file starts once the current one holds `shard_size` bytes on disk
+class ParquetShards:
+
+    def __init__(self, path: Path, shard_size: int, row_group_size: int = 1024):
+        if not PARQUET_SUPPORT:
+            raise ImportError("pyarrow is not installed. Install it with: pip install pyarrow")
+        self.path = path
+        self.shard_size = shard_size
+        self.row_group_size = row_group_size
+        self.schema = parquet_schema()
+        self.shards = []
+        self.writer = None
+        self.buffer = []
+
+    def write(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        if self.writer is None:
+            name = f"{SHARD_PREFIX}-{len(self.shards):05d}.parquet"
+            self.writer = pyarrow.parquet.ParquetWriter(str(self.path / name), self.schema, compression="zstd")
+            self.shards.append({"file": name, "format": "parquet", "records": 0})
+
+        self.writer.write_table(pyarrow.Table.from_pylist(self.buffer, schema=self.schema))
+        self.shards[-1]["records"] += len(self.buffer)
+        self.buffer = []
+        if (self.path / self.shards[-1]["file"]).stat().st_size >= self.shard_size:
+            self._close_shard()
+
+    def _close_shard(self):
+        self.writer.close()
+        self.shards[-1]["bytes"] = (self.path / self.shards[-1]["file"]).stat().st_size
+        self.writer = None
+
+    def close(self):
+        self._flush()
+        if self.writer is not None:
+            self._close_shard()
+
+
+# Writes corpus records (RECORD_FIELDS) to size-bounded shards of JSONL and/or Parquet in
+# `path`, and on close lists the shards and their record counts in corpus_index.json. Shards
+# of an earlier run in the same directory are replaced.
+class ShardWriter:
+
+    def __init__(self, path: Path, formats=("jsonl",), compression: str = "none",
+                 shard_size: int = 256 * 1024 * 1024, row_group_size: int = 1024):
+        path.mkdir(parents=True, exist_ok=True)
+        for old in path.glob(f"{SHARD_PREFIX}-*"):
+            old.unlink()
+        self.path = path
+        self.outputs = []
+        if "jsonl" in formats:
+            self.outputs.append(JsonlShards(path, compression, shard_size))
+        if "parquet" in formats:
+            self.outputs.append(ParquetShards(path, shard_size, row_group_size))
+        self.records = 0
+
+    def write(self, record):
+        for output in self.outputs:
+            output.write(record)
+        self.records += 1
+
+    def close(self):
+        for output in self.outputs:
+            output.close()
+        index = {
+            "fields": [{"name": name, "type": kind} for name, kind in RECORD_FIELDS],
+            "records": self.records,
+            "shards": [shard for output in self.outputs for shard in output.shards],
+        }
+        with open(self.path / INDEX_NAME, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+
+
+# Shards of a corpus directory in write order, from its index
+def load_index(path: Path):
+    with open(path / INDEX_NAME, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_jsonl(file_path: Path):
+    with open(file_path, "rb") as raw:
+        if file_path.suffix == ".zst":
+            if not ZSTD_SUPPORT:
+                raise ImportError("zstandard is not installed. Install it with: pip install zstandard")
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        elif file_path.suffix == ".gz":
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        else:
+            stream = raw
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            yield json.loads(line)
+
+
+def iter_parquet(file_path: Path, columns=None, batch_size: int = 1024):
+    if not PARQUET_SUPPORT:
+        raise ImportError("pyarrow is not installed. Install it with: pip install pyarrow")
+    parquet_file = pyarrow.parquet.ParquetFile(str(file_path))
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield from batch.to_pylist()
+
+
+# Streams the records of a corpus directory one dict at a time, shard by shard. `format`
+# picks the copy to read when both were written (default: the first one in the index);
+# `columns` limits the fields returned (Parquet only reads those columns).
+def iter_records(path: Path, columns=None, format: str = None):
+    shards = load_index(path)["shards"]
+    if format is None and shards:
+        format = shards[0]["format"]
+
+    for shard in shards:
+        if shard["format"] != format:
+            continue
+        file_path = path / shard["file"]
+        if format == "parquet":
+            yield from iter_parquet(file_path, columns)
+        elif columns:
+            for record in iter_jsonl(file_path):
+                yield {column: record[column] for column in columns}
+        else:
+            yield from iter_jsonl(file_path)
+
+
+# Number of records in a corpus directory, from its index
+def count_records(path: Path) -> int:
+    return load_index(path)["records"]
+
+
+# Example usage: python corpus_shards.py dataCleaned/Laws --columns doc_id tipo quality_score --limit 5
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print records of a sharded corpus as JSON lines")
+    parser.add_argument("path", help="Directory written with --output-format jsonl/parquet")
+    parser.add_argument("--columns", nargs="+", help="Fields to print (default: all)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="Shards to read when both exist")
+    parser.add_argument("--limit", type=int, default=10, help="Records to print (default: 10, 0 for all)")
+    args = parser.parse_args()
+
+    path = Path(args.path)
+    print(f"{count_records(path)} records")
+    for number, record in enumerate(iter_records(path, args.columns, args.format)):
+        if args.limit and number >= args.limit:
+            break
+        print(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,254 @@
+import gzip
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+# zstd compression
+try:
+    import zstandard
+    ZSTD_SUPPORT = True
+except ImportError:
+    ZSTD_SUPPORT = False
+
+SHARD_INDEX_NAME = "shards_index.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    raw_length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_hash ON docs (hash);
+"""
+
+
+# One `{doc_id}.html` file per document: the layout the scraper has always produced.
+class DirectoryStore:
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def put(self, doc_id, html):
+        with open(self.path / f"{doc_id}.html", "w", encoding="utf-8") as f:
+            f.write(html)
+
+    def count(self):
+        return sum(1 for _ in self.path.glob("*.html"))
+
+    def get(self, doc_id):
+        file_path = self.path / f"{doc_id}.html"
+        if not file_path.exists():
+            return None
+        with open(file_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    # Yields (doc_id, html) in directory order, or sorted by key(doc_id) if a key is given
+    def iter_documents(self, key=None):
+        paths = self.path.glob("*.html")
+        if key is not None:
+            paths = sorted(paths, key=lambda file_path: key(file_path.stem))
+        for file_path in paths:
+            with open(file_path, "r", encoding="utf-8") as f:
+                yield file_path.stem, f.read()
+
+    # Yields (doc_id, change key) without reading the files: size and mtime, so an unchanged
+    # key means the content hash does not need to be recomputed.
+    def iter_keys(self):
+        for file_path in self.path.glob("*.html"):
+            stat = file_path.stat()
+            yield file_path.stem, f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def close(self):
+        pass
+
+
+# Content-addressed archive: each distinct page is compressed on its own (a gzip member or a
+# zstd frame) and appended to a rolling shard file; a SQLite index maps doc_id -> content hash
+# -> (shard, offset, length). Identical pages are stored once, and reading the archive back
+# walks every shard front to back instead of opening thousands of small files.
+class ShardStore:
+
+    def __init__(self, path: Path, compression="gzip", shard_size=256 * 1024 * 1024):
+        self.path = path
+        self.shard_size = shard_size
+        self.lock = threading.Lock()
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(path / SHARD_INDEX_NAME), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+        # The compression of an existing archive wins over the requested one
+        row = self.conn.execute("SELECT value FROM settings WHERE key = 'compression'").fetchone()
+        if row:
+            compression = row[0]
+        else:
+            self.conn.execute("INSERT INTO settings (key, value) VALUES ('compression', ?)", (compression,))
+            self.conn.commit()
+
+        if compression == "zstd" and not ZSTD_SUPPORT:
+            raise ImportError("zstandard is not installed. Install it with: pip install zstandard")
+        if compression not in ("gzip", "zstd"):
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.compression = compression
+
+        row = self.conn.execute("SELECT MAX(shard) FROM blobs").fetchone()
+        self.shard = row[0] if row[0] is not None else 0
+        self.writer = None
+
+    # True when the directory holds a shard archive rather than loose HTML files
+    @staticmethod
+    def exists(path: Path):
+        return (path / SHARD_INDEX_NAME).exists()
+
+    def shard_path(self, shard):
+        return self.path / f"shard-{shard:05d}.{'gz' if self.compression == 'gzip' else 'zst'}"
+
+    def compress(self, data):
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def decompress(self, data):
+        if self.compression == "zstd":
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    # Hashing and compression run outside the lock, so download threads only wait on each
+    # other for the index lookups and the append. A page that another thread stores while
+    # this one compresses is not appended twice.
+    def put(self, doc_id, html):
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self.lock:
+            if self._known(digest):
+                self._link(doc_id, digest)
+                return
+
+        blob = self.compress(data)
+
+        with self.lock:
+            if not self._known(digest):
+                writer = self._writer()
+                offset = writer.tell()
+                writer.write(blob)
+                writer.flush()
+                self.conn.execute(
+                    "INSERT INTO blobs (hash, shard, offset, length, raw_length) VALUES (?, ?, ?, ?, ?)",
+                    (digest, self.shard, offset, len(blob), len(data)),
+                )
+            self._link(doc_id, digest)
+
+    def _known(self, digest):
+        return self.conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone() is not None
+
+    # Points doc_id at the blob and commits
+    def _link(self, doc_id, digest):
+        self.conn.execute(
+            "INSERT INTO docs (doc_id, hash) VALUES (?, ?) "
+            "ON CONFLICT(doc_id) DO UPDATE SET hash = excluded.hash",
+            (doc_id, digest),
+        )
+        self.conn.commit()
+
+    # Appends go to the newest shard until it reaches shard_size
+    def _writer(self):
+        if self.writer is None:
+            self.writer = open(self.shard_path(self.shard), "ab")
+        if self.writer.tell() >= self.shard_size:
+            self.writer.close()
+            self.shard += 1
+            self.writer = open(self.shard_path(self.shard), "ab")
+        return self.writer
+
+    def get(self, doc_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT b.shard, b.offset, b.length FROM docs d JOIN blobs b ON b.hash = d.hash "
+                "WHERE d.doc_id = ?",
+                (doc_id,),
+            ).fetchone()
+            if self.writer:
+                self.writer.flush()
+        if row is None:
+            return None
+        shard, offset, length = row
+        with open(self.shard_path(shard), "rb") as f:
+            f.seek(offset)
+            return self.decompress(f.read(length)).decode("utf-8")
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    # Yields (doc_id, html) in shard/offset order, so each shard is read sequentially, or
+    # sorted by key(doc_id) if a key is given (seeking back and forth in the shards).
+    def iter_documents(self, key=None):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT d.doc_id, b.shard, b.offset, b.length FROM docs d JOIN blobs b ON b.hash = d.hash "
+                "ORDER BY b.shard, b.offset, d.doc_id"
+            ).fetchall()
+            if self.writer:
+                self.writer.flush()
+        if key is not None:
+            rows.sort(key=lambda row: key(row[0]))
+
+        current_shard = None
+        f = None
+        cached_offset = None
+        cached_html = None
+        try:
+            for doc_id, shard, offset, length in rows:
+                # Duplicates share a blob: decompress it once
+                if shard == current_shard and offset == cached_offset:
+                    yield doc_id, cached_html
+                    continue
+                if shard != current_shard:
+                    if f:
+                        f.close()
+                    f = open(self.shard_path(shard), "rb")
+                    current_shard = shard
+                f.seek(offset)
+                cached_offset = offset
+                cached_html = self.decompress(f.read(length)).decode("utf-8")
+                yield doc_id, cached_html
+        finally:
+            if f:
+                f.close()
+
+    # Yields (doc_id, change key) from the index alone, in shard order; the key is the content
+    # hash itself.
+    def iter_keys(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT d.doc_id, d.hash FROM docs d JOIN blobs b ON b.hash = d.hash "
+                "ORDER BY b.shard, b.offset, d.doc_id"
+            ).fetchall()
+        yield from rows
+
+    def close(self):
+        with self.lock:
+            if self.writer:
+                self.writer.close()
+                self.writer = None
+            self.conn.close()
+
+
+# Opens whatever the directory contains: a shard archive if it has an index, loose files otherwise.
+# storage="shards" starts a new archive (compressed with `compression`) in a directory that has none.
+def open_html_store(path: Path, storage="files", compression="gzip"):
+    if storage == "shards" or ShardStore.exists(path):
+        return ShardStore(path, compression)
+    return DirectoryStore(path)
@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from email.utils import formatdate
+from pathlib import Path
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    doc_id TEXT PRIMARY KEY,
+    url TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    bytes INTEGER,
+    latency REAL,
+    lastmod TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+
+# Durable crawl state, one row per document: pending, in_flight, done or failed, with the
+# attempt count, last error, size and latency of the last download, and the sitemap lastmod
+# plus ETag/Last-Modified validators used by incremental crawls.
+# The table is the source of truth for resume, so no per-file exists() checks are needed.
+class JobStore:
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def get(self, doc_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE doc_id = ?", (doc_id,)).fetchone()
+        return dict(row) if row else None
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM jobs LIMIT 1").fetchone() is None
+
+    def counts(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    # (url, lastmod) of every failed job, in the order they were recorded
+    def failed_entries(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, lastmod FROM jobs WHERE state = ? ORDER BY rowid", (FAILED,)
+            ).fetchall()
+        return [(row["url"], row["lastmod"]) for row in rows]
+
+    def mark_pending(self, doc_id, url, lastmod=None):
+        self._upsert(doc_id, url=url, lastmod=lastmod, state=PENDING)
+
+    def mark_in_flight(self, doc_id, url):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO jobs (doc_id, url, state, attempts, updated_at) VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET url = excluded.url, state = excluded.state, "
+                "attempts = attempts + 1, updated_at = excluded.updated_at",
+                (doc_id, url, IN_FLIGHT, time.time()),
+            )
+            self.conn.commit()
+
+    # Stores the outcome of a 200 or 304 response; None values keep what was stored before.
+    def mark_done(self, doc_id, url, lastmod, etag, last_modified, size, latency):
+        self._upsert(
+            doc_id,
+            url=url,
+            state=DONE,
+            last_error="",
+            bytes=size,
+            latency=latency,
+            lastmod=lastmod,
+            etag=etag,
+            last_modified=last_modified,
+        )
+
+    def mark_failed(self, doc_id, url, error, latency=None):
+        self._upsert(doc_id, url=url, state=FAILED, last_error=str(error), latency=latency)
+
+    def _upsert(self, doc_id, **fields):
+        fields = {key: value for key, value in fields.items() if value is not None}
+        fields["updated_at"] = time.time()
+        columns = ", ".join(["doc_id", *fields])
+        placeholders = ", ".join("?" * (len(fields) + 1))
+        updates = ", ".join(f"{key} = excluded.{key}" for key in fields)
+        with self.lock:
+            self.conn.execute(
+                f"INSERT INTO jobs ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT(doc_id) DO UPDATE SET {updates}",
+                (doc_id, *fields.values()),
+            )
+            self.conn.commit()
+
+    # One-time bootstrap for download directories created before the job store existed:
+    # a single directory listing marks every HTML file as done, using its mtime as the
+    # Last-Modified validator for incremental crawls.
+    def import_directory(self, save_dir: Path) -> int:
+        rows = []
+        with os.scandir(save_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".html"):
+                    last_modified = formatdate(entry.stat().st_mtime, usegmt=True)
+                    rows.append((entry.name[:-len(".html")], DONE, last_modified, time.time()))
+
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (doc_id, state, last_modified, updated_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.commit()
+        return len(rows)
+
+    # Copies validators from the JSON manifest written by earlier versions of the scraper
+    # onto the rows created by import_directory.
+    def import_manifest(self, manifest_path: Path) -> int:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE jobs SET url = COALESCE(?, url), lastmod = ?, etag = ?, "
+                "last_modified = COALESCE(?, last_modified) WHERE doc_id = ?",
+                [
+                    (
+                        record.get("url"),
+                        record.get("lastmod"),
+                        record.get("etag"),
+                        record.get("last_modified"),
+                        doc_id,
+                    )
+                    for doc_id, record in records.items()
+                ],
+            )
+            self.conn.commit()
+        return len(records)
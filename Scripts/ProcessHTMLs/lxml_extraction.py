@@ -0,0 +1,188 @@
+import argparse
+import re
+import time
+from pathlib import Path
+from lxml import etree
+from lxml import html as lxml_html
+from text_normalization import normalize_body
+from pruning_rules import AUXILIARY_TEXT, METADATA_ATTRIBUTE, PRUNE_RULES, is_metadata_span
+
+# BeautifulSoup's get_text() leaves out the contents of these elements
+NON_TEXT_TAGS = {"script", "style", "template"}
+
+HAS_BODY = re.compile(r"<body[\s>/]", re.IGNORECASE)
+
+
+# Yields the text nodes under `root` in document order, the way BeautifulSoup's get_text()
+# sees them: comments are skipped, tails are separate strings, and dropped elements lose
+# their contents but not their tail.
+def iter_strings(root, dropped):
+    if root.tag not in NON_TEXT_TAGS and root.text:
+        yield root.text
+
+    # Each entry is (children still to visit, tail to emit once they are done)
+    stack = [(iter(root), None)]
+    while stack:
+        children, tail = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if tail:
+                yield tail
+            continue
+
+        if isinstance(child.tag, str) and child not in dropped:
+            if child.text and child.tag not in NON_TEXT_TAGS:
+                yield child.text
+            stack.append((iter(child), child.tail))
+        elif child.tail:
+            yield child.tail
+
+
+# Single depth-first pass over the lxml tree with the rules shared with the BeautifulSoup path
+# (pruning_rules). Returns the normalized metadata fields and the set of dropped elements; the
+# tree itself is not modified. Metadata spans are collected even inside dropped subtrees, which
+# are otherwise not evaluated any further.
+def prune_tree(root):
+    metadata = {}
+    dropped = set()
+
+    def collect_metadata(element):
+        for span in element.iter("span"):
+            field = span.get(METADATA_ATTRIBUTE)
+            if field:
+                text = " ".join(s.strip() for s in iter_strings(span, ()) if s.strip())
+                metadata[field] = normalize_body(text, apply_body_rules=False)
+
+    # Decides keep/drop for an element whose ancestors are all kept; True means descend into it
+    def keep(element):
+        tag = element.tag
+        if (
+            is_metadata_span(tag, element)
+            or PRUNE_RULES.match(tag, element)
+            or (element.text and AUXILIARY_TEXT.search(element.text))
+        ):
+            dropped.add(element)
+            collect_metadata(element)
+            return False
+        return True
+
+    # A comment next to <html> announcing an auxiliary block drops the whole document
+    for sibling in (*root.itersiblings(preceding=True), *root.itersiblings()):
+        if sibling.text and AUXILIARY_TEXT.search(sibling.text):
+            dropped.add(root)
+
+    # Each frame is [children still to visit, parent element, whether the parent is dropped]
+    stack = [[iter(root), root, False]] if keep(root) else []
+    while stack:
+        frame = stack[-1]
+        child = next(frame[0], None)
+        if child is None:
+            stack.pop()
+            continue
+
+        if isinstance(child.tag, str):
+            if frame[2]:
+                collect_metadata(child)
+            elif keep(child):
+                stack.append([iter(child), child, False])
+        elif not frame[2] and child.text and AUXILIARY_TEXT.search(child.text):
+            # Comment text: its parent is the enclosing element
+            dropped.add(frame[1])
+            frame[2] = True
+
+        if not frame[2] and child.tail and AUXILIARY_TEXT.search(child.tail):
+            dropped.add(frame[1])
+            frame[2] = True
+
+    return metadata, dropped
+
+
+# lxml counterpart of the BeautifulSoup extraction in preprocessHTMLs.extract_with_soup.
+# Returns the normalized metadata fields and the raw body text (before normalize_body).
+def extract_with_lxml(html: str):
+    # html.parser keeps a lone "\r" as whitespace while libxml2 turns it into a newline
+    html = html.replace("\r", " ")
+    try:
+        root = lxml_html.document_fromstring(html)
+    except etree.ParserError:
+        return {}, ""
+
+    metadata, dropped = prune_tree(root)
+    if root in dropped:
+        return metadata, ""
+
+    # lxml always creates a <body>; html.parser only has one if the page does
+    body = root.find("body")
+    if body is None or body in dropped or not HAS_BODY.search(html):
+        body = root
+
+    return metadata, "\n".join(iter_strings(body, dropped))
+
+
+# Runs both extraction paths over a sample corpus and reports mismatches and timings.
+def compare_corpus(input_dir: Path, limit: int):
+    from preprocessHTMLs import extract_with_soup
+    from html_store import open_html_store
+
+    html_store = open_html_store(input_dir)
+    total = 0
+    mismatches = 0
+    soup_time = 0.0
+    lxml_time = 0.0
+
+    for doc_id, html in html_store.iter_documents():
+        if limit and total >= limit:
+            break
+        total += 1
+
+        start = time.perf_counter()
+        soup_metadata, soup_body = extract_with_soup(html)
+        soup_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        fast_metadata, fast_body = extract_with_lxml(html)
+        lxml_time += time.perf_counter() - start
+
+        # Raw bodies may differ in whitespace only; compare what the pipeline would write
+        soup_body = normalize_body(soup_body)
+        fast_body = normalize_body(fast_body)
+
+        if soup_metadata != fast_metadata or soup_body != fast_body:
+            mismatches += 1
+            print(f"MISMATCH {doc_id}: metadata={'ok' if soup_metadata == fast_metadata else 'differs'}, "
+                  f"body={'ok' if soup_body == fast_body else 'differs'}")
+
+    html_store.close()
+    print(f"Documents compared: {total}")
+    print(f"Mismatches: {mismatches}")
+    print(f"html.parser extraction: {soup_time:.2f}s")
+    print(f"lxml extraction: {lxml_time:.2f}s")
+    if lxml_time:
+        print(f"Speedup: {soup_time / lxml_time:.1f}x")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that the lxml extraction path matches the html.parser one on a corpus"
+    )
+    parser.add_argument(
+        "--input",
+        "-i",
+        required=True,
+        help="Directory of HTML files or shard archive to compare on",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=0,
+        help="Compare at most this many documents (default: all)",
+    )
+    args = parser.parse_args()
+
+    return 1 if compare_corpus(Path(args.input), args.limit) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
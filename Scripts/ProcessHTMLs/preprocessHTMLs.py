@@ -1,40 +1,77 @@
 import argparse
-import re
+import hashlib
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from bs4 import BeautifulSoup
-from text_normalization import normalize_body
+from bs4 import BeautifulSoup, Tag
+from text_normalization import RULES_VERSION, normalize_body, normalize_body_chunked
+from corpus_shards import ShardWriter
+from html_store import open_html_store
+from lxml_extraction import extract_with_lxml
+from near_duplicates import DUPLICATE_REPORT_NAME, DuplicateIndex, doc_order, get_hasher
+from preprocess_manifest import content_hash, open_manifest
+from structure_index import StructureIndex, open_structure_index
+from pruning_rules import AUXILIARY_TEXT, METADATA_ATTRIBUTE, PRUNE_RULES, is_metadata_span
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from CleanlinessMetrics.compute_metrics import compute_quality_score
+from CleanlinessMetrics.compute_metrics import METRICS_VERSION, compute_quality_score
+from TextRules.rule_engine import RuleProfile, RuleStats
 
+# Bump when extraction or the output format changes; rule and metric changes are picked up
+# from their own versions
+PIPELINE_REVISION = 1
+
+# Single depth-first pass over the soup driven by the shared rules in pruning_rules: every node
+# is kept, dropped, or collected as a metadata span. Metadata is collected even inside dropped
+# subtrees (SUIN hides it in display:none blocks); nothing else under a dropped node is evaluated.
+# Dropped nodes and metadata spans are then removed, and the metadata fields are returned.
 def strip_unwanted_elements(soup):
-    # Remove non-content or boilerplate sections.
-    for tag in soup(["script", "style", "nav", "footer", "header", "form"]):
-        tag.decompose()
-
-    # Remove menus, sliders, TOC, and similar UI blocks.
-    for tag in soup.find_all(["table", "div"], id=re.compile(r"toc|Resumen|NotasDestino", re.IGNORECASE)):
-        tag.decompose()
-    for tag in soup.find_all(["div"], class_=re.compile(r"slider|toc|resumenvigencias", re.IGNORECASE)):
-        tag.decompose()
-
-    # Remove elements that are hidden by inline styles.
-    for tag in soup.find_all(style=True):
-        if not hasattr(tag, "attrs") or tag.attrs is None:
+    metadata = {}
+    dropped = []
+
+    # Each frame is [children still to visit, parent node, whether the parent is dropped]
+    stack = [[iter(soup.contents), soup, False]]
+    while stack:
+        frame = stack[-1]
+        node = next(frame[0], None)
+        if node is None:
+            stack.pop()
             continue
-        style = tag.get("style", "").replace(" ", "").lower()
-        if "display:none" in style or "visibility:hidden" in style:
-            tag.decompose()
 
-    # Remove UI toggles and boilerplate labels.
-    for tag in soup.find_all(class_=re.compile(r"toctoggle|toc-link", re.IGNORECASE)):
-        tag.decompose()
+        if isinstance(node, Tag):
+            attrs = node.attrs
+            if is_metadata_span(node.name, attrs):
+                field = attrs.get(METADATA_ATTRIBUTE)
+                if field:
+                    metadata[field] = normalize_body(node.get_text(" ", strip=True), apply_body_rules=False)
+                if not frame[2]:
+                    dropped.append(node)
+                node_dropped = True
+            elif frame[2]:
+                node_dropped = True
+            elif PRUNE_RULES.match(node.name, attrs):
+                dropped.append(node)
+                node_dropped = True
+            else:
+                node_dropped = False
+
+            # Dropped subtrees are only walked to find the metadata spans inside them
+            if node.contents:
+                stack.append([iter(node.contents), node, node_dropped])
+
+        elif not frame[2] and AUXILIARY_TEXT.search(node):
+            # Remove paragraphs or spans that only announce auxiliary text blocks
+            dropped.append(frame[1])
+            frame[2] = True
+
+    for node in dropped:
+        if node is soup:
+            soup.clear()
+        else:
+            node.extract()
 
-    # Remove paragraphs or spans that only announce auxiliary text blocks.
-    for text_node in soup.find_all(string=re.compile(r"TEXTO\s+CORRESPONDIENTE\s+A", re.IGNORECASE)):
-        parent = text_node.parent
-        if parent:
-            parent.decompose()
+    return metadata
 
 # Removes metadata lines from the body text based on the extracted metadata values.
 def remove_metadata_lines(body: str, source: str, subtipo: str) -> str:
@@ -65,86 +102,386 @@ def remove_metadata_lines(body: str, source: str, subtipo: str) -> str:
 
     return "\n".join(cleaned)
 
+# BeautifulSoup extraction: returns the normalized metadata fields and the raw body text.
+def extract_with_soup(html: str):
+    soup = BeautifulSoup(html, "html.parser")
+    metadata = strip_unwanted_elements(soup)
+
+    # Extract main text
+    body_node = soup.body if soup.body else soup
+    body = body_node.get_text(separator="\n")
+
+    # The tree is full of parent/child reference cycles: free it now rather than at the next
+    # garbage collection, while the body is being normalized
+    soup.decompose()
+    return metadata, body
+
+
+# Header lines of the structured TXT output: label, record field and metadata key
+HEADER_FIELDS = (
+    ("TIPO", "tipo", "tipo"),
+    ("NUMERO", "numero", "numero"),
+    ("ANIO", "anio", "anio"),
+    ("ESTADO", "estado", "estado_documento"),
+    ("ENTIDAD", "entidad", "entidad_emisora"),
+    ("SUBTIPO", "subtipo", "subtipo"),
+    ("FECHA_EXPEDICION", "fecha_expedicion", "fecha_expedicion"),
+    ("FECHA_PUBLICACION", "fecha_publicacion", "fecha_diario_oficial"),
+    ("FUENTE", "fuente", "documento_fuente"),
+)
+
+
+# Parses, cleans and scores one HTML document; returns its header fields (by record field), the
+# cleaned body and its quality metrics.
+# `parser` selects the extraction path: "html.parser" (BeautifulSoup) or "lxml" (faster, same output
+# on well-formed pages). `stats` (a RuleStats) and `profile` (a RuleProfile) collect normalization
+# rule counters and timings when given. Bodies longer than a non-zero `chunk_size` are
+# normalized in chunks of about that many characters (same output, bounded working memory).
+def extract_document(html: str, parser: str = "html.parser", stats: RuleStats = None,
+                     profile: RuleProfile = None, chunk_size: int = 0):
+    if parser == "lxml":
+        metadata, body = extract_with_lxml(html)
+    else:
+        metadata, body = extract_with_soup(html)
+
+    if chunk_size:
+        body = normalize_body_chunked(body, chunk_size, stats, profile)
+    else:
+        body = normalize_body(body, stats=stats, profile=profile)
+    body = remove_metadata_lines(
+        body,
+        metadata.get("documento_fuente", ""),
+        metadata.get("subtipo", ""),
+    )
+    
+    # Calcula score de calidad
+    metrics = compute_quality_score(body)
+
+    fields = {field: metadata.get(key, "") for _, field, key in HEADER_FIELDS}
+    return fields, body, metrics
+
+
+# Build final structured text: the header lines, the score and status, then CONTENIDO
+def format_document(fields, body: str, metrics) -> str:
+    final_text = ""
+    for label, field, _ in HEADER_FIELDS:
+        final_text += f"{label}: {fields[field]}\n"
+    final_text += f"QUALITY_SCORE: {metrics['quality_score']}\n"
+    final_text += f"QUALITY_STATUS: {metrics['quality_status']}\n"
+    
+    final_text += "CONTENIDO:\n"
+    final_text += body
+    return final_text
+
+
+# Header fields (by record field) and body of a structured TXT output written by format_document
+def parse_document(text: str):
+    header, body = text.split("CONTENIDO:\n", 1)
+    values = dict(line.split(": ", 1) for line in header.splitlines() if ": " in line)
+    fields = {field: values.get(label, "") for label, field, _ in HEADER_FIELDS}
+    return fields, body
+
+
+# Parses, cleans and scores one HTML document; returns the structured text and its quality metrics
+# (see extract_document for the arguments).
+def process_document(html: str, parser: str = "html.parser", stats: RuleStats = None,
+                     profile: RuleProfile = None, chunk_size: int = 0):
+    fields, body, metrics = extract_document(html, parser, stats, profile, chunk_size)
+    return format_document(fields, body, metrics), metrics
+
+
+# extract_document plus, with a non-zero `num_perm`, the MinHash signature of the body
+# (see near_duplicates); the signature is None otherwise
+def extract_with_signature(html: str, parser: str = "html.parser", stats: RuleStats = None,
+                           profile: RuleProfile = None, chunk_size: int = 0, num_perm: int = 0):
+    fields, body, metrics = extract_document(html, parser, stats, profile, chunk_size)
+    signature = get_hasher(num_perm).signature(body) if num_perm else None
+    return fields, body, metrics, signature
+
+
+# Corpus shard record of one document (corpus_shards.RECORD_FIELDS), with typed year and metrics
+def build_record(doc_id, fields, body: str, metrics, version: str, duplicate_of=None):
+    record = {"doc_id": doc_id, "usable": metrics["quality_score"] >= 70, "duplicate_of": duplicate_of}
+    record.update(fields)
+    record["anio"] = int(fields["anio"]) if fields["anio"].isdigit() else None
+    for field in ("quality_score", "quality_status", "line_ratio", "fragmented_ratio", "header_integrity"):
+        record[field] = metrics[field]
+    record["metrics_version"] = metrics["version"]
+    record["pipeline_version"] = version
+    record["content"] = body
+    return record
+
+
+# Version of everything that shapes an output: outputs recorded under another version are
+# regenerated by incremental runs.
+def pipeline_version(parser: str = "html.parser") -> str:
+    key = f"{PIPELINE_REVISION}|{parser}|{RULES_VERSION}|{METRICS_VERSION}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+# Yields the (doc_id, html) pairs an incremental run has to process: new inputs, inputs whose
+# content hash changed, and inputs last processed by another pipeline version or whose output
+# is missing. Unchanged change keys skip reading the input at all. Fills `pending` with the
+# (change key, content hash) of every yielded document and `seen` with every input doc_id.
+def iter_changed_documents(html_store, manifest, entries, version, pending, seen):
+    for doc_id, source_key in html_store.iter_keys():
+        seen.add(doc_id)
+        entry = entries.get(doc_id)
+        if entry is not None and entry["source_key"] == source_key:
+            if manifest.is_current(entry, entry["content_hash"], version):
+                continue
+
+        html = html_store.get(doc_id)
+        if html is None:
+            continue
+        digest = content_hash(html)
+        if manifest.is_current(entry, digest, version):
+            manifest.update_source_key(doc_id, source_key)
+            continue
+
+        pending[doc_id] = (source_key, digest)
+        yield doc_id, html
+
+
+# Passes every document through, recording its content hash in `pending`. Change keys are left
+# empty: the next incremental run hashes each input once to fill them in.
+def iter_hashed_documents(documents, pending):
+    for doc_id, html in documents:
+        pending[doc_id] = ("", content_hash(html))
+        yield doc_id, html
+
+
+# Brings the structure index in line with the manifest, i.e. with the TXT outputs on disk: rows
+# of documents the manifest no longer lists, or whose output moved or is gone, are dropped, and
+# current outputs that are not indexed (written before the index existed, or skipped as
+# unchanged by an incremental run) are indexed from their TXT. Returns (indexed, removed).
+def sync_structure_index(structures, manifest):
+    entries = manifest.load()
+    indexed = structures.indexed()
+    removed = 0
+    for doc_id, output_path in indexed.items():
+        entry = entries.get(doc_id)
+        if entry is None or entry["output_path"] != output_path or not manifest.output_path(entry).exists():
+            structures.remove(doc_id)
+            removed += 1
+
+    added = 0
+    for doc_id, entry in entries.items():
+        output_path = manifest.output_path(entry)
+        if indexed.get(doc_id) == entry["output_path"] or not output_path.exists():
+            continue
+        text = output_path.read_text(encoding="utf-8")
+        fields, body = parse_document(text)
+        structures.record(doc_id, fields, output_path, text, body)
+        added += 1
+    return added, removed
+
+
+# Worker entry point: processes a chunk of (doc_id, html) pairs in one task to amortize IPC.
+# Returns the results and, if requested, the rule counters and profile of the chunk.
+def process_chunk(chunk, parser="html.parser", collect_stats=False, profile_rules=False, chunk_size=0,
+                  num_perm=0):
+    stats = RuleStats() if collect_stats else None
+    profile = RuleProfile() if profile_rules else None
+    results = [
+        (doc_id, *extract_with_signature(html, parser, stats, profile, chunk_size, num_perm))
+        for doc_id, html in chunk
+    ]
+    return results, stats, profile
+
+
+# Spreads documents over a process pool in chunks of `chunk_size`, keeping at most two chunks per
+# worker in flight so memory stays bounded. Results are yielded in input order, which keeps the
+# output and the log identical to the serial path. Worker rule counters and profiles are merged
+# into `stats` and `profile`.
+def iter_processed_parallel(documents, workers: int, chunk_size: int, parser: str = "html.parser",
+                            stats: RuleStats = None, profile: RuleProfile = None, text_chunk_size: int = 0,
+                            num_perm: int = 0):
+    def collect(future):
+        results, chunk_stats, chunk_profile = future.result()
+        if stats is not None:
+            stats.merge(chunk_stats)
+        if profile is not None:
+            profile.merge(chunk_profile)
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        chunks = iter(lambda: list(islice(documents, chunk_size)), [])
+
+        for chunk in chunks:
+            in_flight.append(executor.submit(
+                process_chunk, chunk, parser, stats is not None, profile is not None, text_chunk_size, num_perm
+            ))
+            if len(in_flight) >= workers * 2:
+                yield from collect(in_flight.popleft())
+
+        while in_flight:
+            yield from collect(in_flight.popleft())
+
+
 # Main function to process all HTML files in the input directory and save cleaned TXT files in the output directory.
-def process_directory(input_dir: Path, output_dir: Path):
+# The input may be a directory of HTML files or a shard archive written by the scraper.
+# Every run records its TXT outputs in a manifest in the output directory; with `incremental`, only
+# new or changed inputs are processed (everything when the pipeline version changed) and the
+# outputs of inputs that disappeared are deleted.
+# `formats` picks the outputs: "txt" (one file per document, usable and unusable in separate
+# directories) and/or "jsonl"/"parquet" (every document as a record of rolling shards of about
+# `shard_size` bytes in the output directory, see corpus_shards; JSONL optionally compressed).
+# With `structure_index` (or when the output directory already has one), the byte offsets of the
+# articles, parágrafos and other units of every TXT output are recorded next to it (see
+# structure_index); at the end of the run the index is synced with the manifest, so outputs
+# skipped by an incremental run or written before the index existed are indexed too.
+# With `dedup`, every body is MinHashed and checked against the earlier documents of the run
+# (near_duplicates), in doc_id order: a document whose estimated similarity to one of them reaches
+# `dedup_threshold` is flagged as its duplicate, the clusters are written to
+# duplicate_clusters.json in the output directory, and with `route_duplicates` the TXT of a
+# duplicate goes to duplicate_files/ instead of the usable/unusable directories.
+def process_directory(input_dir: Path, output_dir: Path, workers: int = 1, chunk_size: int = 8,
+                      parser: str = "html.parser", rule_stats: bool = False, profile_path: Path = None,
+                      incremental: bool = False, text_chunk_size: int = 0, formats=("txt",),
+                      shard_compression: str = "none", shard_size: int = 256 * 1024 * 1024,
+                      structure_index: bool = False, dedup: bool = False, dedup_threshold: float = 0.8,
+                      route_duplicates: bool = False, num_perm: int = 128):
+    if incremental and set(formats) != {"txt"}:
+        raise ValueError("Incremental runs only support the txt output format")
+    if incremental and dedup:
+        raise ValueError("Duplicate detection compares the whole corpus; it cannot run incrementally")
+    if structure_index and "txt" not in formats:
+        raise ValueError("The structure index points into TXT outputs; add the txt output format")
+    write_txt = "txt" in formats
+    shard_formats = [output_format for output_format in formats if output_format != "txt"]
+
     output_dir.mkdir(parents=True, exist_ok=True)
     unusable_dir = output_dir.parent / "unusable_files"
-    unusable_dir.mkdir(parents=True, exist_ok=True)
-
-    
-    html_files = list(input_dir.glob("*.html"))
-    print(f"Found {len(html_files)} HTML files.\n")
+    duplicate_dir = output_dir.parent / "duplicate_files"
+    if write_txt:
+        unusable_dir.mkdir(parents=True, exist_ok=True)
+        if route_duplicates:
+            duplicate_dir.mkdir(parents=True, exist_ok=True)
+    shards = ShardWriter(output_dir, shard_formats, shard_compression, shard_size) if shard_formats else None
+    structures = None
+    if write_txt and (structure_index or StructureIndex.exists(output_dir)):
+        structures = open_structure_index(output_dir)
+
+    html_store = open_html_store(input_dir)
+    total = html_store.count()
+    print(f"Found {total} HTML files.\n")
     
     usable_count = 0
     unusable_count = 0
-
-    for file_path in html_files:
-        with open(file_path, "r", encoding="utf-8") as f:
-            soup = BeautifulSoup(f, "html.parser")
-
-        # Extract metadata before removing hidden spans
-        metadata = {}
-        for span in soup.find_all("span", attrs={"field": True}):
-            field = span.get("field")
-            if field:
-                metadata[field] = normalize_body(span.get_text(" ", strip=True), apply_body_rules=False)
-
-        strip_unwanted_elements(soup)
-
-        # Remove metadata spans from content extraction
-        for span in soup.find_all("span", attrs={"field": True}):
-            span.decompose()
-
-        # Extract main text
-        body_node = soup.body if soup.body else soup
-        body = body_node.get_text(separator="\n")
-        body = normalize_body(body)
-        body = remove_metadata_lines(
-            body,
-            metadata.get("documento_fuente", ""),
-            metadata.get("subtipo", ""),
+    duplicate_count = 0
+    duplicates = DuplicateIndex(num_perm, dedup_threshold) if dedup else None
+    signature_perms = num_perm if dedup else 0
+
+    stats = RuleStats() if rule_stats else None
+    profile = RuleProfile() if profile_path else None
+
+    version = pipeline_version(parser)
+    manifest = open_manifest(output_dir)
+    entries = manifest.load()
+    pending = {}
+    seen = set()
+    if incremental:
+        documents = iter_changed_documents(html_store, manifest, entries, version, pending, seen)
+    else:
+        # Duplicate clusters depend on the processing order: go by doc_id, not by store order
+        documents = iter_hashed_documents(html_store.iter_documents(doc_order if dedup else None), pending)
+    if workers > 1:
+        results = iter_processed_parallel(
+            documents, workers, chunk_size, parser, stats, profile, text_chunk_size, signature_perms
+        )
+    else:
+        results = (
+            (doc_id, *extract_with_signature(html, parser, stats, profile, text_chunk_size, signature_perms))
+            for doc_id, html in documents
         )
-        
-        # Calcula score de calidad
-        metrics = compute_quality_score(body)
-
-        # Build final structured text
-        final_text = ""
-
-        final_text += "TIPO: " + metadata.get("tipo", "") + "\n"
-        final_text += "NUMERO: " + metadata.get("numero", "") + "\n"
-        final_text += "ANIO: " + metadata.get("anio", "") + "\n"
-        final_text += "ESTADO: " + metadata.get("estado_documento", "") + "\n"
-        final_text += "ENTIDAD: " + metadata.get("entidad_emisora", "") + "\n"
-        final_text += "SUBTIPO: " + metadata.get("subtipo", "") + "\n"
-        final_text += "FECHA_EXPEDICION: " + metadata.get("fecha_expedicion", "") + "\n"
-        final_text += "FECHA_PUBLICACION: " + metadata.get("fecha_diario_oficial", "") + "\n"
-        final_text += "FUENTE: " + metadata.get("documento_fuente", "") + "\n"
-        final_text += f"QUALITY_SCORE: {metrics['quality_score']}\n"
-        final_text += f"QUALITY_STATUS: {metrics['quality_status']}\n"
-        
-        final_text += "CONTENIDO:\n"
-        final_text += body
+
+    for doc_id, fields, body, metrics, signature in results:
+        duplicate_of = None
+        if duplicates is not None:
+            found = duplicates.add(doc_id, signature)
+            if found is not None:
+                duplicate_of = found[0]
 
         # Determine output directory based on quality score
-        if metrics['quality_score'] < 70:
-            output_path = unusable_dir / file_path.with_suffix(".txt").name
+        if duplicate_of is not None and route_duplicates:
+            output_path = duplicate_dir / f"{doc_id}.txt"
+            duplicate_count += 1
+            status_msg = f"[DUPLICATE of {duplicate_of} - Score: {metrics['quality_score']}]"
+        elif metrics['quality_score'] < 70:
+            output_path = unusable_dir / f"{doc_id}.txt"
             unusable_count += 1
             status_msg = f"[UNUSABLE - Score: {metrics['quality_score']}]"
         else:
-            output_path = output_dir / file_path.with_suffix(".txt").name
+            output_path = output_dir / f"{doc_id}.txt"
             usable_count += 1
             status_msg = f"[USABLE - Score: {metrics['quality_score']}]"
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(final_text)
-
-        print(f"Processed {file_path.name} {status_msg}")
+        if duplicate_of is not None and not route_duplicates:
+            status_msg += f" [near-duplicate of {duplicate_of}]"
+
+        source_key, digest = pending.pop(doc_id)
+        if shards is not None:
+            shards.write(build_record(doc_id, fields, body, metrics, version, duplicate_of))
+
+        if write_txt:
+            final_text = format_document(fields, body, metrics)
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(final_text)
+            if structures is not None:
+                structures.record(doc_id, fields, output_path, final_text, body)
+
+            # An output that moved between the usable and unusable directories leaves a stale copy
+            entry = entries.get(doc_id)
+            if entry is not None and manifest.output_path(entry) != output_path:
+                manifest.output_path(entry).unlink(missing_ok=True)
+
+            manifest.record(doc_id, source_key, digest, version, output_path, metrics)
+
+        print(f"Processed {doc_id}.html {status_msg}")
+
+    if shards is not None:
+        shards.close()
+        print(f"Wrote {shards.records} records to {', '.join(shard_formats)} shards in {output_dir}")
+
+    removed_count = 0
+    if incremental:
+        for doc_id, entry in entries.items():
+            if doc_id not in seen:
+                manifest.output_path(entry).unlink(missing_ok=True)
+                manifest.remove(doc_id)
+                removed_count += 1
+
+    if structures is not None:
+        added, dropped = sync_structure_index(structures, manifest)
+        if added or dropped:
+            print(f"Structure index: {added} existing outputs indexed, {dropped} stale entries removed")
 
     print(f"Processing complete:")
     print(f"- Usable files (score >= 70): {usable_count}")
     print(f"- Unusable files (score < 70): {unusable_count}")
-    print(f"Total files processed: {len(html_files)}")
+    if duplicates is not None:
+        report_path = output_dir / DUPLICATE_REPORT_NAME
+        duplicates.write_report(report_path)
+        if route_duplicates:
+            print(f"- Near-duplicates (moved to duplicate_files): {duplicate_count}")
+        else:
+            print(f"- Near-duplicates (flagged): {duplicates.duplicate_count()}")
+        print(f"- Duplicate clusters: {len(duplicates.clusters)} (report: {report_path})")
+    if incremental:
+        print(f"- Unchanged files skipped: {len(seen) - usable_count - unusable_count}")
+        print(f"- Outputs removed (input deleted): {removed_count}")
+    print(f"Total files processed: {total}")
+    if stats is not None:
+        print("\nNormalization rules (documents skipped / applied / changed):")
+        print(stats.summary())
+    if profile is not None:
+        profile.write(profile_path)
+        print(f"\nNormalization rule profile written to {profile_path}")
+    manifest.close()
+    if structures is not None:
+        structures.close()
+    html_store.close()
 
 # Entry point for command-line execution, allowing specification of input and output directories.
 def main():
@@ -163,10 +500,116 @@ def main():
         "--output",
         "-o",
         required=True,
-        help="Output directory for cleaned TXT files",
+        help="Output directory for cleaned TXT files (and corpus shards)",
+    )
+
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="Number of worker processes (default: 1, no pool)",
+    )
+
+    parser.add_argument(
+        "--parser",
+        choices=["html.parser", "lxml"],
+        default="html.parser",
+        help="HTML parser used for extraction (default: html.parser; lxml is faster)",
+    )
+
+    parser.add_argument(
+        "--rule-stats",
+        action="store_true",
+        help="Print how often each body normalization rule was skipped by its literal prefilter or applied",
+    )
+
+    parser.add_argument(
+        "--profile-rules",
+        help="Time every normalization rule on its own and write per-rule time, substitutions and "
+             "characters removed/added to this file (.json or .csv), most expensive first",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only process inputs that are new or changed since the last run (all of them if the "
+             "normalization rules or metrics changed) and delete outputs whose input disappeared",
+    )
+
+    parser.add_argument(
+        "--normalize-chunk-size",
+        type=int,
+        default=0,
+        help="Normalize bodies longer than this many characters in line-aligned chunks of about "
+             "that size, so memory stays flat on very large documents (default: 0, whole bodies)",
+    )
+
+    parser.add_argument(
+        "--output-format",
+        nargs="+",
+        choices=["txt", "jsonl", "parquet"],
+        default=["txt"],
+        help="Outputs to write: txt (one file per document), jsonl and/or parquet (size-bounded "
+             "shards of typed records in the output directory; parquet requires pyarrow) "
+             "(default: txt)",
+    )
+
+    parser.add_argument(
+        "--shard-compression",
+        choices=["none", "gzip", "zstd"],
+        default="none",
+        help="Compression of JSONL shards (default: none; zstd requires zstandard). Parquet "
+             "shards are always zstd-compressed",
+    )
+
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=256,
+        help="Start a new shard once the current one reaches this many MB on disk (default: 256)",
+    )
+
+    parser.add_argument(
+        "--structure-index",
+        action="store_true",
+        help="Record the byte offsets of every article, parágrafo, chapter, title, section and book "
+             "of the TXT outputs in structure_index.sqlite3 in the output directory (kept up to date "
+             "by later runs once it exists)",
+    )
+
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Detect near-duplicate documents (MinHash/LSH over word 5-gram shingles of the "
+             "cleaned body) and write the clusters to duplicate_clusters.json in the output "
+             "directory (requires numpy)",
+    )
+
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=0.8,
+        help="Estimated Jaccard similarity from which a document is a near-duplicate of an "
+             "earlier one (default: 0.8)",
+    )
+
+    parser.add_argument(
+        "--route-duplicates",
+        action="store_true",
+        help="With --dedup, write the TXT of near-duplicates to duplicate_files/ next to the "
+             "output directory (like unusable_files/) instead of the usable/unusable directories",
     )
 
     args = parser.parse_args()
+    if args.route_duplicates and not args.dedup:
+        parser.error("--route-duplicates requires --dedup")
+    if args.dedup and args.incremental:
+        parser.error("--dedup compares the whole corpus and cannot be combined with --incremental")
+    if args.structure_index and "txt" not in args.output_format:
+        parser.error("--structure-index requires --output-format txt")
+    if args.incremental and args.output_format != ["txt"]:
+        parser.error("--incremental only supports --output-format txt")
 
     input_dir = Path(args.input)
     output_dir = Path(args.output)
@@ -175,7 +618,23 @@ def main():
         print("Error: Input directory is not valid.")
         return 1
 
-    process_directory(input_dir, output_dir)
+    process_directory(
+        input_dir,
+        output_dir,
+        workers=args.workers,
+        parser=args.parser,
+        rule_stats=args.rule_stats,
+        profile_path=Path(args.profile_rules) if args.profile_rules else None,
+        incremental=args.incremental,
+        text_chunk_size=args.normalize_chunk_size,
+        formats=args.output_format,
+        shard_compression=args.shard_compression,
+        shard_size=args.shard_size * 1024 * 1024,
+        structure_index=args.structure_index,
+        dedup=args.dedup,
+        dedup_threshold=args.dedup_threshold,
+        route_duplicates=args.route_duplicates,
+    )
     return 0
 
 
@@ -0,0 +1,97 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+MANIFEST_NAME = "preprocess_manifest.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    doc_id TEXT PRIMARY KEY,
+    source_key TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    version TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    quality_score REAL,
+    quality_status TEXT,
+    updated_at REAL
+);
+"""
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+# Record of what the last preprocessing runs wrote, one row per input document: the change key
+# and content hash of the HTML, the pipeline version that processed it, and where the TXT went
+# (relative to the parent of the output directory) with its score and status.
+# An input is up to date when its hash and the pipeline version both match and its output exists.
+class PreprocessManifest:
+
+    def __init__(self, path: Path, root: Path):
+        self.path = path
+        self.root = root
+        self.conn = sqlite3.connect(str(path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    # Every row keyed by doc_id, loaded once per run
+    def load(self):
+        rows = self.conn.execute("SELECT * FROM outputs").fetchall()
+        return {row["doc_id"]: dict(row) for row in rows}
+
+    def output_path(self, entry) -> Path:
+        return self.root / entry["output_path"]
+
+    # True when `entry` was produced from this content by this pipeline version and its output
+    # is still on disk
+    def is_current(self, entry, digest: str, version: str) -> bool:
+        return (
+            entry is not None
+            and entry["content_hash"] == digest
+            and entry["version"] == version
+            and self.output_path(entry).exists()
+        )
+
+    def record(self, doc_id, source_key, digest, version, output_path: Path, metrics):
+        self.conn.execute(
+            "INSERT INTO outputs (doc_id, source_key, content_hash, version, output_path, "
+            "quality_score, quality_status, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(doc_id) DO UPDATE SET source_key = excluded.source_key, "
+            "content_hash = excluded.content_hash, version = excluded.version, "
+            "output_path = excluded.output_path, quality_score = excluded.quality_score, "
+            "quality_status = excluded.quality_status, updated_at = excluded.updated_at",
+            (
+                doc_id,
+                source_key,
+                digest,
+                version,
+                output_path.relative_to(self.root).as_posix(),
+                metrics["quality_score"],
+                metrics["quality_status"],
+                time.time(),
+            ),
+        )
+        self.conn.commit()
+
+    # The input changed on disk (e.g. touched) but its content did not
+    def update_source_key(self, doc_id, source_key):
+        self.conn.execute("UPDATE outputs SET source_key = ? WHERE doc_id = ?", (source_key, doc_id))
+        self.conn.commit()
+
+    def remove(self, doc_id):
+        self.conn.execute("DELETE FROM outputs WHERE doc_id = ?", (doc_id,))
+        self.conn.commit()
+
+
+# Opens the manifest kept in the output directory
+def open_manifest(output_dir: Path):
+    return PreprocessManifest(output_dir / MANIFEST_NAME, output_dir.parent)
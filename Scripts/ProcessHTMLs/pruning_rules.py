@@ -0,0 +1,77 @@
+import re
+
+# Attribute that marks the hidden metadata spans of SUIN pages
+METADATA_ATTRIBUTE = "field"
+
+# Text nodes announcing auxiliary blocks; the element holding them is dropped
+AUXILIARY_TEXT = re.compile(r"TEXTO\s+CORRESPONDIENTE\s+A", re.IGNORECASE)
+
+
+def is_hidden_style(style: str) -> bool:
+    style = style.replace(" ", "").lower()
+    return "display:none" in style or "visibility:hidden" in style
+
+
+# One declarative pruning rule: the element is dropped when its tag is in `tags` (any tag if
+# None) and, if `attribute` is set, the attribute is present and passes `test`.
+class PruneRule:
+
+    def __init__(self, name, tags=None, attribute=None, test=None):
+        self.name = name
+        self.tags = frozenset(tags) if tags is not None else None
+        self.attribute = attribute
+        self.test = test
+
+    # `attrs` is a mapping with .get(): an lxml element or a BeautifulSoup attrs dict,
+    # where multi-valued attributes such as class come back as lists.
+    def matches(self, attrs) -> bool:
+        if self.attribute is None:
+            return True
+        value = attrs.get(self.attribute)
+        if value is None:
+            return False
+        if isinstance(value, list):
+            value = " ".join(value)
+        return self.test(value)
+
+
+# Rules are indexed by tag so each element is only tested against the rules that can apply to it.
+class PruneRuleSet:
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self.generic = tuple(rule for rule in self.rules if rule.tags is None)
+        self.by_tag = {}
+        for rule in self.rules:
+            for tag in rule.tags or ():
+                self.by_tag.setdefault(tag, [])
+        for tag, tag_rules in self.by_tag.items():
+            tag_rules.extend(rule for rule in self.rules if rule.tags is None or tag in rule.tags)
+
+    # Name of the first rule that drops the element, or None to keep it
+    def match(self, tag, attrs):
+        for rule in self.by_tag.get(tag, self.generic):
+            if rule.matches(attrs):
+                return rule.name
+        return None
+
+
+# Non-content and boilerplate blocks of SUIN pages, in the order the cleanup historically ran.
+PRUNE_RULES = PruneRuleSet([
+    # Non-content or boilerplate sections
+    PruneRule("boilerplate", tags=["script", "style", "nav", "footer", "header", "form"]),
+    # Menus, sliders, TOC, and similar UI blocks
+    PruneRule("toc-id", tags=["table", "div"], attribute="id",
+              test=re.compile(r"toc|Resumen|NotasDestino", re.IGNORECASE).search),
+    PruneRule("ui-class", tags=["div"], attribute="class",
+              test=re.compile(r"slider|toc|resumenvigencias", re.IGNORECASE).search),
+    # Elements hidden by inline styles
+    PruneRule("hidden-style", attribute="style", test=is_hidden_style),
+    # UI toggles and boilerplate labels
+    PruneRule("toggle-class", attribute="class",
+              test=re.compile(r"toctoggle|toc-link", re.IGNORECASE).search),
+])
+
+
+def is_metadata_span(tag, attrs) -> bool:
+    return tag == "span" and attrs.get(METADATA_ATTRIBUTE) is not None
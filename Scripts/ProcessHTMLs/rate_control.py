@@ -0,0 +1,162 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+# Global requests-per-second budget shared by every download worker.
+# Each call to acquire() reserves the next free time slot and sleeps until it arrives,
+# so N workers together never exceed `rate` requests per second.
+class RateLimiter:
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Parses a Retry-After header (delay in seconds or an HTTP date) into seconds to wait.
+def parse_retry_after(value) -> float:
+    if not value:
+        return 0.0
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Feedback-driven replacement for RateLimiter (AIMD: additive increase, multiplicative decrease).
+# Every response is reported through release(); 429/503 answers and latency spikes halve the
+# rate and the number of requests in flight, a Retry-After header pauses every worker at once,
+# and each window of healthy responses adds `rate_step` req/s and one more concurrent slot.
+class AdaptiveThrottle:
+
+    THROTTLE_STATUSES = (429, 503)
+
+    def __init__(
+        self,
+        rate: float,
+        max_rate: float,
+        concurrency: int,
+        min_rate: float = 0.2,
+        rate_step: float = 0.25,
+        decrease_factor: float = 0.5,
+        latency_factor: float = 3.0,
+        latency_decrease: float = 0.8,
+    ):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, rate)
+        self.rate_step = rate_step
+        self.concurrency = concurrency
+        self.max_concurrency = concurrency
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.latency_decrease = latency_decrease
+
+        self.in_flight = 0
+        self.healthy = 0
+        self.next_slot = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.latency_avg = None
+        self.latency_samples = 0
+        self.cond = threading.Condition()
+
+    # Blocks until a concurrency slot and a rate slot are free and no global pause is active.
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= self.concurrency:
+                self.cond.wait()
+            self.in_flight += 1
+            now = time.monotonic()
+            slot = max(now, self.next_slot, self.paused_until)
+            self.next_slot = slot + 1.0 / self.rate
+
+        while True:
+            delay = slot - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # A Retry-After received while we were waiting applies to us too.
+            with self.cond:
+                slot = self.paused_until
+            if slot <= time.monotonic():
+                return
+
+    # Reports the outcome of a request; status is None when no response was received.
+    def release(self, status, latency: float, retry_after=None):
+        with self.cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if status in self.THROTTLE_STATUSES:
+                pause = parse_retry_after(retry_after)
+                if pause:
+                    self.paused_until = max(self.paused_until, now + pause)
+                    print(f"Throttle: server asked to wait {pause:.1f}s (HTTP {status})")
+                self._decrease(now, self.decrease_factor, f"HTTP {status}")
+            elif status is not None and self._is_latency_spike(latency):
+                self._decrease(now, self.latency_decrease, f"latency {latency:.2f}s")
+            elif status is not None and status < 400:
+                self.healthy += 1
+                if self.healthy >= self.concurrency:
+                    self.healthy = 0
+                    self._increase()
+
+            if status is not None and status not in self.THROTTLE_STATUSES:
+                self._record_latency(latency)
+
+            self.cond.notify_all()
+
+    def _is_latency_spike(self, latency: float) -> bool:
+        return (
+            self.latency_samples >= 20
+            and latency > self.latency_factor * self.latency_avg
+        )
+
+    def _record_latency(self, latency: float):
+        self.latency_samples += 1
+        if self.latency_avg is None:
+            self.latency_avg = latency
+        else:
+            self.latency_avg = 0.9 * self.latency_avg + 0.1 * latency
+
+    # Requests already in flight when the first 429 arrives will report the same condition,
+    # so at most one decrease is applied per cooldown window.
+    def _decrease(self, now: float, factor: float, reason: str):
+        cooldown = max(1.0, self.latency_avg or 0.0)
+        if now - self.last_decrease < cooldown:
+            return
+        self.last_decrease = now
+        self.healthy = 0
+
+        old_rate, old_concurrency = self.rate, self.concurrency
+        self.rate = max(self.min_rate, self.rate * factor)
+        self.concurrency = max(1, int(self.concurrency * factor))
+        print(
+            f"Throttle: {reason}, rate {old_rate:.2f} -> {self.rate:.2f} req/s, "
+            f"concurrency {old_concurrency} -> {self.concurrency}"
+        )
+
+    def _increase(self):
+        self.rate = min(self.max_rate, self.rate + self.rate_step)
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1)
@@ -0,0 +1,125 @@
+import tempfile
+import zlib
+from xml.etree.ElementTree import XMLPullParser
+
+import requests
+
+CHUNK_SIZE = 64 * 1024
+
+# Downloads of a sitemap attempted before giving up on it (a connection can drop mid-body,
+# which urllib3's Retry does not cover)
+DOWNLOAD_ATTEMPTS = 3
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+# Strips the "{namespace}" prefix ElementTree puts in front of every sitemap tag.
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+# Streams a sitemap file into an incremental XML parser and yields ("url", loc, lastmod)
+# for <urlset> entries and ("sitemap", loc, lastmod) for <sitemapindex> entries as soon as
+# each element closes. Finished elements are dropped, so memory does not grow with the sitemap.
+# Gzipped sitemaps are recognized by their magic bytes, whatever their URL or headers say.
+def iter_sitemap_elements(stream):
+    parser = XMLPullParser(events=("start", "end"))
+    head = stream.read(len(GZIP_MAGIC))
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if head == GZIP_MAGIC else None
+    root = None
+
+    def drain():
+        nonlocal root
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+
+            name = local_name(elem.tag)
+            if name not in ("url", "sitemap"):
+                continue
+
+            loc = None
+            lastmod = None
+            for child in elem:
+                child_name = local_name(child.tag)
+                if child_name == "loc" and child.text:
+                    loc = child.text.strip()
+                elif child_name == "lastmod" and child.text:
+                    lastmod = child.text.strip()
+
+            root.clear()
+            if loc:
+                yield name, loc, lastmod
+
+    chunk = head
+    while chunk:
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        parser.feed(chunk)
+        yield from drain()
+        chunk = stream.read(CHUNK_SIZE)
+
+    parser.close()
+    yield from drain()
+
+
+# Downloads a sitemap into a temporary file, so the connection is released before the crawl
+# that consumes its entries. requests already undoes a Content-Encoding: gzip. A download
+# that fails (connection error, timeout, body cut short) is started over.
+def download_sitemap(session, url, headers, timeout, verify=False, attempts=DOWNLOAD_ATTEMPTS):
+    for attempt in range(1, attempts + 1):
+        spool = tempfile.TemporaryFile()
+        try:
+            with session.get(url, headers=headers, timeout=timeout, verify=verify, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    spool.write(chunk)
+        except requests.HTTPError:
+            spool.close()
+            raise
+        except requests.RequestException as e:
+            spool.close()
+            if attempt == attempts:
+                raise
+            print(f"Sitemap download failed ({e}), retrying {url}")
+            continue
+        spool.seek(0)
+        return spool
+
+
+# Yields (url, lastmod) for every document reachable from the given sitemap, following
+# <sitemapindex> files into their child sitemaps. Documents listed in several sitemaps
+# are yielded once. A child sitemap that cannot be downloaded is reported and skipped; the
+# one given raises.
+def iter_sitemap_entries(session, sitemap_url, headers, timeout, verify=False):
+    pending = [sitemap_url]
+    visited = set()
+    seen_urls = set()
+
+    while pending:
+        current = pending.pop()
+        if current in visited:
+            continue
+        visited.add(current)
+
+        try:
+            spool = download_sitemap(session, current, headers, timeout, verify)
+        except requests.RequestException as e:
+            if current == sitemap_url:
+                raise
+            print(f"Skipping sitemap {current}: {e}")
+            continue
+
+        with spool:
+            child_sitemaps = []
+            for kind, loc, lastmod in iter_sitemap_elements(spool):
+                if kind == "sitemap":
+                    child_sitemaps.append(loc)
+                elif loc not in seen_urls:
+                    seen_urls.add(loc)
+                    yield loc, lastmod
+
+        # Visit child sitemaps in the order the index lists them
+        pending.extend(reversed(child_sitemaps))
@@ -0,0 +1,311 @@
+import argparse
+import re
+import sqlite3
+import sys
+import unicodedata
+from array import array
+from functools import lru_cache
+from pathlib import Path
+
+STRUCTURE_INDEX_NAME = "structure_index.sqlite3"
+
+# Structural units from the outermost to the innermost: a unit ends where the next unit of the
+# same or an outer kind starts
+KINDS = ("libro", "titulo", "capitulo", "seccion", "articulo", "paragrafo")
+
+ORDINALS = {
+    "primero": "1", "segundo": "2", "tercero": "3", "cuarto": "4", "quinto": "5",
+    "sexto": "6", "septimo": "7", "octavo": "8", "noveno": "9", "decimo": "10",
+}
+
+ROMAN_VALUES = {"I": 1, "V": 5, "X": 10, "L": 50, "C": 100, "D": 500, "M": 1000}
+
+# Header lines of the cleaned body: the unit word in capitals at a line start (as the
+# normalization rules leave it), then its number, if any: digits (5, 5°, 5o, 5A), a Roman
+# numeral, an ordinal word, ÚNICO or TRANSITORIO
+UNIT_HEADER = re.compile(
+    r"^(LIBRO|T[ÍI]TULO|CAP[ÍI]TULO|SECCI[ÓO]N|ART[ÍI]CULO|PAR[ÁA]GRAFO)\b"
+    r"(?:[ \t]+("
+    r"\d+(?:-\d+)?[A-Z]?(?:[°º]|o\b)?"
+    r"|[IVXLCDM]+\b"
+    r"|(?i:primero|segundo|tercero|cuarto|quinto|sexto|s[eé]ptimo|octavo|noveno|d[eé]cimo|[uú]nico|transitorio)\b"
+    r"))?",
+    re.MULTILINE,
+)
+
+# "artículo 5 de la Ley 100 de 1993", "parágrafo 2 del artículo 10 del Decreto 83 de 1953"
+CITATION = re.compile(
+    r"^\s*(\w+)\s+(\S+)"
+    r"(?:\s+del?\s+(?:la\s+|el\s+)?(\w+)\s+(\S+?))??"
+    r"\s+del?\s+(?:la\s+|el\s+)?(\w+)\s+(\S+)\s+de\s+(\d{4})\s*$",
+    re.IGNORECASE,
+)
+
+
+def strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+# Kind of a unit word: "ARTÍCULO", "artículo" and "Articulo" are all "articulo"
+def normalize_kind(word: str) -> str:
+    kind = strip_accents(word).lower()
+    if kind not in KINDS:
+        raise ValueError(f"Unknown structural unit: {word}")
+    return kind
+
+
+# Comparable form of a unit number: digits without their ordinal sign, Roman numerals and
+# ordinal words as digits, anything else lowercase without accents
+def normalize_number(number: str) -> str:
+    number = strip_accents(number or "").lower().rstrip(".")
+    if not number:
+        return ""
+    if number[0].isdigit():
+        number = number.rstrip("°º")
+        if number.endswith("o") and number[:-1].isdigit():
+            number = number[:-1]
+        return number.lstrip("0") or "0"
+    if number in ORDINALS:
+        return ORDINALS[number]
+    if all(c.upper() in ROMAN_VALUES for c in number):
+        values = [ROMAN_VALUES[c.upper()] for c in number]
+        total = sum(-v if i + 1 < len(values) and v < values[i + 1] else v for i, v in enumerate(values))
+        return str(total)
+    return number
+
+
+def normalize_tipo(tipo: str) -> str:
+    return strip_accents(tipo).strip().upper()
+
+
+# Structural units of one body as parallel arrays: kind (index into KINDS), normalized number,
+# and start/end byte offsets of the unit in the output file. Lookups slice the file at those
+# offsets instead of scanning the text again.
+class DocumentStructure:
+
+    def __init__(self, kinds: array, numbers, starts: array, ends: array):
+        self.kinds = kinds
+        self.numbers = numbers
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.kinds)
+
+    # Scans the body once for unit headers; `base` is the byte offset of the body in the file
+    @classmethod
+    def from_body(cls, body: str, base: int = 0):
+        kinds = array("B")
+        numbers = []
+        positions = []
+        for match in UNIT_HEADER.finditer(body):
+            kinds.append(KINDS.index(normalize_kind(match.group(1))))
+            numbers.append(normalize_number(match.group(2)))
+            positions.append(match.start())
+
+        # Each unit ends at the next unit of the same or an outer kind
+        ends_at = [len(body)] * len(positions)
+        open_units = []
+        for i, kind in enumerate(kinds):
+            while open_units and kinds[open_units[-1]] >= kind:
+                ends_at[open_units.pop()] = positions[i]
+            open_units.append(i)
+
+        # Character positions to UTF-8 byte offsets, encoding the body once piece by piece
+        offsets = {}
+        byte_offset = base
+        previous = 0
+        for position in sorted(set(positions) | {len(body)}):
+            byte_offset += len(body[previous:position].encode("utf-8"))
+            offsets[position] = byte_offset
+            previous = position
+
+        starts = array("Q", (offsets[position] for position in positions))
+        ends = array("Q", (offsets[position] for position in ends_at))
+        return cls(kinds, numbers, starts, ends)
+
+    # Index of the first `kind` unit numbered `number`, inside the first `within` unit
+    # ((kind, number)) when given; None if there is none
+    def find(self, kind: str, number: str, within=None):
+        low, high = 0, None
+        if within is not None:
+            parent = self.find(*within)
+            if parent is None:
+                return None
+            low, high = self.starts[parent], self.ends[parent]
+
+        code = KINDS.index(normalize_kind(kind))
+        number = normalize_number(number)
+        for i in range(len(self.kinds)):
+            if self.kinds[i] != code or self.numbers[i] != number or self.starts[i] < low:
+                continue
+            if high is not None and self.starts[i] >= high:
+                return None
+            return i
+        return None
+
+    def to_row(self):
+        return self.kinds.tobytes(), "\x1f".join(self.numbers), self.starts.tobytes(), self.ends.tobytes()
+
+    @classmethod
+    def from_row(cls, kinds: bytes, numbers: str, starts: bytes, ends: bytes):
+        kind_array = array("B")
+        kind_array.frombytes(kinds)
+        start_array = array("Q")
+        start_array.frombytes(starts)
+        end_array = array("Q")
+        end_array.frombytes(ends)
+        return cls(kind_array, numbers.split("\x1f") if kind_array else [], start_array, end_array)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    numero TEXT NOT NULL,
+    anio TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    kinds BLOB NOT NULL,
+    numbers TEXT NOT NULL,
+    starts BLOB NOT NULL,
+    ends BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_citation ON documents (tipo, numero, anio);
+"""
+
+
+# Structure of every TXT output of a directory, kept next to it in structure_index.sqlite3:
+# the document's TIPO/NUMERO/ANIO, its output path (relative to the parent of the output
+# directory, like the preprocess manifest) and its DocumentStructure arrays.
+class StructureIndex:
+
+    def __init__(self, path: Path, root: Path, cache_size: int = 1024):
+        self.path = path
+        self.root = root
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        # Decoded structures of the most recently used documents
+        self.load = lru_cache(maxsize=cache_size)(self._load)
+
+    @staticmethod
+    def exists(output_dir: Path):
+        return (output_dir / STRUCTURE_INDEX_NAME).exists()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    # Indexes the body of a TXT output written from `text`, whose last part is `body`
+    def record(self, doc_id, fields, output_path: Path, text: str, body: str):
+        base = len(text[:len(text) - len(body)].encode("utf-8"))
+        structure = DocumentStructure.from_body(body, base)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO documents (doc_id, tipo, numero, anio, output_path, kinds, numbers, "
+            "starts, ends) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                doc_id,
+                normalize_tipo(fields["tipo"]),
+                fields["numero"].strip(),
+                fields["anio"].strip(),
+                output_path.relative_to(self.root).as_posix(),
+                *structure.to_row(),
+            ),
+        )
+        self.conn.commit()
+        self.load.cache_clear()
+
+    # Output path (relative, as recorded) of every indexed document
+    def indexed(self):
+        return dict(self.conn.execute("SELECT doc_id, output_path FROM documents").fetchall())
+
+    def remove(self, doc_id):
+        self.conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        self.conn.commit()
+        self.load.cache_clear()
+
+    # doc_ids of the documents with this TIPO, NUMERO and ANIO
+    def find_documents(self, tipo: str, numero: str, anio: str):
+        rows = self.conn.execute(
+            "SELECT doc_id FROM documents WHERE tipo = ? AND numero = ? AND anio = ? ORDER BY doc_id",
+            (normalize_tipo(tipo), str(numero).strip(), str(anio).strip()),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    # (output path, DocumentStructure) of a document, or None if it is not indexed
+    def _load(self, doc_id):
+        row = self.conn.execute(
+            "SELECT output_path, kinds, numbers, starts, ends FROM documents WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return self.root / row[0], DocumentStructure.from_row(*row[1:])
+
+    # Text of one unit of a document ("articulo", "5"), read from its output at the indexed
+    # offsets; `within` narrows it to a parent unit, e.g. ("articulo", "5") for a parágrafo.
+    # None if the document or the unit is not indexed.
+    def get_unit(self, doc_id, kind: str, number: str, within=None):
+        loaded = self.load(doc_id)
+        if loaded is None:
+            return None
+        output_path, structure = loaded
+        i = structure.find(kind, number, within)
+        if i is None:
+            return None
+        with open(output_path, "rb") as f:
+            f.seek(structure.starts[i])
+            return f.read(structure.ends[i] - structure.starts[i]).decode("utf-8").rstrip("\n")
+
+    # Text of a unit cited in Spanish: "artículo 5 de la Ley 100 de 1993" or
+    # "parágrafo 1 del artículo 5 de la Ley 100 de 1993". Returns (doc_id, text) for the first
+    # document with that TIPO/NUMERO/ANIO that has the unit, or None. Raises ValueError for a
+    # citation it cannot parse or a unit kind outside KINDS.
+    def lookup(self, citation: str):
+        match = CITATION.match(citation)
+        if match is None:
+            raise ValueError(f"Unrecognized citation: {citation}")
+        kind, number, parent_kind, parent_number, tipo, numero, anio = match.groups()
+        # Checked before any document is looked up, so the result does not depend on the index
+        kind = normalize_kind(kind)
+        within = (normalize_kind(parent_kind), parent_number) if parent_kind else None
+
+        for doc_id in self.find_documents(tipo, numero, anio):
+            text = self.get_unit(doc_id, kind, number, within)
+            if text is not None:
+                return doc_id, text
+        return None
+
+
+# Opens the structure index kept in the output directory
+def open_structure_index(output_dir: Path):
+    return StructureIndex(output_dir / STRUCTURE_INDEX_NAME, output_dir.parent)
+
+
+# Example usage: python structure_index.py dataCleaned/Laws "artículo 5 de la Ley 100 de 1993"
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print one article, parágrafo or chapter of an indexed corpus")
+    parser.add_argument("output", help="Output directory written with --structure-index")
+    parser.add_argument("citation", help='Unit to print, e.g. "artículo 5 de la Ley 100 de 1993"')
+    args = parser.parse_args()
+
+    output_dir = Path(args.output)
+    if not StructureIndex.exists(output_dir):
+        print(f"No {STRUCTURE_INDEX_NAME} in {output_dir}")
+        sys.exit(1)
+
+    index = open_structure_index(output_dir)
+    try:
+        found = index.lookup(args.citation)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        index.close()
+    if found is None:
+        print("Not found.")
+        sys.exit(1)
+    doc_id, text = found
+    print(f"[{doc_id}]")
+    print(text)
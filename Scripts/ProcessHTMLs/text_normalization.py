@@ -1,174 +1,339 @@
+import argparse
 import re
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from TextRules.rule_engine import FusedRule, Rewrite, Rule, RulePipeline, RuleProfile, RuleStats
 
+LETTER = "A-Za-zÁÉÍÓÚÑáéíóúñ"
 
-def normalize_body(text: str, apply_body_rules: bool = True) -> str:
-    # Base cleanup used for both metadata and body.
-    text = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]", "", text)
-    text = re.sub(r"[\uFFFD\uFFFE\uFFFF]", "", text)
-    text = re.sub(r"\xa0", " ", text)
-    text = re.sub(r"[\t\r ]+", " ", text)
-    text = re.sub(r" *\n *", "\n", text)
-    text = re.sub(r"\n{2,}", "\n", text)
-    text = re.sub(r"\(\s*\)", "", text)
+# Base cleanup used for both metadata and body.
+BASE_RULES = RulePipeline([
+    # Control characters, non-characters and non-breaking spaces in one character-class scan
+    FusedRule("invisible-chars", [
+        Rule("control-chars", r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]", ""),
+        Rule("noncharacters", r"[\uFFFD\uFFFE\uFFFF]", ""),
+        Rule("nbsp", r"\xa0", " "),
+    ]),
+    # Single spaces are left alone instead of being replaced by themselves
+    Rewrite("collapse-spaces", r"[\t\r ]{2,}|[\t\r]", " ", [
+        Rule("collapse-spaces", r"[\t\r ]+", " "),
+    ]),
+    Rewrite("collapse-newlines", r" +\n[ \n]*|\n[ \n]+", "\n", [
+        Rule("trim-line-spaces", r" *\n *", "\n"),
+        Rule("collapse-newlines", r"\n{2,}", "\n"),
+    ]),
+    Rule("empty-parentheses", r"\(\s*\)", ""),
+])
 
-    if not apply_body_rules:
-        return text.strip()
+BODY_RULES = RulePipeline([
     # Normalize spaced-out "A R T I C U L O" tokens.
-    text = re.sub(
-        r"\bA\s+R\s+T\s+[ÍI]\s+C\s+U\s+L\s+O\b",
-        "ARTICULO",
-        text,
-        flags=re.IGNORECASE,
-    )
-    text = re.sub(r"\bARTICULO\n(\d+°?)", r"ARTICULO \1", text)
-    text = re.sub(r",\s*\n", ", ", text)
+    Rule("spaced-articulo", r"\bA\s+R\s+T\s+[ÍI]\s+C\s+U\s+L\s+O\b", "ARTICULO", re.IGNORECASE),
+    # The word boundary is checked behind the literal so the scan can search for "ARTICULO"
+    Rewrite("articulo-number", r"ARTICULO(?<!\wARTICULO)\n(\d+°?)", r"ARTICULO \1", [
+        Rule("articulo-number", r"\bARTICULO\n(\d+°?)", r"ARTICULO \1"),
+    ]),
+    Rule("comma-newline", r",\s*\n", ", "),
     # Normalize money formats like 2_50 or 0-04.
-    text = re.sub(r"(\d)[_-](\d{2})\b", r"\1.\2", text)
+    Rule("money-separator", r"(\d)[_-](\d{2})\b", r"\1.\2"),
     # Join numeric list headings (e.g., 1., 1.1, 1.2) with their content.
-    text = re.sub(
-        r"^\s*(\d+(?:\.\d+)*(?:[\.)])?)\s*\n+",
-        r"\1 ",
-        text,
-        flags=re.MULTILINE,
-    )
+    Rule("numeric-heading", r"^\s*(\d+(?:\.\d+)*(?:[\.)])?)\s*\n+", r"\1 ", re.MULTILINE),
     # Merge punctuation-only and symbol-only lines with surrounding text.
-    text = re.sub(r"([^\n])\n\s*([:;,.])\s*\n(\S)", r"\1\2 \3", text)
-    text = re.sub(r"([^\n])\n\s*([:;,.])", r"\1\2", text)
-    text = re.sub(r"\n\s*\$\s*\n", " $ ", text)
-    text = re.sub(r"\bcon\s*\n\s*\$?\s*", "con $ ", text, flags=re.IGNORECASE)
-    text = re.sub(r"\(\s*\n\s*([A-Za-zÁÉÍÓÚÑáéíóúñ\.]+)\s*\n\s*\)", r"(\1)", text)
-    text = re.sub(r"([A-Za-zÁÉÍÓÚÑáéíóúñ0-9])\s*\n\s*\)", r"\1)", text)
+    Rule("punctuation-line-between", r"([^\n])\n\s*([:;,.])\s*\n(\S)", r"\1\2 \3"),
+    Rule("punctuation-line", r"([^\n])\n\s*([:;,.])", r"\1\2"),
+    Rule("dollar-line", r"\n\s*\$\s*\n", " $ "),
+    Rule("con-dollar", r"\bcon\s*\n\s*\$?\s*", "con $ ", re.IGNORECASE),
+    Rule("parenthesized-word", rf"\(\s*\n\s*([{LETTER}\.]+)\s*\n\s*\)", r"(\1)"),
+    Rule("closing-parenthesis", rf"([{LETTER}0-9])\s*\n\s*\)", r"\1)"),
     # Join split decimal cents across lines (e.g., "0\n02" -> "0.02").
-    text = re.sub(r"(\b\d+)\s*\n\s*(\d{2})\b", r"\1.\2", text)
-    text = re.sub(
-        r"([A-Za-zÁÉÍÓÚÑáéíóúñ]{2,})\s*\n\s*([A-Za-zÁÉÍÓÚÑáéíóúñ])\s*\n\s*([A-Za-zÁÉÍÓÚÑáéíóúñ]{2,})",
+    Rule("split-cents", r"(\b\d+)\s*\n\s*(\d{2})\b", r"\1.\2"),
+    # A match can only start at the first letter (digit) of a run: later positions in the run
+    # see the same continuation, so the lookbehind skips retrying them.
+    Rewrite(
+        "split-word",
+        rf"(?<![{LETTER}])([{LETTER}]{{2,}})\s*\n\s*([{LETTER}])\s*\n\s*([{LETTER}]{{2,}})",
         r"\1\2\3",
-        text,
-    )
+        [
+            Rule(
+                "split-word",
+                rf"([{LETTER}]{{2,}})\s*\n\s*([{LETTER}])\s*\n\s*([{LETTER}]{{2,}})",
+                r"\1\2\3",
+            ),
+        ],
+    ),
     # Merge ordinal marks that are split to the next line (e.g., "1\n°").
-    text = re.sub(r"(\d+)\s*\n\s*([º°])", r"\1\2", text)
+    Rewrite("split-ordinal", r"(?<!\d)(\d+)\s*\n\s*([º°])", r"\1\2", [
+        Rule("split-ordinal", r"(\d+)\s*\n\s*([º°])", r"\1\2"),
+    ]),
     # Remove standalone hyphen/quote lines and strip hyphen bullets in headers/signatures.
-    text = re.sub(r"^\s*[-–—]+\s*$", "", text, flags=re.MULTILINE)
-    text = re.sub(r"^\s*\"+\s*$", "", text, flags=re.MULTILINE)
-    text = re.sub(r"^\s*-\s*(?=[A-ZÁÉÍÓÚÑ])", "", text, flags=re.MULTILINE)
-    text = re.sub(r"\s*-\s*(?=(?:El|La|Los|Las)\s)", " ", text)
+    Rule("hyphen-line", r"^\s*[-–—]+\s*$", "", re.MULTILINE),
+    Rule("quote-line", r"^\s*\"+\s*$", "", re.MULTILINE),
+    Rule("hyphen-bullet", r"^\s*-\s*(?=[A-ZÁÉÍÓÚÑ])", "", re.MULTILINE),
+    Rule("hyphen-article", r"\s*-\s*(?=(?:El|La|Los|Las)\s)", " "),
     # Separate list items that are on the same line (e.g., "text; b)" -> "text;\nb)")
-    text = re.sub(r"([;.])\s+([a-z]\))", r"\1\n\2", text)
+    Rule("inline-list-item", r"([;.])\s+([a-z]\))", r"\1\n\2"),
     # Join roman numerals in parentheses with their content (e.g., "(i)\nText" -> "(i) Text").
-    text = re.sub(
-        r"^\s*\(([ivxlcdm]+)\)\s*\n+",
-        r"(\1) ",
-        text,
-        flags=re.MULTILINE | re.IGNORECASE,
-    )
+    Rule("roman-item", r"^\s*\(([ivxlcdm]+)\)\s*\n+", r"(\1) ", re.MULTILINE | re.IGNORECASE),
     # Join lowercase letters in parentheses with their content (e.g., "a.\nText" or "(a)\nText" -> "a. Text" or "(a) Text").
-    text = re.sub(
-        r"^\s*([a-z])\.\s*\n+",
-        r"\1. ",
-        text,
-        flags=re.MULTILINE,
-    )
-    text = re.sub(
-        r"^\s*([a-z])\)\s*\n+",
-        r"\1) ",
-        text,
-        flags=re.MULTILINE,
-    )
+    Rule("letter-dot-item", r"^\s*([a-z])\.\s*\n+", r"\1. ", re.MULTILINE),
+    Rule("letter-paren-item", r"^\s*([a-z])\)\s*\n+", r"\1) ", re.MULTILINE),
     # Join number-only lines with the following text line (table-like lists).
-    text = re.sub(
-        r"^\s*(\d+)\s*\n([A-Za-zÁÉÍÓÚÑáéíóúñ])",
-        r"\1 \2",
-        text,
-        flags=re.MULTILINE,
-    )
+    Rule("number-line", rf"^\s*(\d+)\s*\n([{LETTER}])", r"\1 \2", re.MULTILINE),
     # Join amount-only lines with the previous text line.
-    text = re.sub(
-        r"([A-Za-zÁÉÍÓÚÑáéíóúñ].*)\n\s*(\d{1,3}(?:[\.,]\d{3})*(?:[\., ]\d{2})?)\s*$",
-        r"\1 \2",
-        text,
-        flags=re.MULTILINE,
-    )
-    text = re.sub(
+    # ".*" always runs to the end of the line, so only the first letter of each line can start
+    # a match; anchoring there avoids rescanning the line from every letter.
+    Rewrite(
+        "amount-after-text",
+        rf"^([^{LETTER}\n]*)([{LETTER}][^\n]*)\n\s*(\d{{1,3}}(?:[\.,]\d{{3}})*(?:[\., ]\d{{2}})?)\s*$",
+        r"\1\2 \3",
+        [
+            Rule(
+                "amount-after-text",
+                rf"([{LETTER}].*)\n\s*(\d{{1,3}}(?:[\.,]\d{{3}})*(?:[\., ]\d{{2}})?)\s*$",
+                r"\1 \2",
+                re.MULTILINE,
+            ),
+        ],
+        re.MULTILINE,
+    ),
+    Rule(
+        "amount-line",
         r"([^\n])\n\s*(\d{1,3}(?:[\.,]\d{3})*(?:[\., ]\d{2})?)\s*$",
         r"\1 \2",
-        text,
-        flags=re.MULTILINE,
-    )
+        re.MULTILINE,
+    ),
     # If a new "De/Del" item is glued after an amount, break it onto a new line.
-    text = re.sub(
+    Rule(
+        "amount-de-item",
         r"(\d{1,3}(?:[\.,]\d{3})*(?:[\.,]\d{2})?)\s+(De(?:l|\s+los|\s+las)?\s)",
         r"\1\n\2",
-        text,
-    )
+    ),
     # Remove stray leading/trailing quotes per line.
-    text = re.sub(r"^\s*\"+", "", text, flags=re.MULTILINE)
-    text = re.sub(r"\"+\s*$", "", text, flags=re.MULTILINE)
+    Rule("leading-quotes", r"^\s*\"+", "", re.MULTILINE),
+    Rule("trailing-quotes", r"\"+\s*$", "", re.MULTILINE),
     # Join dates split across lines (e.g., "Septiembre\n9 de\n1890").
-    text = re.sub(r"([A-Za-zÁÉÍÓÚÑáéíóúñ\.])\s*\n(\d+\s+de\b)", r"\1 \2", text)
-    text = re.sub(r"\bde\s*\n(\d{4})\b", r"de \1", text)
+    Rule("date-day", rf"([{LETTER}\.])\s*\n(\d+\s+de\b)", r"\1 \2"),
+    Rule("date-year", r"\bde\s*\n(\d{4})\b", r"de \1"),
     # Join lettered list markers (e.g., "b)") to the previous line.
-    text = re.sub(r";\s*\n\s*([a-zA-Z]\))", r"; \1", text)
+    Rule("lettered-marker", r";\s*\n\s*([a-zA-Z]\))", r"; \1"),
     # Join signature titles with names on the next line.
-    text = re.sub(
-        r"(^[^\n]{3,80}[,;:])\s*\n([A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ]+)$",
+    Rule(
+        "signature-title",
+        rf"(^[^\n]{{3,80}}[,;:])\s*\n([A-ZÁÉÍÓÚÑ][{LETTER}]+)$",
         r"\1 \2",
-        text,
-        flags=re.MULTILINE,
-    )
-    text = re.sub(
+        re.MULTILINE,
+    ),
+    Rule(
+        "signature-name",
         r"(^[^\n]{3,80}\.[ ]?)\s*\n([A-ZÁÉÍÓÚÑ]{2,})$",
         r"\1 \2",
-        text,
-        flags=re.MULTILINE,
-    )
+        re.MULTILINE,
+    ),
     # Join lines where a name continues on a lowercase line.
-    text = re.sub(r"([A-Za-zÁÉÍÓÚÑáéíóúñ,;])\s*\n([a-záéíóúñ])", r"\1 \2", text)
+    Rule("lowercase-continuation", rf"([{LETTER},;])\s*\n([a-záéíóúñ])", r"\1 \2"),
     # Join all-caps names split across two short lines.
-    text = re.sub(
+    Rule(
+        "caps-name",
         r"^([A-ZÁÉÍÓÚÑ]{2,}(?:\s+[A-ZÁÉÍÓÚÑ]{2,}){0,2})\s*\n([A-ZÁÉÍÓÚÑ]{2,}(?:\s+[A-ZÁÉÍÓÚÑ]{2,}){0,2})$",
         r"\1 \2",
-        text,
-        flags=re.MULTILINE,
-    )
+        re.MULTILINE,
+    ),
     # If a roman numeral line is followed by a single letter and a word, fold the letter into the word.
-    text = re.sub(
+    Rule(
+        "roman-split-word",
         r"^([IVXLCDM])\s*\n([A-ZÁÉÍÓÚÑ])\s*\n([A-ZÁÉÍÓÚÑ]{2,})",
         r"\1\n\2\3",
-        text,
-        flags=re.MULTILINE,
-    )
+        re.MULTILINE,
+    ),
     # Remove whitespace-only lines before collapsing.
-    text = re.sub(r"^\s+$", "", text, flags=re.MULTILINE)
+    Rule("blank-lines", r"^\s+$", "", re.MULTILINE),
     # Re-collapse empty lines introduced by the merges.
-    text = re.sub(r"\n{2,}", "\n", text)
+    Rule("recollapse-newlines", r"\n{2,}", "\n"),
     # Remove punctuation-only lines that remain after merging.
-    text = re.sub(r"^\s*[:;,.]\s*$", "", text, flags=re.MULTILINE)
+    Rule("punctuation-only-line", r"^\s*[:;,.]\s*$", "", re.MULTILINE),
     # Separate decree/resolution keywords from article headers
-    text = re.sub(
+    Rule(
+        "decree-keyword",
         r"(DECRETA|RESUELVE|ORDENA|DISPONE):\s*(Artículo|ARTICULO|ART[ÍI]CULO)",
         r"\1:\n\2",
-        text,
-        flags=re.IGNORECASE,
-    )
+        re.IGNORECASE,
+    ),
     # Join article and paragrafo headers with their content lines.
     # First, join "Artículo" on one line with the number on the next line
-    text = re.sub(
+    Rule(
+        "article-number-line",
         r"^(ART(?:[ÍI]CULO)?)\s*\n+(\d+(?:\s*\.?\s*[º°o])?\.?)",
         r"\1 \2",
-        text,
-        flags=re.MULTILINE | re.IGNORECASE,
-    )
+        re.MULTILINE | re.IGNORECASE,
+    ),
     # Then join the complete article header with its content
-    text = re.sub(
+    Rule(
+        "article-header",
         r"^(ART(?:[ÍI]CULO)?\.?\s+(?:\d+(?:\s*\.?\s*[º°o])?|[IVXLCDM]+|primero|segundo|tercero|cuarto|quinto|sexto|s[eé]ptimo|octavo|noveno|d[eé]cimo|und[eé]cimo|duod[eé]cimo)\.?)(?:\s*\n+)",
         r"\1 ",
-        text,
-        flags=re.MULTILINE | re.IGNORECASE,
-    )
-    text = re.sub(
+        re.MULTILINE | re.IGNORECASE,
+    ),
+    Rule(
+        "paragrafo-header",
         r"^(PAR[AÁ]GRAFO(?:\s+(?:\d+|primero|segundo|tercero|cuarto|quinto|sexto|s[eé]ptimo|octavo|noveno|d[eé]cimo))?(?:\s*\.?\s*[º°])?\.?\:?)\s*(?:\n+)",
         r"\1 ",
-        text,
-        flags=re.MULTILINE | re.IGNORECASE,
+        re.MULTILINE | re.IGNORECASE,
+    ),
+])
+
+
+# Identifies the normalization rules; outputs produced under another version are stale
+RULES_VERSION = BASE_RULES.fingerprint()[:16] + BODY_RULES.fingerprint()[:16]
+
+# Chunk boundaries for normalize_body_chunked: a line break (plus blank lines) between a sentence
+# ending in a lowercase word or a number and a line starting with "ARTICULO <number>". No rule can join or
+# remove such a break, and every rule sees the same context on both sides of it as it does in
+# the whole document, so chunks normalized on their own and joined with "\n" give the same
+# text. This depends on the rules above: re-check with --chunk-size after changing them.
+CHUNK_BOUNDARY = re.compile(
+    r"(?<=[a-záéíóúñ0-9]{2}\.)[ \t\r]*\n[ \t\r\n]*(?=A(?:RT[ÍI]CULO|rt[íi]culo)[ \t]+\d)"
+)
+
+# The sentence line must keep at least three words through every rule, so that it can never
+# become a header-only, numbered, lettered or punctuation-only line and be joined with the
+# article. Parentheses, quotes and control characters (removed by some rules) and the decree
+# keywords (which split a line) are not allowed on it.
+CHUNK_LINE = re.compile(rf"[{LETTER}0-9 \t\r,;:.]+")
+CHUNK_LINE_SPLIT = re.compile(r"DECRETA|RESUELVE|ORDENA|DISPONE", re.IGNORECASE)
+
+
+# Rules whose required literals are absent from the text are skipped; `stats` (a RuleStats)
+# counts skipped, applied and matching rules when given. With a RuleProfile every rule runs on
+# its own and is timed instead.
+def normalize_body(text: str, apply_body_rules: bool = True, stats: RuleStats = None,
+                   profile: RuleProfile = None) -> str:
+    text = BASE_RULES.apply(text, stats, profile)
+    if not apply_body_rules:
+        return text.strip()
+    return BODY_RULES.apply(text, stats, profile).strip()
+
+
+# Splits a raw body into chunks of at least `chunk_size` characters at CHUNK_BOUNDARY breaks;
+# the breaks themselves are dropped. Texts without a usable break come back whole.
+def iter_body_chunks(text: str, chunk_size: int):
+    start = 0
+    while len(text) - start > chunk_size:
+        for match in CHUNK_BOUNDARY.finditer(text, start + chunk_size):
+            end = match.start()
+            line = text[text.rfind("\n", 0, end) + 1:end]
+            if CHUNK_LINE.fullmatch(line) and len(line.split()) >= 3 and not CHUNK_LINE_SPLIT.search(line):
+                yield text[start:end]
+                start = match.end()
+                break
+        else:
+            break
+    yield text[start:]
+
+
+# Same output as normalize_body(text), with every rule run on one chunk at a time so that
+# the copies made by each substitution are chunk-sized instead of document-sized.
+def normalize_body_chunked(text: str, chunk_size: int, stats: RuleStats = None,
+                           profile: RuleProfile = None) -> str:
+    if len(text) <= chunk_size:
+        return normalize_body(text, stats=stats, profile=profile)
+    return "\n".join(normalize_body(chunk, stats=stats, profile=profile)
+                     for chunk in iter_body_chunks(text, chunk_size))
+
+
+# Rule-by-rule version of normalize_body, without rewrites or fused passes; the compiled
+# pipeline must always give the same output. This only checks the compilation of the rule
+# lists: tests/test_text_normalization.py checks the rules themselves against a frozen copy of
+# the original normalize_body.
+def normalize_body_reference(text: str, apply_body_rules: bool = True) -> str:
+    text = BASE_RULES.apply_reference(text)
+    if not apply_body_rules:
+        return text.strip()
+    return BODY_RULES.apply_reference(text).strip()
+
+
+# Runs the compiled and the rule-by-rule normalization over the raw bodies and metadata of
+# an HTML corpus and reports mismatches and timings. With a `chunk_size`, bodies are also
+# normalized chunk by chunk and checked against the whole-document output.
+def compare_corpus(input_dir: Path, limit: int, chunk_size: int = 0):
+    from preprocessHTMLs import extract_with_soup
+    from html_store import open_html_store
+
+    html_store = open_html_store(input_dir)
+    total = 0
+    mismatches = 0
+    compiled_time = 0.0
+    reference_time = 0.0
+    stats = RuleStats()
+    chunked_documents = 0
+
+    for doc_id, html in html_store.iter_documents():
+        if limit and total >= limit:
+            break
+        total += 1
+
+        metadata, body = extract_with_soup(html)
+        samples = [(body, True), *((value, False) for value in metadata.values())]
+        for text, apply_body_rules in samples:
+            start = time.perf_counter()
+            compiled = normalize_body(text, apply_body_rules, stats if apply_body_rules else None)
+            compiled_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            reference = normalize_body_reference(text, apply_body_rules)
+            reference_time += time.perf_counter() - start
+
+            if compiled != reference:
+                mismatches += 1
+                print(f"MISMATCH {doc_id} ({'body' if apply_body_rules else 'metadata'})")
+
+        if chunk_size:
+            chunks = sum(1 for _ in iter_body_chunks(body, chunk_size))
+            chunked_documents += chunks > 1
+            if normalize_body_chunked(body, chunk_size) != normalize_body(body):
+                mismatches += 1
+                print(f"MISMATCH {doc_id} (body in {chunks} chunks)")
+
+    html_store.close()
+    print(f"Documents compared: {total}")
+    print(f"Mismatches: {mismatches}")
+    print(f"Rule-by-rule normalization: {reference_time:.2f}s")
+    print(f"Compiled normalization: {compiled_time:.2f}s")
+    if compiled_time:
+        print(f"Speedup: {reference_time / compiled_time:.1f}x")
+    if chunk_size:
+        print(f"Bodies split into chunks of {chunk_size}+ characters: {chunked_documents}")
+    print("\nBody rules (documents skipped / applied / changed):")
+    print(stats.summary())
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that the compiled normalization pipeline matches the rule-by-rule one on a corpus"
     )
-    return text.strip()
+    parser.add_argument(
+        "--input",
+        "-i",
+        required=True,
+        help="Directory of HTML files or shard archive to compare on",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=0,
+        help="Compare at most this many documents (default: all)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=0,
+        help="Also check chunked normalization with chunks of at least this many characters",
+    )
+    args = parser.parse_args()
+
+    return 1 if compare_corpus(Path(args.input), args.limit, args.chunk_size) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
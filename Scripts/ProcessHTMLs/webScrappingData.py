@@ -1,118 +1,423 @@
 import argparse
 import requests
-from bs4 import BeautifulSoup
 from pathlib import Path
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import urlparse, parse_qs
 import urllib3
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from rate_control import RateLimiter, AdaptiveThrottle, parse_retry_after
+from job_store import JobStore, DONE, FAILED, PENDING, IN_FLIGHT
+from sitemap_stream import iter_sitemap_entries
+from html_store import open_html_store
 
 # Disable warnings about insecure requests (since we're using verify=False)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Define headers to mimic a browser to evit potential blocking by the server
+HEADERS = {
+    "User-Agent": "Mozilla/5.0"
+}
 
-def run_scraper(
-    sitemap_url,
-    save_dir,
-    sleep_between_requests,
-    max_retries,
-    backoff_factor,
-    failed_log,
-):
-    # Define headers to mimic a browser to evit potential blocking by the server
-    headers = {
-        "User-Agent": "Mozilla/5.0"
-    }
+# Retry/backoff configuration to handle flaky server responses
+CONNECT_TIMEOUT = 15
+READ_TIMEOUT = 60
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Longest backoff between two attempts, as in urllib3
+BACKOFF_MAX = 120
 
-    # Retry/backoff configuration to handle flaky server responses
-    connect_timeout = 15
-    read_timeout = 60
+# Stored next to the downloaded HTML files unless --job-db says otherwise
+JOB_DB_NAME = "crawl_jobs.sqlite3"
+LEGACY_MANIFEST_NAME = "crawl_manifest.json"
 
-    # Define the directory to save the downloaded HTML files
-    save_dir.mkdir(parents=True, exist_ok=True)
 
+# Builds a session with retry/backoff; pool_size bounds the connections kept alive per host.
+# status_retries (default: max_retries) bounds the retries of status_forcelist answers; 0 hands
+# every answer back to the caller.
+def build_session(
+    max_retries,
+    backoff_factor,
+    pool_size=10,
+    status_forcelist=RETRY_STATUSES,
+    respect_retry_after=True,
+    status_retries=None,
+):
     session = requests.Session()
     retry = Retry(
         total=max_retries,
         connect=max_retries,
         read=max_retries,
-        status=max_retries,
+        status=max_retries if status_retries is None else status_retries,
         backoff_factor=backoff_factor,
-        status_forcelist=[429, 500, 502, 503, 504],
+        status_forcelist=list(status_forcelist),
         allowed_methods=["GET"],
         raise_on_status=False,
+        respect_retry_after_header=respect_retry_after,
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry,
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
     )
-    adapter = HTTPAdapter(max_retries=retry)
     session.mount("https://", adapter)
     session.mount("http://", adapter)
+    return session
 
-    print("Downloading sitemap...")
 
-    # Fetch the sitemap and extract URLs
-    response = session.get(
+# Stream (url, lastmod) pairs from the sitemap (and its children if it is a sitemap index);
+# lastmod is None when the sitemap omits it
+def sitemap_entries(session, sitemap_url):
+    return iter_sitemap_entries(
+        session,
         sitemap_url,
-        headers=headers,
-        timeout=(connect_timeout, read_timeout),
-        verify=False,
+        headers=HEADERS,
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
     )
-    response.raise_for_status()
 
-    # Parse the sitemap XML and extract document URLs
-    soup = BeautifulSoup(response.text, "xml")
-    urls = [loc.text.strip() for loc in soup.find_all("loc")]
 
-    print(f"Found {len(urls)} documents.")
-    print("Downloading all documents...\n")
+# Extract the document ID from the URL query parameters to use as the file name
+def doc_id_from_url(url):
+    parsed = urlparse(url)
+    query_params = parse_qs(parsed.query)
+    return query_params.get("id", ["sin_id"])[0]
 
-    for index, url in enumerate(urls, start=1):
-        print(f"Processing: {url}")
 
-        # Extract the document ID from the URL query parameters to use as the file name
-        parsed = urlparse(url)
-        query_params = parse_qs(parsed.query)
-        doc_id = query_params.get("id", ["sin_id"])[0]
+# Make a GET request to the document URL with a timeout and without SSL verification
+def fetch_document(session, url, extra_headers=None):
+    page = session.get(
+        url,
+        headers={**HEADERS, **(extra_headers or {})},
+        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+        verify=False,
+    )
+
+    if page.status_code >= 400:
+        raise requests.HTTPError(f"HTTP {page.status_code}")
 
-        # Save the page content as an HTML file
-        file_name = f"{doc_id}.html"
-        file_path = save_dir / file_name
+    return page
 
-        # Skip already downloaded files to allow resume
-        if file_path.exists():
-            print(f"[{index}/{len(urls)}] Skipping existing: {file_name}")
-            continue
 
+# Like fetch_document, but every attempt goes through the throttle and reports its outcome.
+# 429/5xx answers are retried here: throttling answers (429/503) after the throttle has slowed
+# everyone down, the other 5xx with the usual backoff.
+def fetch_document_throttled(session, url, throttle, max_retries, backoff_factor, extra_headers=None):
+    for attempt in range(max_retries + 1):
+        if attempt and page.status_code not in throttle.THROTTLE_STATUSES:
+            time.sleep(retry_delay(attempt, backoff_factor))
+        throttle.acquire()
+        start = time.monotonic()
         try:
-            # Make a GET request to the document URL with a timeout and without SSL verification
             page = session.get(
                 url,
-                headers=headers,
-                timeout=(connect_timeout, read_timeout),
+                headers={**HEADERS, **(extra_headers or {})},
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
                 verify=False,
             )
+        except Exception:
+            throttle.release(None, time.monotonic() - start)
+            raise
+        throttle.release(page.status_code, time.monotonic() - start, page.headers.get("Retry-After"))
+
+        if page.status_code not in RETRY_STATUSES:
+            break
+
+    if page.status_code >= 400:
+        raise requests.HTTPError(f"HTTP {page.status_code}")
+
+    return page
+
+
+# Seconds to wait before retry number `attempt` (1 for the first): exponential backoff like
+# urllib3's Retry, or the server's Retry-After when it sends one.
+def retry_delay(attempt, backoff_factor, retry_after=None):
+    if retry_after:
+        return parse_retry_after(retry_after)
+    if attempt <= 1:
+        return 0.0
+    return min(BACKOFF_MAX, backoff_factor * 2 ** (attempt - 1))
+
+
+# Like fetch_document, but 429/5xx answers are retried here with backoff instead of inside
+# urllib3, and every attempt first takes a slot from the shared RateLimiter, so retries stay
+# within the global request budget.
+def fetch_document_limited(session, url, limiter, max_retries, backoff_factor, extra_headers=None):
+    for attempt in range(max_retries + 1):
+        if attempt:
+            time.sleep(retry_delay(attempt, backoff_factor, page.headers.get("Retry-After")))
+        limiter.acquire()
+        page = session.get(
+            url,
+            headers={**HEADERS, **(extra_headers or {})},
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+            verify=False,
+        )
+        if page.status_code not in RETRY_STATUSES:
+            break
+
+    if page.status_code >= 400:
+        raise requests.HTTPError(f"HTTP {page.status_code}")
+
+    return page
+
+
+# Opens the job store, bootstrapping it from the download directory (and the JSON manifest
+# written by earlier versions) the first time it is used on an existing corpus.
+def open_job_store(save_dir, job_db):
+    store = JobStore(job_db)
+    if store.is_empty():
+        imported = store.import_directory(save_dir)
+        if imported:
+            print(f"Job store initialized with {imported} previously downloaded documents.")
+        legacy_manifest = save_dir / LEGACY_MANIFEST_NAME
+        if legacy_manifest.exists():
+            store.import_manifest(legacy_manifest)
+    return store
+
+
+# Decides whether a document needs a request. Returns the headers to send (conditional ones
+# for documents already downloaded in incremental mode) or None to skip it without a request.
+def request_headers(store, doc_id, lastmod, incremental):
+    record = store.get(doc_id)
+    if not record or record["state"] != DONE:
+        return {}
+
+    if not incremental:
+        return None
+
+    if lastmod and record["lastmod"] == lastmod:
+        return None
+
+    headers = {}
+    if record["etag"]:
+        headers["If-None-Match"] = record["etag"]
+    if record["last_modified"]:
+        headers["If-Modified-Since"] = record["last_modified"]
+    return headers
+
+
+# Runs one download attempt and records it in the job store; `fetch` performs the request.
+# Returns True when the page was written, False when the server answered 304.
+def download_document(store, html_store, fetch, url, doc_id, lastmod):
+    store.mark_in_flight(doc_id, url)
+    start = time.monotonic()
+    try:
+        page = fetch()
+    except Exception as e:
+        store.mark_failed(doc_id, url, e, time.monotonic() - start)
+        raise
+    latency = time.monotonic() - start
+
+    if page.status_code != 304:
+        # Save the HTML content before the job is marked done
+        html_store.put(doc_id, page.text)
+
+    store.mark_done(
+        doc_id,
+        url,
+        lastmod,
+        page.headers.get("ETag"),
+        page.headers.get("Last-Modified"),
+        len(page.content) if page.status_code != 304 else None,
+        latency,
+    )
+    return page.status_code != 304
 
-            if page.status_code >= 400:
-                raise requests.HTTPError(f"HTTP {page.status_code}")
 
+def print_summary(store):
+    counts = store.counts()
+    summary = ", ".join(f"{state}: {counts.get(state, 0)}" for state in (DONE, FAILED, PENDING, IN_FLIGHT))
+    print(f"Job store totals - {summary}")
+
+
+def run_scraper(
+    sitemap_url,
+    save_dir,
+    sleep_between_requests,
+    max_retries,
+    backoff_factor,
+    job_db,
+    incremental=False,
+    retry_failed=False,
+    storage="files",
+    compression="gzip",
+):
+    # Define the directory to save the downloaded HTML files
+    save_dir.mkdir(parents=True, exist_ok=True)
+    store = open_job_store(save_dir, job_db)
+    html_store = open_html_store(save_dir, storage, compression)
+
+    session = build_session(max_retries, backoff_factor)
+
+    if retry_failed:
+        entries = store.failed_entries()
+        print(f"Retrying {len(entries)} failed documents...\n")
+    else:
+        entries = sitemap_entries(session, sitemap_url)
+        print("Reading sitemap and downloading documents...\n")
+
+    index = 0
+    for index, (url, lastmod) in enumerate(entries, start=1):
+        print(f"Processing: {url}")
+
+        # Save the page content as an HTML document named after its id
+        doc_id = doc_id_from_url(url)
+        file_name = f"{doc_id}.html"
+
+        # Skip already downloaded documents to allow resume (unchanged ones in incremental mode)
+        headers = request_headers(store, doc_id, lastmod, incremental)
+        if headers is None:
+            print(f"[{index}] Skipping existing: {file_name}")
+            continue
+
+        try:
+            written = download_document(
+                store,
+                html_store,
+                lambda: fetch_document(session, url, headers),
+                url,
+                doc_id,
+                lastmod,
+            )
         except Exception as e:
             print("Error opening the page:", e)
-            with open(failed_log, "a", encoding="utf-8") as log_file:
-                log_file.write(f"{url}\t{e}\n")
             continue
 
-        # Write the HTML content to the file
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(page.text)
-
-        print(f"[{index}/{len(urls)}] Saved as {file_name}\n")
+        if written:
+            print(f"[{index}] Saved as {file_name}\n")
+        else:
+            print(f"[{index}] Not modified: {file_name}")
 
         time.sleep(sleep_between_requests)
 
-    print("Scraping finished.")
+    print(f"Scraping finished. Documents processed: {index}")
+    print_summary(store)
+    store.close()
+    html_store.close()
+
+
+# Concurrent variant of run_scraper: keeps up to `concurrency` downloads in flight while a shared
+# RateLimiter enforces a global requests-per-second budget instead of a per-document sleep.
+# Retry/backoff, skip-existing and the job store behave exactly as in the serial scraper.
+# With adaptive=True an AdaptiveThrottle tunes rate and concurrency from the server's answers
+# (starting at `rate`, never above `max_rate` or `concurrency`).
+def run_concurrent_scraper(
+    sitemap_url,
+    save_dir,
+    concurrency,
+    rate,
+    max_retries,
+    backoff_factor,
+    job_db,
+    adaptive=False,
+    max_rate=None,
+    incremental=False,
+    retry_failed=False,
+    storage="files",
+    compression="gzip",
+):
+    save_dir.mkdir(parents=True, exist_ok=True)
+    store = open_job_store(save_dir, job_db)
+    html_store = open_html_store(save_dir, storage, compression)
+
+    if retry_failed:
+        entries = store.failed_entries()
+        print(f"Retrying {len(entries)} failed documents...")
+    else:
+        entries = sitemap_entries(build_session(max_retries, backoff_factor), sitemap_url)
+
+    if adaptive:
+        max_rate = max_rate or max(rate, 1.0) * 10
+        throttle = AdaptiveThrottle(rate if rate > 0 else max_rate, max_rate, concurrency)
+        # 429/5xx are retried by fetch_document_throttled, through the throttle, not by urllib3.
+        status_forcelist = RETRY_STATUSES
+        respect_retry_after = False
+        status_retries = 0
+        print(f"Downloading with up to {concurrency} workers, adaptive rate starting at {throttle.rate} requests/s...\n")
+    else:
+        limiter = RateLimiter(rate)
+        # 429/5xx are retried by fetch_document_limited, through the limiter, not by urllib3.
+        status_forcelist = RETRY_STATUSES
+        respect_retry_after = False
+        status_retries = 0
+        print(f"Downloading with {concurrency} workers at up to {rate} requests/s...\n")
+
+    local = threading.local()
+
+    # requests.Session is not guaranteed to be thread-safe, so each worker keeps its own.
+    def worker_session():
+        if not hasattr(local, "session"):
+            local.session = build_session(
+                max_retries,
+                backoff_factor,
+                status_forcelist=status_forcelist,
+                respect_retry_after=respect_retry_after,
+                status_retries=status_retries,
+            )
+        return local.session
+
+    def fetch(url, headers):
+        if adaptive:
+            return fetch_document_throttled(worker_session(), url, throttle, max_retries, backoff_factor, headers)
+        return fetch_document_limited(worker_session(), url, limiter, max_retries, backoff_factor, headers)
+
+    def download(url, doc_id, lastmod, headers):
+        return download_document(store, html_store, lambda: fetch(url, headers), url, doc_id, lastmod)
+
+    saved = 0
+    failed = 0
+    skipped = 0
+
+    def collect(done):
+        nonlocal saved, failed, skipped
+        for future in done:
+            url, file_name = pending.pop(future)
+            try:
+                written = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Error opening the page {url}:", e)
+                continue
+            if not written:
+                skipped += 1
+                print(f"[{saved + failed + skipped}] Not modified: {file_name}")
+                continue
+            saved += 1
+            print(f"[{saved + failed + skipped}] Saved as {file_name}")
+
+    pending = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for url, lastmod in entries:
+            doc_id = doc_id_from_url(url)
+            file_name = f"{doc_id}.html"
+
+            # Skip already downloaded documents to allow resume (unchanged ones in incremental mode)
+            headers = request_headers(store, doc_id, lastmod, incremental)
+            if headers is None:
+                skipped += 1
+                continue
+
+            # Keep the queue short so progress and failures are reported as they happen
+            if len(pending) >= concurrency * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+            store.mark_pending(doc_id, url, lastmod)
+            pending[executor.submit(download, url, doc_id, lastmod, headers)] = (url, file_name)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    print(f"\nScraping finished. Saved: {saved}, skipped: {skipped}, failed: {failed}")
+    print_summary(store)
+    store.close()
+    html_store.close()
 
 
 def main():
-    
+
     # Set up command-line argument parsing for flexible configuration of the scraper
     parser = argparse.ArgumentParser(
         description="Download HTML documents from SUIN sitemap"
@@ -121,7 +426,7 @@ def main():
     parser.add_argument(
         "--sitemap",
         default="https://www.suin-juriscol.gov.co/sitemapleyes.xml",
-        help="Sitemap URL",
+        help="Sitemap or sitemap index URL",
     )
 
     parser.add_argument(
@@ -152,20 +457,99 @@ def main():
     )
 
     parser.add_argument(
-        "--failed-log",
-        default="failed_downloads.txt",
-        help="File to log failed downloads",
+        "--job-db",
+        default=None,
+        help=f"SQLite job store tracking every document's state (default: <output>/{JOB_DB_NAME})",
+    )
+
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Only retry the documents recorded as failed in the job store",
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of concurrent downloads; values above 1 enable the concurrent engine (default: 1)",
+    )
+
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=2.0,
+        help="Global requests per second for the concurrent engine, 0 for unlimited (default: 2.0)",
+    )
+
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Tune rate and concurrency from 429/503 answers, Retry-After headers and latency; "
+             "uses the concurrent engine even with --concurrency 1",
+    )
+
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=None,
+        help="Upper bound for the adaptive rate in requests per second (default: 10x --rate)",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Re-check documents already downloaded: skip those whose sitemap lastmod is unchanged "
+             "and fetch the rest with conditional GETs",
+    )
+
+    parser.add_argument(
+        "--storage",
+        choices=["files", "shards"],
+        default="files",
+        help="Save one HTML file per document, or append pages to compressed, de-duplicated shard files (default: files)",
+    )
+
+    parser.add_argument(
+        "--compression",
+        choices=["gzip", "zstd"],
+        default="gzip",
+        help="Compression for --storage shards; zstd needs the zstandard package (default: gzip)",
     )
 
     args = parser.parse_args()
+    save_dir = Path(args.output)
+    job_db = Path(args.job_db) if args.job_db else save_dir / JOB_DB_NAME
+
+    if args.concurrency > 1 or args.adaptive:
+        run_concurrent_scraper(
+            sitemap_url=args.sitemap,
+            save_dir=save_dir,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            max_retries=args.max_retries,
+            backoff_factor=args.backoff,
+            job_db=job_db,
+            adaptive=args.adaptive,
+            max_rate=args.max_rate,
+            incremental=args.incremental,
+            retry_failed=args.retry_failed,
+            storage=args.storage,
+            compression=args.compression,
+        )
+        return
 
     run_scraper(
         sitemap_url=args.sitemap,
-        save_dir=Path(args.output),
+        save_dir=save_dir,
         sleep_between_requests=args.sleep,
         max_retries=args.max_retries,
         backoff_factor=args.backoff,
-        failed_log=Path(args.failed_log),
+        job_db=job_db,
+        incremental=args.incremental,
+        retry_failed=args.retry_failed,
+        storage=args.storage,
+        compression=args.compression,
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+# zstd compression
+try:
+    import zstandard
+    ZSTD_SUPPORT = True
+except ImportError:
+    ZSTD_SUPPORT = False
+
+CACHE_NAME = "extraction_cache.sqlite3"
+
+# Pages stored (and decompressed) together, so a cached document can be read back a chunk at a
+# time by the streaming mode
+CHUNK_PAGES = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    key TEXT PRIMARY KEY,
+    pages INTEGER NOT NULL,
+    chunks INTEGER NOT NULL,
+    raw_length INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    created_at REAL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    key TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    codec TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (key, chunk)
+);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    source_key TEXT NOT NULL,
+    content_hash TEXT NOT NULL
+);
+"""
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Raw page texts extracted from each PDF, keyed by the SHA-256 of the file and the extractor
+# version, so a run that only changes the cleaning rules reads the text back instead of
+# extracting it again. Pages are stored CHUNK_PAGES at a time as compressed JSON lists (zstd
+# when installed, gzip otherwise); a document only counts as cached once all of its chunks
+# are written. The hash of each path is remembered with its size and mtime, so unchanged
+# files are not read again to hash them.
+class ExtractionCache:
+
+    def __init__(self, path: Path, version: str):
+        self.path = path
+        self.version = version
+        self.codec = "zstd" if ZSTD_SUPPORT else "gzip"
+        self.hits = 0
+        self.misses = 0
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(path / CACHE_NAME))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def decompress(self, codec: str, data: bytes) -> bytes:
+        if codec == "zstd":
+            if not ZSTD_SUPPORT:
+                raise ImportError("zstandard is not installed. Install it with: pip install zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    # Cache key of a PDF: content hash plus extractor version
+    def key(self, pdf_path: str) -> str:
+        path = Path(pdf_path).resolve()
+        stat = path.stat()
+        source_key = f"{stat.st_size}:{stat.st_mtime_ns}"
+
+        row = self.conn.execute(
+            "SELECT source_key, content_hash FROM sources WHERE path = ?", (str(path),)
+        ).fetchone()
+        if row and row[0] == source_key:
+            digest = row[1]
+        else:
+            digest = file_hash(path)
+            self.conn.execute(
+                "INSERT INTO sources (path, source_key, content_hash) VALUES (?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET source_key = excluded.source_key, "
+                "content_hash = excluded.content_hash",
+                (str(path), source_key, digest),
+            )
+            self.conn.commit()
+        return f"{digest}:{self.version}"
+
+    # Page texts of a cached document, a chunk at a time, or None when it is not cached
+    def iter_pages(self, key: str):
+        row = self.conn.execute("SELECT chunks FROM documents WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._iter_chunks(key, row[0])
+
+    def _iter_chunks(self, key: str, chunks: int):
+        for chunk in range(chunks):
+            codec, data = self.conn.execute(
+                "SELECT codec, data FROM chunks WHERE key = ? AND chunk = ?", (key, chunk)
+            ).fetchone()
+            yield from json.loads(self.decompress(codec, data).decode("utf-8"))
+
+    # Passes the page texts through while storing them; the document is recorded once the
+    # last page has gone through, so an interrupted extraction is never read back
+    def store_pages(self, key: str, pages):
+        sizes = []
+
+        def write_chunk(chunk):
+            data = json.dumps(chunk, ensure_ascii=False).encode("utf-8")
+            blob = self.compress(data)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO chunks (key, chunk, codec, data) VALUES (?, ?, ?, ?)",
+                (key, len(sizes), self.codec, blob),
+            )
+            sizes.append((len(chunk), len(data), len(blob)))
+
+        chunk = []
+        for text in pages:
+            chunk.append(text)
+            if len(chunk) == CHUNK_PAGES:
+                write_chunk(chunk)
+                chunk = []
+            yield text
+        if chunk or not sizes:
+            write_chunk(chunk)
+
+        page_count, raw_length, length = (sum(column) for column in zip(*sizes))
+        self.conn.execute("DELETE FROM chunks WHERE key = ? AND chunk >= ?", (key, len(sizes)))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO documents (key, pages, chunks, raw_length, length, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, page_count, len(sizes), raw_length, length, time.time()),
+        )
+        self.conn.commit()
+
+    # Stores a whole list of page texts
+    def put(self, key: str, pages):
+        for _ in self.store_pages(key, pages):
+            pass
+
+    def summary(self) -> str:
+        documents, raw_length, length = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_length), 0), COALESCE(SUM(length), 0) FROM documents"
+        ).fetchone()
+        return (
+            f"Extraction cache: {self.hits} hits, {self.misses} misses "
+            f"({documents} documents, {raw_length / 1e6:.1f}MB of text in {length / 1e6:.1f}MB)"
+        )
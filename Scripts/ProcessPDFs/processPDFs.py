@@ -1,9 +1,15 @@
 import re
 import os
+import time
+from collections import deque
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Optional
 import argparse
 from Scripts.ProcessPDFs.cleaningPatterns import PATTERNS
+from Scripts.ProcessPDFs.extraction_cache import ExtractionCache
+from Scripts.TextRules.rule_engine import FusedRule, Rewrite, Rule, RulePipeline, RuleProfile, RuleStats
 
 # PDF processing
 try:
@@ -12,12 +18,189 @@ try:
 except ImportError:
     PDF_SUPPORT = False
 
+# PDFs with more pages than this are split into page ranges across workers; smaller ones are
+# extracted whole by a single worker
+PAGES_PER_TASK = 32
+
+
+# Version of the text extractor, part of the extraction cache key: a pdfium upgrade can change
+# the extracted text, so its cached pages are not reused.
+def extractor_version() -> str:
+    if not PDF_SUPPORT:
+        raise ImportError("pypdfium2 is not installed. Install it with: pip install pypdfium2")
+    return f"pdfium {pdfium.PDFIUM_INFO}, pypdfium2 {pdfium.PYPDFIUM_INFO}"
+
+
+# Text of pages [start, stop) of a PDF (all pages by default), one string per page, yielded
+# as each page is extracted.
+def iter_page_texts(pdf_path: str, start: int = 0, stop: Optional[int] = None):
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        for page_num in range(start, len(pdf) if stop is None else stop):
+            page = pdf[page_num]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range()
+            textpage.close()
+            page.close()
+            yield text
+    finally:
+        pdf.close()
+
+
+# Text of pages [start, stop) of a PDF as a list.
+# Also the worker entry point of the parallel mode: pdfium is not thread-safe, so every
+# process opens its own copy of the document.
+def extract_page_range(pdf_path: str, start: int = 0, stop: Optional[int] = None) -> List[str]:
+    return list(iter_page_texts(pdf_path, start, stop))
+
+
+# Page ranges for one PDF: at most one per worker and none smaller than PAGES_PER_TASK.
+def page_ranges(page_count: int, workers: int, pages_per_task: int = PAGES_PER_TASK):
+    size = max(pages_per_task, -(-page_count // workers))
+    if page_count <= size:
+        return [(0, None)]
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+# A literal phrase, optionally removed up to the end of its line
+PLAIN_PATTERN = re.compile(r'([^\\.^$*+?{}\[\]|()]+)(\.\*)?')
+
+
+# Whether occurrences of two phrases can overlap without being the same occurrence: one
+# contains the other or a suffix of one is a prefix of the other (case-insensitively).
+def phrases_overlap(first: str, second: str) -> bool:
+    first, second = first.lower(), second.lower()
+    if first == second:
+        return False
+    if first in second or second in first:
+        return True
+    return any(
+        first[-size:] == second[:size] or second[-size:] == first[:size]
+        for size in range(1, min(len(first), len(second)))
+    )
+
+
+# Steps removing PATTERNS, one category after the other, all with the same flags.
+# Consecutive plain phrases of a category (optionally followed by ".*") that cannot overlap
+# are removed in one alternation pass. Taking the leftmost phrase of the alternation then
+# removes what the patterns remove one by one, except when a removal joins the two halves of
+# another phrase; the pass detects that and redoes the group pattern by pattern.
+# Patterns that start and end with ".*" only ever match from a line start, so they are
+# anchored there instead of being retried from every character of the line.
+# Every other pattern keeps its own pass and its place in the order.
+def pattern_steps(patterns, flags=re.IGNORECASE | re.MULTILINE):
+    steps = []
+    for category, category_patterns in patterns.items():
+        run = []
+        for index, pattern in enumerate(category_patterns):
+            rule = Rule(f"{category}[{index}]", pattern, '', flags)
+            plain = PLAIN_PATTERN.fullmatch(pattern)
+            if plain and not any(phrases_overlap(plain.group(1), phrase) for _, _, phrase in run):
+                run.append((index, rule, plain.group(1)))
+                continue
+
+            steps.extend(fuse_patterns(category, run))
+            run = []
+            if plain:
+                run.append((index, rule, plain.group(1)))
+            elif pattern.startswith('.*') and pattern.endswith('.*'):
+                steps.append(Rewrite(rule.name, '^' + pattern, '', [rule], flags))
+            else:
+                steps.append(rule)
+        steps.extend(fuse_patterns(category, run))
+    return steps
+
+
+# One step for a run of (index, rule, phrase) of a category: the rule itself or their alternation
+def fuse_patterns(category: str, run):
+    if len(run) < 2:
+        return [rule for _, rule, _ in run]
+    return [FusedRule(f"{category}[{run[0][0]}-{run[-1][0]}]", [rule for _, rule, _ in run], recheck=True)]
+
+
+# Index marker: everything before its first occurrence is navigation and is dropped
+INDEX_MARKER = re.compile(r'Í\s*N\s*D\s*I\s*C\s*E\s*\[Mostrar\]', re.IGNORECASE)
+
+# SUIN-Juriscol disclaimer, from its opening sentence to the next "Ministerio"
+SUIN_DISCLAIMER = re.compile(
+    r'Los datos publicados en SUIN-Juriscol'
+    r'[\s\S]*?'
+    r'(Ministerio\.?)',
+    re.IGNORECASE
+)
+DISCLAIMER_START = re.compile(r'Los datos publicados en SUIN-Juriscol', re.IGNORECASE)
+
+# Ordinals accepted after "Parágrafo"
+PARAGRAPH_ORDINAL = r'(?:\d+[º°]?|Primero|Segundo|Tercero|Cuarto|Quinto|Sexto|S[ée]ptimo|Octavo|Noveno|D[ée]cimo|transitorio\s+\d+[º°]?)'
+
+# Repairs of article and paragraph numbering split across lines, applied in order
+LEGAL_STRUCTURE_FIXES = [
+    # Broken article numbering (e.g., "Artículo 1\n." -> "Artículo 1.")
+    (r'(Art[ií]culo\s+\d+[º°]?)\s*\n\s*\.', r'\g<1>.'),
+    # The dot on its own line
+    (r'(Art[ií]culo\s+\d+[º°]?)\s*\n\s*\.\s*\n', r'\g<1>.\n'),
+    # Broken paragraph with ordinal number (e.g., "Parágrafo\n1º" -> "Parágrafo 1º")
+    (rf'(Par[áa]grafo)\s*\n\s*({PARAGRAPH_ORDINAL})', r'\g<1> \g<2>'),
+    # Paragraph with ordinal and dot on separate line (e.g., "Parágrafo 1º\n." -> "Parágrafo 1º.")
+    (rf'(Par[áa]grafo\s+{PARAGRAPH_ORDINAL})\s*\n\s*\.', r'\g<1>.'),
+    # The dot on its own line for paragraphs
+    (rf'(Par[áa]grafo\s+{PARAGRAPH_ORDINAL})\s*\n\s*\.\s*\n', r'\g<1>.\n'),
+]
+
+# Newlines added around a leading article, chapter, paragraph or "DECRETA:" so they are
+# recognized as separate sections. The patterns are not MULTILINE: they only apply at the
+# start of the document.
+SECTION_BREAKS = {
+    r'^\s*Art[ií]culo\s+\d+[º°]?\.?': r'\n\n\g<0>\n',
+    r'^\s*Cap[ií]tulo\s+[IVXLC]+': r'\n\n\g<0>\n',
+    rf'^\s*Par[áa]grafo(\s+{PARAGRAPH_ORDINAL})?\.?': r'\n\g<0>\n',
+    r'^\s*DECRETA:': r'\n\nDECRETA:\n'
+}
+
+# Streaming mode splits the text at line breaks between a sentence line and a capitalized line
+# (see DocumentCleaner.is_stream_break): no cleaning step can match across them, so the
+# pieces on both sides are cleaned on their own.
+STREAM_BREAK = re.compile(r'(?<=[a-záéíóúñ]{2}\.)\r?\n(?=[A-ZÁÉÍÓÚÑ][a-záéíóúñ])')
+PLAIN_LINE = re.compile(r'[A-Za-zÁÉÍÓÚÑáéíóúñü ,;]*[a-záéíóúñ]{2}\.')
+
 
 class DocumentCleaner:
 
-    def __init__(self):
+    def __init__(self, rule_stats: bool = False, profile_rules: bool = False, workers: int = 1,
+                 stream: bool = False, cache_dir: Optional[str] = None):
         # Common patterns to remove
         self.patterns = PATTERNS
+
+        # Removal patterns compiled once into as few passes as keep their order (pattern_steps);
+        # each pass is skipped on documents that lack the literals it needs
+        self.pattern_rules = RulePipeline(pattern_steps(self.patterns))
+
+        # Per-pattern skip/apply counters for the run, if requested
+        self.stats = RuleStats() if rule_stats else None
+
+        # Per-pattern timings, substitutions and characters removed, if requested
+        self.profile = RuleProfile() if profile_rules else None
+
+        # Extraction processes; 1 extracts in this process
+        self.workers = workers
+
+        # Pool of those processes, started on first use and shared by every PDF of the run
+        self.executor = None
+
+        # Extract, clean and write documents a few pages at a time
+        self.stream = stream
+
+        # Raw page texts of PDFs already extracted, if a cache directory is given
+        self.cache = ExtractionCache(Path(cache_dir), extractor_version()) if cache_dir else None
+
+        # Every cleaning regex, and the words of their patterns, checked by is_stream_break
+        self.stream_guards = [INDEX_MARKER, DISCLAIMER_START] + [
+            re.compile(pattern, re.IGNORECASE) for pattern in chain(
+                (pattern for pattern, _ in LEGAL_STRUCTURE_FIXES), SECTION_BREAKS
+            )
+        ] + [rule.regex for rule in self.pattern_rules.rules]
+        sources = ' '.join(regex.pattern for regex in self.stream_guards).lower()
+        self.stream_guard_words = tuple(sorted(set(re.findall(r'[a-záéíóúñ]{3,}', sources))))
     
     # Normalize whitespace: collapse multiple spaces, tabs, and newlines into a single space or newline.
     def normalize_whitespace(self, text: str) -> str:
@@ -40,117 +223,263 @@ class DocumentCleaner:
 
     # Auxiliary function to cut text before the index section, which often contains navigation and UI elements.
     def cut_before_index(self, text: str) -> str:
-        pattern = r'Í\s*N\s*D\s*I\s*C\s*E\s*\[Mostrar\]'
-        match = re.search(pattern, text, flags=re.IGNORECASE)
+        match = INDEX_MARKER.search(text)
         if match:
             return text[match.end():]
         return text
 
     # Auxiliary function to remove the SUIN-Juriscol disclaimer that appears at the end of documents, which is not relevant for content and can be very long.
     def remove_suin_disclaimer(self, text: str) -> str:
-        pattern = (
-            r'Los datos publicados en SUIN-Juriscol'
-            r'[\s\S]*?'
-            r'(Ministerio\.?)'
-        )
-        return re.sub(pattern, '', text, flags=re.IGNORECASE)
+        return SUIN_DISCLAIMER.sub('', text)
 
     # Auxiliary function to protect legal structure elements like article and paragraph numbering from being broken by cleaning steps. This is crucial to maintain the integrity of the legal document's structure.
-    def protect_legal_structure(self, text: str) -> str:
-        # Fix broken article numbering (e.g., "Artículo 1\n." -> "Artículo 1.")
-        text = re.sub(r'(Art[ií]culo\s+\d+[º°]?)\s*\n\s*\.', r'\g<1>.', text, flags=re.IGNORECASE)
-        
-        # Fix cases where the dot is on its own line
-        text = re.sub(r'(Art[ií]culo\s+\d+[º°]?)\s*\n\s*\.\s*\n', r'\g<1>.\n', text, flags=re.IGNORECASE)
-        
-        # Fix broken paragraph with ordinal number (e.g., "Parágrafo\n1º" -> "Parágrafo 1º")
-        text = re.sub(
-            r'(Par[áa]grafo)\s*\n\s*(\d+[º°]?|Primero|Segundo|Tercero|Cuarto|Quinto|Sexto|S[ée]ptimo|Octavo|Noveno|D[ée]cimo|transitorio\s+\d+[º°]?)',
-            r'\g<1> \g<2>',
-            text,
-            flags=re.IGNORECASE
-        )
-        
-        # Fix paragraph with ordinal and dot on separate line (e.g., "Parágrafo 1º\n." -> "Parágrafo 1º.")
-        text = re.sub(
-            r'(Par[áa]grafo\s+(?:\d+[º°]?|Primero|Segundo|Tercero|Cuarto|Quinto|Sexto|S[ée]ptimo|Octavo|Noveno|D[ée]cimo|transitorio\s+\d+[º°]?))\s*\n\s*\.',
-            r'\g<1>.',
-            text,
-            flags=re.IGNORECASE
-        )
-        
-        # Fix cases where the dot is on its own line for paragraphs
-        text = re.sub(
-            r'(Par[áa]grafo\s+(?:\d+[º°]?|Primero|Segundo|Tercero|Cuarto|Quinto|Sexto|S[ée]ptimo|Octavo|Noveno|D[ée]cimo|transitorio\s+\d+[º°]?))\s*\n\s*\.\s*\n',
-            r'\g<1>.\n',
-            text,
-            flags=re.IGNORECASE
-        )
-        
-        # Add newlines before articles, chapters, paragraphs, and "DECRETA:" to ensure they are recognized as separate sections. This helps maintain the logical structure of the document and improves readability.
-        patterns = {
-            r'^\s*Art[ií]culo\s+\d+[º°]?\.?': r'\n\n\g<0>\n',
-            r'^\s*Cap[ií]tulo\s+[IVXLC]+': r'\n\n\g<0>\n',
-            r'^\s*Par[áa]grafo(\s+(?:\d+[º°]?|Primero|Segundo|Tercero|Cuarto|Quinto|Sexto|S[ée]ptimo|Octavo|Noveno|D[ée]cimo|transitorio\s+\d+[º°]?))?\.?': r'\n\g<0>\n',
-            r'^\s*DECRETA:': r'\n\nDECRETA:\n'
-        }
-
-        for p, rpl in patterns.items():
+    # section_breaks=False skips the breaks added at the start of the document (for streamed pieces after the first).
+    def protect_legal_structure(self, text: str, section_breaks: bool = True) -> str:
+        for p, rpl in LEGAL_STRUCTURE_FIXES:
             text = re.sub(p, rpl, text, flags=re.IGNORECASE)
 
+        if section_breaks:
+            for p, rpl in SECTION_BREAKS.items():
+                text = re.sub(p, rpl, text, flags=re.IGNORECASE)
+
         return text
     
     # Main function to clean text by applying all cleaning steps in a logical order. This function ensures that the document is cleaned while preserving the essential legal structure and content, making it suitable for use in RAG systems.
-    def clean_text(self, text: str) -> str:
+    # reference=True applies PATTERNS one by one, without the combined passes (same output).
+    def clean_text(self, text: str, reference: bool = False) -> str:
         
         text = text.replace('\r\n', '\n').replace('\r', '\n')
         text = self.cut_before_index(text)
         text = self.remove_suin_disclaimer(text)
-        text = self.protect_legal_structure(text)
+
+        return self.clean_body(text, reference=reference).strip()
+
+    # Cleaning steps after the index cut and the disclaimer removal
+    def clean_body(self, text: str, section_breaks: bool = True, reference: bool = False) -> str:
+        text = self.protect_legal_structure(text, section_breaks)
         
-        for _, patterns in self.patterns.items():
-            for pattern in patterns:
-                text = re.sub(
-                    pattern,
-                    '',
-                    text,
-                    flags=re.IGNORECASE | re.MULTILINE
-                )
+        if reference:
+            text = self.pattern_rules.apply_reference(text)
+        else:
+            text = self.pattern_rules.apply(text, self.stats, self.profile)
 
         text = self.normalize_whitespace(text)
-        text = self.remove_short_lines(text)
+        return self.remove_short_lines(text)
+
+    # Whether the stream can be split after this line (followed by a capitalized line, see
+    # STREAM_BREAK). The line must be a plain sentence of three or more words that no cleaning
+    # pattern matches, so it reaches the end of every step unchanged and still ends in
+    # "xx." followed by a line break; no pattern matches across that. Its first word must not
+    # begin with a word of any pattern, so no match from the lines above can run into it.
+    def is_stream_break(self, line: str) -> bool:
+        if not PLAIN_LINE.fullmatch(line):
+            return False
+        words = line.split()
+        if len(words) < 3 or words[0].lower().startswith(self.stream_guard_words):
+            return False
+        return not any(regex.search(line) for regex in self.stream_guards)
+
+    # Joins the page texts as extraction does and splits the result at the last stream break
+    # found after each page. Yields the pieces in order; only the text since the last break
+    # is kept.
+    def iter_stream_segments(self, pages):
+        buffer = None
+        searched = 0
+        for page in pages:
+            buffer = page if buffer is None else buffer + '\n\n' + page
+
+            breaks = list(STREAM_BREAK.finditer(buffer, searched))
+            for match in reversed(breaks):
+                start = match.start()
+                if self.is_stream_break(buffer[buffer.rfind('\n', 0, start) + 1:start]):
+                    yield buffer[:start]
+                    buffer = buffer[match.end():]
+                    break
+            # The line break and the two characters after it decide whether it is a candidate
+            searched = max(len(buffer) - 3, 0)
+
+        if buffer is not None:
+            yield buffer
 
-        return text.strip()
+    # Streaming clean_text over the page texts of a document. Yields (restart, text) pieces;
+    # joining the non-empty ones with "\n" gives clean_text of the whole document. restart is
+    # True when the index marker is found: the pieces before it are to be discarded. A piece
+    # holding the start of a disclaimer is cleaned together with the next ones, up to the
+    # "Ministerio" that closes it.
+    def iter_clean_text(self, pages):
+        index_found = False
+        first = True
+        carried = ''
+
+        segments = self.iter_stream_segments(pages)
+        segment = next(segments, None)
+        while segment is not None:
+            following = next(segments, None)
+
+            text = (carried + segment).replace('\r\n', '\n').replace('\r', '\n')
+            restart = False
+            if not index_found:
+                match = INDEX_MARKER.search(text)
+                if match:
+                    text = text[match.end():]
+                    restart = True
+            text = self.remove_suin_disclaimer(text)
+
+            if following is not None and DISCLAIMER_START.search(text):
+                carried += segment + '\n'
+            else:
+                carried = ''
+                index_found = index_found or restart
+                yield restart, self.clean_body(text, section_breaks=first or restart)
+                first = False
+            segment = following
 
     # Generate a report of cleaning results
     def cleaning_report(self, original: str, cleaned: str) -> dict:
+        return self.cleaning_report_counts(len(original), len(cleaned))
+
+    # Same report from character counts
+    def cleaning_report_counts(self, original_chars: int, cleaned_chars: int) -> dict:
         return {
-            'original_chars': len(original),
-            'cleaned_chars': len(cleaned),
+            'original_chars': original_chars,
+            'cleaned_chars': cleaned_chars,
             'reduction_ratio': round(
-                1 - len(cleaned) / max(len(original), 1), 4
+                1 - cleaned_chars / max(original_chars, 1), 4
             )
         }
 
-    # Extract text from PDF using PyPDFium2.
+    def print_cleaning_report(self, input_path: str, report: dict):
+        print(f"\n Cleaning report for {input_path}:")
+        print(f"  Original characters: {report['original_chars']}")
+        print(f"  Cleaned characters : {report['cleaned_chars']}")
+        print(f"  Reduction ratio    : {report['reduction_ratio']}")
+
+    # Prints the cache hits and misses of the run and closes the cache, if there is one, and
+    # shuts down the extraction pool
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.cache is not None:
+            print(f"\n{self.cache.summary()}")
+            self.cache.close()
+            self.cache = None
+
+    # Extract text from PDF using PyPDFium2. With several workers, the pages of a large PDF
+    # are extracted in parallel ranges. With a cache, a PDF already extracted is read back.
     def extract_text_from_pdf(self, pdf_path: str) -> str:
 
         if not PDF_SUPPORT:
             raise ImportError("pypdfium2 is not installed. Install it with: pip install pypdfium2")
-        
+
+        if self.cache is not None:
+            key = self.cache.key(pdf_path)
+            cached = self.cache.iter_pages(key)
+            if cached is not None:
+                return '\n\n'.join(cached)
+
+        if self.workers > 1:
+            pages = self._submit_extraction(pdf_path)()
+        else:
+            pages = extract_page_range(pdf_path)
+
+        if self.cache is not None:
+            self.cache.put(key, pages)
+        return '\n\n'.join(pages)
+
+    # The run's extraction pool, started the first time a PDF needs it
+    def extraction_pool(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    # Submits the page ranges of one PDF; returns a function that waits for them and gives
+    # back the page texts in order.
+    def _submit_extraction(self, pdf_path: str):
         pdf = pdfium.PdfDocument(pdf_path)
-        text_parts = []
-        
-        for page_num in range(len(pdf)):
-            page = pdf[page_num]
-            textpage = page.get_textpage()
-            text = textpage.get_text_range()
-            text_parts.append(text)
-            textpage.close()
-            page.close()
-        
+        page_count = len(pdf)
+        pdf.close()
+
+        futures = [
+            self.extraction_pool().submit(extract_page_range, pdf_path, start, stop)
+            for start, stop in page_ranges(page_count, self.workers)
+        ]
+        return lambda: [text for future in futures for text in future.result()]
+
+    # Page texts of a PDF, yielded as they are extracted (or read back from the cache, which
+    # stores them as they go by).
+    def iter_pdf_pages(self, pdf_path: str):
+        if not PDF_SUPPORT:
+            raise ImportError("pypdfium2 is not installed. Install it with: pip install pypdfium2")
+
+        if self.cache is None:
+            yield from self._iter_extracted_pages(pdf_path)
+            return
+
+        key = self.cache.key(pdf_path)
+        cached = self.cache.iter_pages(key)
+        if cached is not None:
+            yield from cached
+        else:
+            yield from self.cache.store_pages(key, self._iter_extracted_pages(pdf_path))
+
+    # With several workers, ranges of PAGES_PER_TASK pages are extracted a few ranges ahead of
+    # the one being consumed.
+    def _iter_extracted_pages(self, pdf_path: str):
+        if self.workers <= 1:
+            yield from iter_page_texts(pdf_path)
+            return
+
+        pdf = pdfium.PdfDocument(pdf_path)
+        page_count = len(pdf)
         pdf.close()
-        return '\n\n'.join(text_parts)
+
+        executor = self.extraction_pool()
+        in_flight = deque()
+        for start in range(0, page_count, PAGES_PER_TASK):
+            stop = min(start + PAGES_PER_TASK, page_count)
+            in_flight.append(executor.submit(extract_page_range, pdf_path, start, stop))
+            if len(in_flight) >= self.workers * 2:
+                yield from in_flight.popleft().result()
+
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+    # Extracts many PDFs across the worker pool, a few files ahead of the one being consumed:
+    # small PDFs run whole on one worker, large ones are split into page ranges. PDFs found in
+    # the cache are not submitted. Yields (path, text) in input order.
+    def iter_extracted_parallel(self, pdf_paths):
+        if not PDF_SUPPORT:
+            raise ImportError("pypdfium2 is not installed. Install it with: pip install pypdfium2")
+
+        in_flight = deque()
+        for pdf_path in pdf_paths:
+            in_flight.append((pdf_path, self._cached_or_submitted(pdf_path)))
+            if len(in_flight) >= self.workers * 2:
+                pdf_path, result = in_flight.popleft()
+                yield pdf_path, '\n\n'.join(result())
+
+        while in_flight:
+            pdf_path, result = in_flight.popleft()
+            yield pdf_path, '\n\n'.join(result())
+
+    # _submit_extraction through the cache: a hit reads the pages back, a miss stores them
+    # once the workers are done.
+    def _cached_or_submitted(self, pdf_path: str):
+        if self.cache is None:
+            return self._submit_extraction(pdf_path)
+
+        key = self.cache.key(pdf_path)
+        cached = self.cache.iter_pages(key)
+        if cached is not None:
+            return lambda: list(cached)
+
+        submitted = self._submit_extraction(pdf_path)
+        def result():
+            pages = submitted()
+            self.cache.put(key, pages)
+            return pages
+        return result
   
     # Funtion to process a single file.  
     def process_file(self, input_path: str, output_path: Optional[str] = None) -> str:
@@ -160,33 +489,107 @@ class DocumentCleaner:
         # Only process PDF files
         if file_ext != '.pdf':
             raise ValueError(f"Only PDF files are supported. Got: {file_ext}")
+
+        if self.stream:
+            return self.stream_file(input_path, output_path)
         
         # Extract text from PDF
         text = self.extract_text_from_pdf(input_path)
-        
+
+        return self.clean_and_save(input_path, text, output_path)
+
+    # Cleans the extracted text of one file, prints its report and saves it if an output path is given.
+    def clean_and_save(self, input_path: str, text: str, output_path: Optional[str] = None) -> str:
         # Clean text
         cleaned_text = self.clean_text(text)
         
         report = self.cleaning_report(text, cleaned_text)
-        print(f"\n Cleaning report for {input_path}:")
-        print(f"  Original characters: {report['original_chars']}")
-        print(f"  Cleaned characters : {report['cleaned_chars']}")
-        print(f"  Reduction ratio    : {report['reduction_ratio']}")
+        self.print_cleaning_report(input_path, report)
         
         # Save if output path provided
         if output_path:
-            # Change extension to .txt for output
-            output_path_obj = Path(output_path)
-            if output_path_obj.suffix == '.pdf':
-                output_path = str(output_path_obj.with_suffix('.txt'))
-            
-            os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else '.', exist_ok=True)
+            output_path = self.prepare_output_path(output_path)
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(cleaned_text)
             print(f" Processed: {input_path} -> {output_path}")
         
         return cleaned_text
+
+    # Change extension to .txt for output and create its directory
+    def prepare_output_path(self, output_path: str) -> str:
+        output_path_obj = Path(output_path)
+        if output_path_obj.suffix == '.pdf':
+            output_path = str(output_path_obj.with_suffix('.txt'))
+
+        os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else '.', exist_ok=True)
+        return output_path
+
+    # Streaming mode for one file: pages are cleaned as they are extracted (iter_clean_text)
+    # and written as soon as they are clean, so memory follows the page size rather than the
+    # document size. Writes the same text as clean_and_save; returns the output path.
+    def stream_file(self, input_path: str, output_path: Optional[str] = None) -> str:
+        if not output_path:
+            raise ValueError("Streaming mode writes to a file; an output path is required")
+        output_path = self.prepare_output_path(output_path)
+
+        page_sizes = []
+        def pages():
+            for text in self.iter_pdf_pages(input_path):
+                page_sizes.append(len(text))
+                yield text
+
+        cleaned_chars = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for restart, text in self.iter_clean_text(pages()):
+                if restart:
+                    f.seek(0)
+                    f.truncate()
+                    cleaned_chars = 0
+                if text:
+                    if cleaned_chars:
+                        f.write('\n')
+                        cleaned_chars += 1
+                    f.write(text)
+                    cleaned_chars += len(text)
+
+        # Pages are joined with a blank line, as in extract_text_from_pdf
+        original_chars = sum(page_sizes) + 2 * max(len(page_sizes) - 1, 0)
+        self.print_cleaning_report(input_path, self.cleaning_report_counts(original_chars, cleaned_chars))
+        print(f" Processed: {input_path} -> {output_path}")
+        return output_path
     
+    # Golden-output check: cleans every PDF of a directory with the compiled pattern passes and
+    # with PATTERNS applied one by one, and reports mismatches and timings. Nothing is written.
+    def compare_directory(self, input_dir: str) -> int:
+        total = 0
+        mismatches = 0
+        compiled_time = 0.0
+        reference_time = 0.0
+
+        for file_path in sorted(Path(input_dir).rglob('*.pdf')):
+            text = self.extract_text_from_pdf(str(file_path))
+            total += 1
+
+            start = time.perf_counter()
+            compiled = self.clean_text(text)
+            compiled_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            reference = self.clean_text(text, reference=True)
+            reference_time += time.perf_counter() - start
+
+            if compiled != reference:
+                mismatches += 1
+                print(f"MISMATCH {file_path}")
+
+        print(f"Documents compared: {total}")
+        print(f"Mismatches: {mismatches}")
+        print(f"Pattern-by-pattern cleaning: {reference_time:.2f}s")
+        print(f"Compiled cleaning: {compiled_time:.2f}s")
+        if compiled_time:
+            print(f"Speedup: {reference_time / compiled_time:.1f}x")
+        return mismatches
+
     # Function to process directory
     def process_directory(self, input_dir: str, output_dir: str, extensions: List[str] = ['.pdf']) -> Dict[str, str]:
         
@@ -196,6 +599,7 @@ class DocumentCleaner:
         processed_files = {}
         
         # Find all matching files
+        outputs = {}
         for ext in extensions:
             for file_path in input_path.rglob(f'*{ext}'):
                 # Calculate relative path
@@ -203,11 +607,26 @@ class DocumentCleaner:
                 out_file = output_path / rel_path
                 
                 # Change extension to .txt for PDF outputs
-                out_file = out_file.with_suffix('.txt')
-                
-                # Process file
-                self.process_file(str(file_path), str(out_file))
-                processed_files[str(file_path)] = str(out_file)
+                outputs[str(file_path)] = str(out_file.with_suffix('.txt'))
+
+        # Streaming mode extracts each file on its own, its pages across the workers
+        if self.workers > 1 and not self.stream:
+            # Only PDFs are extracted in the pool; anything else is rejected by process_file as before
+            pdf_files = [path for path in outputs if Path(path).suffix.lower() == '.pdf']
+            extracted = self.iter_extracted_parallel(pdf_files)
+            for file_path, out_file in outputs.items():
+                if Path(file_path).suffix.lower() != '.pdf':
+                    self.process_file(file_path, out_file)
+                else:
+                    _, text = next(extracted)
+                    self.clean_and_save(file_path, text, out_file)
+                processed_files[file_path] = out_file
+            return processed_files
+
+        for file_path, out_file in outputs.items():
+            # Process file
+            self.process_file(file_path, out_file)
+            processed_files[file_path] = out_file
         
         return processed_files
 
@@ -225,8 +644,7 @@ def main():
     )
     parser.add_argument(
         '--output', '-o',
-        required=True,
-        help='Output file or directory'
+        help='Output file or directory (required unless --compare)'
     )
     parser.add_argument(
         '--extensions', '-e',
@@ -234,13 +652,60 @@ def main():
         default=['.pdf'],
         help='File extensions to process (default: .pdf)'
     )
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=1,
+        help='Number of PDF extraction processes; large PDFs are split into page ranges (default: 1, no pool)'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Clean and write each document a few pages at a time as they are extracted, '
+             'so memory does not grow with the document size (same output)'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='Keep the raw text extracted from each PDF, compressed and keyed by file hash and '
+             'pdfium version, in this directory; later runs only re-run the cleaning'
+    )
+    parser.add_argument(
+        '--rule-stats',
+        action='store_true',
+        help='Print how often each cleaning pattern was skipped by its literal prefilter or applied'
+    )
+    parser.add_argument(
+        '--profile-rules',
+        help='Time every cleaning pattern on its own and write per-pattern time, substitutions and '
+             'characters removed to this file (.json or .csv), most expensive first'
+    )
+    
+    parser.add_argument(
+        '--compare',
+        action='store_true',
+        help='Check that the combined pattern passes clean every PDF of the input directory like '
+             'the patterns applied one by one, and time both; nothing is written'
+    )
     
     args = parser.parse_args()
+    if not args.compare and not args.output:
+        parser.error('--output is required unless --compare is given')
     
-    cleaner = DocumentCleaner()
+    cleaner = DocumentCleaner(
+        rule_stats=args.rule_stats,
+        profile_rules=bool(args.profile_rules),
+        workers=args.workers,
+        stream=args.stream,
+        cache_dir=args.cache_dir,
+    )
     
     # Check if input is file or directory
     input_path = Path(args.input)
+
+    if args.compare:
+        mismatches = cleaner.compare_directory(args.input)
+        cleaner.close()
+        return 1 if mismatches else 0
     
     if input_path.is_file():
         # Process single file
@@ -256,7 +721,16 @@ def main():
         print(f"\n Processed {len(processed)} documents successfully!")
     else:
         print(f"Error: {args.input} is not a valid file or directory")
+        cleaner.close()
         return 1
+
+    if cleaner.stats is not None:
+        print("\nCleaning patterns (documents skipped / applied / changed):")
+        print(cleaner.stats.summary())
+    if cleaner.profile is not None:
+        cleaner.profile.write(args.profile_rules)
+        print(f"\nCleaning pattern profile written to {args.profile_rules}")
+    cleaner.close()
     
     return 0
 
@@ -0,0 +1,325 @@
+import argparse
+import json
+import math
+import mmap
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+import zlib
+from array import array
+from collections import Counter
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from ProcessHTMLs.corpus_shards import INDEX_NAME as SHARD_INDEX_NAME, iter_records
+
+# Postings decoding and scoring
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+
+# Bump when tokenization or the file layout changes
+INDEX_VERSION = 1
+
+CATALOG_NAME = "index.sqlite3"
+POSTINGS_NAME = "postings.bin"
+LENGTHS_NAME = "doc_lengths.bin"
+
+# Header fields of the structured TXT files kept as filterable facets
+FACET_FIELDS = {"TIPO": "tipo", "ANIO": "anio", "ENTIDAD": "entidad", "ESTADO": "estado"}
+# Header fields shown with each hit
+DISPLAY_FIELDS = {"NUMERO": "numero"}
+
+K1 = 1.2
+B = 0.75
+
+WORD = re.compile(r"\w+")
+
+# Spanish function words: in almost every document, so they only add postings
+STOPWORDS = frozenset(
+    "a al como con de del el en es la las lo los no o para por que se sin su sus un una y".split()
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    doc_num INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    tipo TEXT,
+    numero TEXT,
+    anio TEXT,
+    entidad TEXT,
+    estado TEXT
+);
+CREATE INDEX IF NOT EXISTS docs_tipo ON docs (tipo);
+CREATE INDEX IF NOT EXISTS docs_anio ON docs (anio);
+CREATE INDEX IF NOT EXISTS docs_entidad ON docs (entidad);
+CREATE INDEX IF NOT EXISTS docs_estado ON docs (estado);
+"""
+
+
+def strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+# Lowercase words without accents, stopwords dropped; used for bodies and queries alike
+def tokenize(text: str):
+    return [word for word in WORD.findall(strip_accents(text.lower())) if word not in STOPWORDS]
+
+
+# Facet values are matched case- and accent-insensitively
+def normalize_facet(value: str) -> str:
+    return strip_accents(value or "").strip().upper()
+
+
+# Splits a structured TXT output into its header fields and the CONTENIDO body
+def parse_structured_text(text: str):
+    header, marker, body = text.partition("CONTENIDO:\n")
+    if not marker:
+        return {}, text
+    fields = {}
+    for line in header.splitlines():
+        key, _, value = line.partition(":")
+        fields[key] = value.strip()
+    return fields, body
+
+
+# (doc_id, source, fields, body) of every document to index: the TXT files of the input
+# directories, or the records of a corpus shard directory (written with --output-format)
+def iter_corpus(input_dirs):
+    for input_dir in input_dirs:
+        input_dir = Path(input_dir)
+        if (input_dir / SHARD_INDEX_NAME).exists():
+            for record in iter_records(input_dir):
+                fields = {label: str(record[field] if record[field] is not None else "")
+                          for label, field in {**FACET_FIELDS, **DISPLAY_FIELDS}.items()}
+                yield record["doc_id"], str(input_dir), fields, record["content"]
+            continue
+        for file_path in sorted(input_dir.glob("*.txt")):
+            fields, body = parse_structured_text(file_path.read_text(encoding="utf-8"))
+            yield file_path.stem, str(file_path), fields, body
+
+
+# Builds the index of a corpus in `index_dir`: the term dictionary and document facets in
+# index.sqlite3, the postings of every term in postings.bin (document-number gaps then term
+# frequencies, as uint32 arrays, zlib-compressed per term) and the token count of every
+# document in doc_lengths.bin. An earlier index in the directory is replaced.
+def build_index(input_dirs, index_dir: Path):
+    index_dir.mkdir(parents=True, exist_ok=True)
+    for name in (CATALOG_NAME, POSTINGS_NAME, LENGTHS_NAME):
+        (index_dir / name).unlink(missing_ok=True)
+
+    conn = sqlite3.connect(str(index_dir / CATALOG_NAME))
+    conn.executescript(SCHEMA)
+
+    postings = {}
+    lengths = array("I")
+    start = time.perf_counter()
+    for doc_num, (doc_id, source, fields, body) in enumerate(iter_corpus(input_dirs)):
+        tokens = tokenize(body)
+        lengths.append(len(tokens))
+        for term, frequency in Counter(tokens).items():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = (array("I"), array("I"))
+            entry[0].append(doc_num)
+            entry[1].append(frequency)
+        conn.execute(
+            "INSERT INTO docs (doc_num, doc_id, source, tipo, numero, anio, entidad, estado) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                doc_num, doc_id, source,
+                normalize_facet(fields.get("TIPO")),
+                fields.get("NUMERO", ""),
+                normalize_facet(fields.get("ANIO")),
+                normalize_facet(fields.get("ENTIDAD")),
+                normalize_facet(fields.get("ESTADO")),
+            ),
+        )
+
+    offset = 0
+    with open(index_dir / POSTINGS_NAME, "wb") as f:
+        for term in sorted(postings):
+            docs, frequencies = postings[term]
+            gaps = array("I", [docs[0]]) + array("I", (b - a for a, b in zip(docs, docs[1:])))
+            blob = zlib.compress(gaps.tobytes() + frequencies.tobytes(), 6)
+            f.write(blob)
+            conn.execute(
+                "INSERT INTO terms (term, df, offset, length) VALUES (?, ?, ?, ?)",
+                (term, len(docs), offset, len(blob)),
+            )
+            offset += len(blob)
+
+    with open(index_dir / LENGTHS_NAME, "wb") as f:
+        f.write(lengths.tobytes())
+
+    settings = {
+        "version": INDEX_VERSION,
+        "documents": len(lengths),
+        "average_length": sum(lengths) / len(lengths) if lengths else 0.0,
+        "terms": len(postings),
+    }
+    conn.executemany("INSERT INTO settings (key, value) VALUES (?, ?)",
+                     [(key, json.dumps(value)) for key, value in settings.items()])
+    conn.commit()
+    conn.close()
+
+    print(f"Indexed {settings['documents']} documents, {settings['terms']} terms "
+          f"({offset / 1e6:.1f}MB of postings) in {time.perf_counter() - start:.1f}s")
+    return settings
+
+
+# Read side of an index: the catalog in SQLite, postings and document lengths memory-mapped.
+# search() scores only the postings of the query terms, as numpy arrays.
+class SearchIndex:
+
+    def __init__(self, index_dir: Path):
+        if not NUMPY_SUPPORT:
+            raise ImportError("numpy is not installed. Install it with: pip install numpy")
+        self.index_dir = index_dir
+        self.conn = sqlite3.connect(str(index_dir / CATALOG_NAME))
+        self.settings = {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM settings")}
+        if self.settings.get("version") != INDEX_VERSION:
+            raise ValueError(f"{index_dir} was built by another index version; rebuild it")
+
+        self.documents = self.settings["documents"]
+        self.average_length = self.settings["average_length"] or 1.0
+        self.postings_file = open(index_dir / POSTINGS_NAME, "rb")
+        self.postings = (
+            mmap.mmap(self.postings_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.settings["terms"] else b""
+        )
+        self.lengths = (
+            np.memmap(index_dir / LENGTHS_NAME, dtype=np.uint32, mode="r")
+            if self.documents else np.zeros(0, dtype=np.uint32)
+        )
+
+    def close(self):
+        if isinstance(self.postings, mmap.mmap):
+            self.postings.close()
+        self.postings_file.close()
+        self.conn.close()
+
+    # (document numbers, term frequencies) of a term, or None if it is not indexed
+    def term_postings(self, term: str):
+        row = self.conn.execute("SELECT df, offset, length FROM terms WHERE term = ?", (term,)).fetchone()
+        if row is None:
+            return None
+        df, offset, length = row
+        values = np.frombuffer(zlib.decompress(self.postings[offset:offset + length]), dtype=np.uint32)
+        return np.cumsum(values[:df], dtype=np.int64), values[df:].astype(np.float64)
+
+    # Boolean mask of the documents whose facets match every given filter, or None for all
+    def facet_mask(self, filters):
+        conditions = [(field, normalize_facet(value)) for field, value in filters.items() if value]
+        if not conditions:
+            return None
+        where = " AND ".join(f"{field} = ?" for field, _ in conditions)
+        rows = self.conn.execute(f"SELECT doc_num FROM docs WHERE {where}", [value for _, value in conditions])
+        mask = np.zeros(self.documents, dtype=bool)
+        mask[np.fromiter((row[0] for row in rows), dtype=np.int64)] = True
+        return mask
+
+    # Top-k documents for a free-text query by BM25, restricted to the facet `filters`
+    # ({"tipo": "LEY", "anio": "1993", ...}). Returns dicts with the score and the document's
+    # id, source and facets, best first.
+    def search(self, query: str, k: int = 10, filters=None):
+        scores = np.zeros(self.documents, dtype=np.float64)
+        for term, count in Counter(tokenize(query)).items():
+            found = self.term_postings(term)
+            if found is None:
+                continue
+            docs, frequencies = found
+            idf = math.log(1 + (self.documents - len(docs) + 0.5) / (len(docs) + 0.5))
+            norms = K1 * (1 - B + B * self.lengths[docs] / self.average_length)
+            scores[docs] += count * idf * frequencies * (K1 + 1) / (frequencies + norms)
+
+        mask = self.facet_mask(filters or {})
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+
+        hits = []
+        for doc_num in candidates.tolist():
+            row = self.conn.execute(
+                "SELECT doc_id, source, tipo, numero, anio, entidad, estado FROM docs WHERE doc_num = ?",
+                (doc_num,),
+            ).fetchone()
+            hit = dict(zip(("doc_id", "source", "tipo", "numero", "anio", "entidad", "estado"), row))
+            hit["score"] = round(float(scores[doc_num]), 4)
+            hits.append(hit)
+        return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 search over the cleaned corpus")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Index cleaned TXT directories or corpus shard directories")
+    build.add_argument(
+        "--input", "-i",
+        nargs="+",
+        required=True,
+        help="Directories of cleaned TXT files, or directories of corpus shards (--output-format jsonl/parquet)",
+    )
+    build.add_argument("--index", required=True, help="Directory to write the index to")
+
+    search = commands.add_parser("search", help="Print the top BM25 hits of a query")
+    search.add_argument("query", help="Free-text query")
+    search.add_argument("--index", required=True, help="Directory of an index written by build")
+    search.add_argument("--top", "-k", type=int, default=10, help="Number of hits (default: 10)")
+    search.add_argument("--tipo", help="Only documents of this TIPO (e.g. LEY)")
+    search.add_argument("--anio", help="Only documents of this year")
+    search.add_argument("--entidad", help="Only documents issued by this ENTIDAD")
+    search.add_argument("--estado", help="Only documents in this ESTADO (e.g. Vigente)")
+    search.add_argument("--json", action="store_true", help="Print the hits as JSON")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(args.input, Path(args.index))
+        return 0
+
+    index_dir = Path(args.index)
+    if not (index_dir / CATALOG_NAME).exists():
+        print(f"No index in {index_dir}; run build first")
+        return 1
+
+    index = SearchIndex(index_dir)
+    start = time.perf_counter()
+    hits = index.search(
+        args.query,
+        args.top,
+        {"tipo": args.tipo, "anio": args.anio, "entidad": args.entidad, "estado": args.estado},
+    )
+    elapsed = time.perf_counter() - start
+    index.close()
+
+    if args.json:
+        print(json.dumps(hits, ensure_ascii=False, indent=2))
+        return 0
+    for rank, hit in enumerate(hits, 1):
+        print(f"{rank:>3}. {hit['score']:>8.3f}  {hit['doc_id']}  {hit['tipo']} {hit['numero']} de {hit['anio']}"
+              f"  {hit['entidad']}  {hit['source']}")
+    print(f"{len(hits)} hits in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,356 @@
+import csv
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+
+# Regex parser used to derive the literals a pattern needs
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# Inline flag letters for the re flags a rule may use inside a fused alternation
+INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"))
+
+# Characters that re.IGNORECASE matches differently from str.lower(): texts containing them
+# are never skipped by case-insensitive gates
+UNSAFE_CASEFOLD = ("ı", "ſ", "İ")
+
+ZERO_WIDTH = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+
+
+# Flattens a parsed regex sequence through plain groups, whose contents are always matched.
+def _flatten(items):
+    for op, av in items:
+        if op is sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            yield from _flatten(av[3])
+        else:
+            yield op, av
+
+
+# Literals that every match of a parsed sequence must contain, as alternatives (any of them).
+# Picks the longest contiguous run of literal characters; a top-level alternation whose
+# branches all contain a literal is used instead when its shortest literal is longer.
+def _required_literals(items):
+    best = ""
+    run = ""
+    alternatives = ()
+    for op, av in _flatten(items):
+        if op is sre_parse.LITERAL:
+            run += chr(av)
+            continue
+        if op in ZERO_WIDTH:
+            continue
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            repeated = list(_flatten(av[2]))
+            if len(repeated) == 1 and repeated[0][0] is sre_parse.LITERAL:
+                run += chr(repeated[0][1])
+        elif op is sre_parse.BRANCH:
+            branches = tuple(_required_literals(branch) for branch in av[1])
+            if all(branches) and not alternatives:
+                alternatives = tuple(literal for branch in branches for literal in branch)
+        if len(run) > len(best):
+            best = run
+        run = ""
+
+    if len(run) > len(best):
+        best = run
+    if alternatives and min(map(len, alternatives)) > len(best):
+        return alternatives
+    return (best,) if best else ()
+
+
+# Derives the literals a pattern needs to match; () when no literal is guaranteed.
+def derive_literals(pattern, flags=0):
+    literals = _required_literals(sre_parse.parse(pattern, flags))
+    if flags & re.IGNORECASE:
+        literals = tuple(literal.lower() for literal in literals)
+    return literals
+
+
+# One regex substitution, compiled once. Rules are the unit the pipeline is defined in and
+# the reference semantics: applying every rule in order gives the canonical output.
+# `requires` lists literals of which at least one must be present for the rule to match;
+# by default they are derived from the pattern, () disables gating.
+class Rule:
+
+    def __init__(self, name, pattern, replacement, flags=0, requires=None):
+        self.name = name
+        self.pattern = pattern
+        self.replacement = replacement
+        self.flags = flags
+        self.regex = re.compile(pattern, flags)
+        self.rules = (self,)
+        self.ignorecase = bool(flags & re.IGNORECASE)
+        self.requires = derive_literals(pattern, flags) if requires is None else tuple(requires)
+
+    def apply(self, text: str) -> str:
+        return self.regex.sub(self.replacement, text)
+
+    def apply_count(self, text: str):
+        return self.regex.subn(self.replacement, text)
+
+    # Characters removed and added by the substitutions that turned `before` into `after`
+    def measure(self, before: str, after: str):
+        removed = sum(match.end() - match.start() for match in self.regex.finditer(before))
+        return removed, len(after) - len(before) + removed
+
+
+# A cheaper regex standing in for consecutive rules that give the same result at this
+# point of the pipeline (e.g. not rewriting single spaces with a single space).
+class Rewrite(Rule):
+
+    def __init__(self, name, pattern, replacement, rules, flags=0, requires=None):
+        super().__init__(name, pattern, replacement, flags, requires)
+        self.rules = tuple(rules)
+
+
+# Consecutive rules merged into one alternation pass, with a replacement function that
+# dispatches each match to the first rule matching at that position (the branch the
+# alternation took). Only valid for rules that cannot overlap, cannot match the empty string
+# and whose replacements cannot create or destroy matches of the others.
+# Alternations of plain character classes compile to a single class and keep the regex
+# engine's fast first-character scan; branches led by groups or assertions lose it, so only
+# fuse where it measurably pays.
+# With `recheck`, a text in which the pass leaves a match of the alternation (e.g. a removal
+# joined the two halves of another rule's match, which a later rule would have removed) is
+# redone rule by rule, so that case keeps the rule-by-rule result.
+class FusedRule:
+
+    def __init__(self, name, rules, recheck=False):
+        self.name = name
+        self.rules = tuple(rules)
+        self.recheck = recheck
+
+        branches = []
+        for rule in self.rules:
+            letters = "".join(letter for flag, letter in INLINE_FLAGS if rule.flags & flag)
+            branches.append(f"(?{letters}:{rule.pattern})" if letters else rule.pattern)
+        self.regex = re.compile("|".join(branches))
+
+        # Gated only if every branch is; literals are then checked case-insensitively
+        # when any branch is
+        self.ignorecase = any(rule.ignorecase for rule in self.rules)
+        if all(rule.requires for rule in self.rules):
+            literals = [literal for rule in self.rules for literal in rule.requires]
+            if self.ignorecase:
+                literals = [literal.lower() for literal in literals]
+            self.requires = tuple(dict.fromkeys(literals))
+        else:
+            self.requires = ()
+
+        # Removal-only groups need no dispatch: every branch is replaced by ""
+        self.replacement = "" if all(rule.replacement == "" for rule in self.rules) else self._replace
+
+    def _replace(self, match):
+        text = match.string
+        position = match.start()
+        for rule in self.rules:
+            rule_match = rule.regex.match(text, position)
+            if rule_match:
+                if callable(rule.replacement):
+                    return rule.replacement(rule_match)
+                return rule_match.expand(rule.replacement)
+        return match.group()
+
+    def apply(self, text: str) -> str:
+        return self.apply_count(text)[0]
+
+    def apply_count(self, text: str):
+        result, substitutions = self.regex.subn(self.replacement, text)
+        if substitutions and self.recheck and self.regex.search(result):
+            substitutions = 0
+            for rule in self.rules:
+                text, count = rule.apply_count(text)
+                substitutions += count
+            return text, substitutions
+        return result, substitutions
+
+
+# Literal presence for one version of a text, computed lazily and cached until the text changes.
+class LiteralScan:
+
+    def __init__(self, text: str):
+        self.reset(text)
+
+    def reset(self, text: str):
+        self.text = text
+        self.lowered = None
+        self.casefold_safe = True
+        self.found = {}
+
+    def has_any(self, literals, ignorecase: bool) -> bool:
+        for literal in literals:
+            key = (literal, ignorecase)
+            found = self.found.get(key)
+            if found is None:
+                if ignorecase:
+                    if self.lowered is None:
+                        self.lowered = self.text.lower()
+                        self.casefold_safe = not any(char in self.text for char in UNSAFE_CASEFOLD)
+                    found = not self.casefold_safe or literal in self.lowered
+                else:
+                    found = literal in self.text
+                self.found[key] = found
+            if found:
+                return True
+        return False
+
+
+# Per-step counters accumulated over a run: how many texts skipped the step because its
+# literals were absent, how many ran it, and how many of those it actually changed.
+class RuleStats:
+
+    def __init__(self):
+        self.counters = {}
+
+    def record(self, name, skipped=False, substitutions=0):
+        counter = self.counters.setdefault(name, {"skipped": 0, "applied": 0, "matched": 0})
+        if skipped:
+            counter["skipped"] += 1
+        else:
+            counter["applied"] += 1
+            if substitutions:
+                counter["matched"] += 1
+
+    def merge(self, other):
+        for name, counter in other.counters.items():
+            total = self.counters.setdefault(name, {"skipped": 0, "applied": 0, "matched": 0})
+            for key, value in counter.items():
+                total[key] += value
+
+    def summary(self) -> str:
+        lines = [f"{'Rule':<32} {'Skipped':>9} {'Applied':>9} {'Matched':>9}"]
+        for name, counter in self.counters.items():
+            lines.append(
+                f"{name:<32} {counter['skipped']:>9} {counter['applied']:>9} {counter['matched']:>9}"
+            )
+        return "\n".join(lines)
+
+
+# Opt-in per-rule instrumentation accumulated over a run: wall time, substitutions, characters
+# removed/added and documents changed, for every underlying rule run on its own and ungated.
+class RuleProfile:
+
+    FIELDS = ("rule", "calls", "seconds", "substitutions", "chars_removed", "chars_added", "documents_matched")
+
+    def __init__(self):
+        self.counters = {}
+
+    def _counter(self, name):
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = dict.fromkeys(self.FIELDS[1:], 0)
+        return counter
+
+    def record(self, name, seconds, substitutions=0, removed=0, added=0):
+        counter = self._counter(name)
+        counter["calls"] += 1
+        counter["seconds"] += seconds
+        if substitutions:
+            counter["substitutions"] += substitutions
+            counter["chars_removed"] += removed
+            counter["chars_added"] += added
+            counter["documents_matched"] += 1
+
+    def merge(self, other):
+        for name, counter in other.counters.items():
+            total = self._counter(name)
+            for key, value in counter.items():
+                total[key] += value
+
+    # One row per rule, most expensive first
+    def rows(self):
+        rows = [{"rule": name, **counter} for name, counter in self.counters.items()]
+        rows.sort(key=lambda row: row["seconds"], reverse=True)
+        for row in rows:
+            row["seconds"] = round(row["seconds"], 6)
+        return rows
+
+    # Writes the rows as CSV when the path ends in .csv, as JSON otherwise
+    def write(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        rows = self.rows()
+        if path.suffix.lower() == ".csv":
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"total_seconds": round(sum(row["seconds"] for row in rows), 6), "rules": rows},
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+
+
+# What a step or rule runs, for RulePipeline.fingerprint
+def _definition(item):
+    replacement = item.replacement if isinstance(item.replacement, str) else item.replacement.__name__
+    if isinstance(item, FusedRule):
+        return ("fused", item.name, item.regex.pattern, item.regex.flags, replacement, item.recheck, item.requires)
+    return (type(item).__name__, item.name, item.pattern, replacement, item.flags, item.requires)
+
+
+# Ordered sequence of steps (rules, rewrites and fused passes).
+# apply() runs the compiled steps, skipping those whose required literals are absent;
+# apply_reference() runs the underlying rules one by one, ungated. Given a RuleProfile,
+# apply() runs the reference path and times every rule instead (same output).
+class RulePipeline:
+
+    def __init__(self, steps):
+        self.steps = tuple(steps)
+        self.rules = tuple(rule for step in self.steps for rule in step.rules)
+
+    def apply(self, text: str, stats: RuleStats = None, profile: RuleProfile = None) -> str:
+        if profile is not None:
+            return self.apply_profiled(text, profile)
+
+        scan = LiteralScan(text)
+        for step in self.steps:
+            if step.requires and not scan.has_any(step.requires, step.ignorecase):
+                if stats is not None:
+                    stats.record(step.name, skipped=True)
+                continue
+
+            text, substitutions = step.apply_count(text)
+            if substitutions:
+                scan.reset(text)
+            if stats is not None:
+                stats.record(step.name, substitutions=substitutions)
+        return text
+
+    # Hash of every step as it runs (its own pattern, replacement, flags, literal gate and, for
+    # fused passes, the alternation and recheck) and of every underlying rule definition; changes
+    # whenever a step or rule is added, removed, reordered or edited.
+    def fingerprint(self) -> str:
+        digest = hashlib.sha256()
+        for step in self.steps:
+            digest.update(repr(_definition(step)).encode("utf-8"))
+            for rule in step.rules:
+                digest.update(repr(_definition(rule)).encode("utf-8"))
+        return digest.hexdigest()
+
+    def apply_reference(self, text: str) -> str:
+        for rule in self.rules:
+            text = rule.apply(text)
+        return text
+
+    def apply_profiled(self, text: str, profile: RuleProfile) -> str:
+        for rule in self.rules:
+            start = time.perf_counter()
+            result, substitutions = rule.apply_count(text)
+            elapsed = time.perf_counter() - start
+
+            if substitutions:
+                removed, added = rule.measure(text, result)
+                profile.record(rule.name, elapsed, substitutions, removed, added)
+            else:
+                profile.record(rule.name, elapsed)
+            text = result
+        return text
@@ -0,0 +1,292 @@
+import re
+from Scripts.ProcessPDFs.cleaningPatterns import PATTERNS
+
+
+# normalize_body as it was before it was compiled into rule pipelines (text_normalization
+# BASE_RULES/BODY_RULES), copied verbatim. Tests compare today's pipeline with it, so an error
+# in transcribing a rule shows up as a mismatch. Do not edit; a deliberate change to the
+# normalization output replaces this copy.
+def normalize_body_v1(text: str, apply_body_rules: bool = True) -> str:
+    # Base cleanup used for both metadata and body.
+    text = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]", "", text)
+    text = re.sub(r"[\uFFFD\uFFFE\uFFFF]", "", text)
+    text = re.sub(r"\xa0", " ", text)
+    text = re.sub(r"[\t\r ]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    text = re.sub(r"\n{2,}", "\n", text)
+    text = re.sub(r"\(\s*\)", "", text)
+
+    if not apply_body_rules:
+        return text.strip()
+    # Normalize spaced-out "A R T I C U L O" tokens.
+    text = re.sub(
+        r"\bA\s+R\s+T\s+[ÍI]\s+C\s+U\s+L\s+O\b",
+        "ARTICULO",
+        text,
+        flags=re.IGNORECASE,
+    )
+    text = re.sub(r"\bARTICULO\n(\d+°?)", r"ARTICULO \1", text)
+    text = re.sub(r",\s*\n", ", ", text)
+    # Normalize money formats like 2_50 or 0-04.
+    text = re.sub(r"(\d)[_-](\d{2})\b", r"\1.\2", text)
+    # Join numeric list headings (e.g., 1., 1.1, 1.2) with their content.
+    text = re.sub(
+        r"^\s*(\d+(?:\.\d+)*(?:[\.)])?)\s*\n+",
+        r"\1 ",
+        text,
+        flags=re.MULTILINE,
+    )
+    # Merge punctuation-only and symbol-only lines with surrounding text.
+    text = re.sub(r"([^\n])\n\s*([:;,.])\s*\n(\S)", r"\1\2 \3", text)
+    text = re.sub(r"([^\n])\n\s*([:;,.])", r"\1\2", text)
+    text = re.sub(r"\n\s*\$\s*\n", " $ ", text)
+    text = re.sub(r"\bcon\s*\n\s*\$?\s*", "con $ ", text, flags=re.IGNORECASE)
+    text = re.sub(r"\(\s*\n\s*([A-Za-zÁÉÍÓÚÑáéíóúñ\.]+)\s*\n\s*\)", r"(\1)", text)
+    text = re.sub(r"([A-Za-zÁÉÍÓÚÑáéíóúñ0-9])\s*\n\s*\)", r"\1)", text)
+    # Join split decimal cents across lines (e.g., "0\n02" -> "0.02").
+    text = re.sub(r"(\b\d+)\s*\n\s*(\d{2})\b", r"\1.\2", text)
+    text = re.sub(
+        r"([A-Za-zÁÉÍÓÚÑáéíóúñ]{2,})\s*\n\s*([A-Za-zÁÉÍÓÚÑáéíóúñ])\s*\n\s*([A-Za-zÁÉÍÓÚÑáéíóúñ]{2,})",
+        r"\1\2\3",
+        text,
+    )
+    # Merge ordinal marks that are split to the next line (e.g., "1\n°").
+    text = re.sub(r"(\d+)\s*\n\s*([º°])", r"\1\2", text)
+    # Remove standalone hyphen/quote lines and strip hyphen bullets in headers/signatures.
+    text = re.sub(r"^\s*[-–—]+\s*$", "", text, flags=re.MULTILINE)
+    text = re.sub(r"^\s*\"+\s*$", "", text, flags=re.MULTILINE)
+    text = re.sub(r"^\s*-\s*(?=[A-ZÁÉÍÓÚÑ])", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\s*-\s*(?=(?:El|La|Los|Las)\s)", " ", text)
+    # Separate list items that are on the same line (e.g., "text; b)" -> "text;\nb)")
+    text = re.sub(r"([;.])\s+([a-z]\))", r"\1\n\2", text)
+    # Join roman numerals in parentheses with their content (e.g., "(i)\nText" -> "(i) Text").
+    text = re.sub(
+        r"^\s*\(([ivxlcdm]+)\)\s*\n+",
+        r"(\1) ",
+        text,
+        flags=re.MULTILINE | re.IGNORECASE,
+    )
+    # Join lowercase letters in parentheses with their content (e.g., "a.\nText" or "(a)\nText" -> "a. Text" or "(a) Text").
+    text = re.sub(
+        r"^\s*([a-z])\.\s*\n+",
+        r"\1. ",
+        text,
+        flags=re.MULTILINE,
+    )
+    text = re.sub(
+        r"^\s*([a-z])\)\s*\n+",
+        r"\1) ",
+        text,
+        flags=re.MULTILINE,
+    )
+    # Join number-only lines with the following text line (table-like lists).
+    text = re.sub(
+        r"^\s*(\d+)\s*\n([A-Za-zÁÉÍÓÚÑáéíóúñ])",
+        r"\1 \2",
+        text,
+        flags=re.MULTILINE,
+    )
+    # Join amount-only lines with the previous text line.
+    text = re.sub(
+        r"([A-Za-zÁÉÍÓÚÑáéíóúñ].*)\n\s*(\d{1,3}(?:[\.,]\d{3})*(?:[\., ]\d{2})?)\s*$",
+        r"\1 \2",
+        text,
+        flags=re.MULTILINE,
+    )
+    text = re.sub(
+        r"([^\n])\n\s*(\d{1,3}(?:[\.,]\d{3})*(?:[\., ]\d{2})?)\s*$",
+        r"\1 \2",
+        text,
+        flags=re.MULTILINE,
+    )
+    # If a new "De/Del" item is glued after an amount, break it onto a new line.
+    text = re.sub(
+        r"(\d{1,3}(?:[\.,]\d{3})*(?:[\.,]\d{2})?)\s+(De(?:l|\s+los|\s+las)?\s)",
+        r"\1\n\2",
+        text,
+    )
+    # Remove stray leading/trailing quotes per line.
+    text = re.sub(r"^\s*\"+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\"+\s*$", "", text, flags=re.MULTILINE)
+    # Join dates split across lines (e.g., "Septiembre\n9 de\n1890").
+    text = re.sub(r"([A-Za-zÁÉÍÓÚÑáéíóúñ\.])\s*\n(\d+\s+de\b)", r"\1 \2", text)
+    text = re.sub(r"\bde\s*\n(\d{4})\b", r"de \1", text)
+    # Join lettered list markers (e.g., "b)") to the previous line.
+    text = re.sub(r";\s*\n\s*([a-zA-Z]\))", r"; \1", text)
+    # Join signature titles with names on the next line.
+    text = re.sub(
+        r"(^[^\n]{3,80}[,;:])\s*\n([A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ]+)$",
+        r"\1 \2",
+        text,
+        flags=re.MULTILINE,
+    )
+    text = re.sub(
+        r"(^[^\n]{3,80}\.[ ]?)\s*\n([A-ZÁÉÍÓÚÑ]{2,})$",
+        r"\1 \2",
+        text,
+        flags=re.MULTILINE,
+    )
+    # Join lines where a name continues on a lowercase line.
+    text = re.sub(r"([A-Za-zÁÉÍÓÚÑáéíóúñ,;])\s*\n([a-záéíóúñ])", r"\1 \2", text)
+    # Join all-caps names split across two short lines.
+    text = re.sub(
+        r"^([A-ZÁÉÍÓÚÑ]{2,}(?:\s+[A-ZÁÉÍÓÚÑ]{2,}){0,2})\s*\n([A-ZÁÉÍÓÚÑ]{2,}(?:\s+[A-ZÁÉÍÓÚÑ]{2,}){0,2})$",
+        r"\1 \2",
+        text,
+        flags=re.MULTILINE,
+    )
+    # If a roman numeral line is followed by a single letter and a word, fold the letter into the word.
+    text = re.sub(
+        r"^([IVXLCDM])\s*\n([A-ZÁÉÍÓÚÑ])\s*\n([A-ZÁÉÍÓÚÑ]{2,})",
+        r"\1\n\2\3",
+        text,
+        flags=re.MULTILINE,
+    )
+    # Remove whitespace-only lines before collapsing.
+    text = re.sub(r"^\s+$", "", text, flags=re.MULTILINE)
+    # Re-collapse empty lines introduced by the merges.
+    text = re.sub(r"\n{2,}", "\n", text)
+    # Remove punctuation-only lines that remain after merging.
+    text = re.sub(r"^\s*[:;,.]\s*$", "", text, flags=re.MULTILINE)
+    # Separate decree/resolution keywords from article headers
+    text = re.sub(
+        r"(DECRETA|RESUELVE|ORDENA|DISPONE):\s*(Artículo|ARTICULO|ART[ÍI]CULO)",
+        r"\1:\n\2",
+        text,
+        flags=re.IGNORECASE,
+    )
+    # Join article and paragrafo headers with their content lines.
+    # First, join "Artículo" on one line with the number on the next line
+    text = re.sub(
+        r"^(ART(?:[ÍI]CULO)?)\s*\n+(\d+(?:\s*\.?\s*[º°o])?\.?)",
+        r"\1 \2",
+        text,
+        flags=re.MULTILINE | re.IGNORECASE,
+    )
+    # Then join the complete article header with its content
+    text = re.sub(
+        r"^(ART(?:[ÍI]CULO)?\.?\s+(?:\d+(?:\s*\.?\s*[º°o])?|[IVXLCDM]+|primero|segundo|tercero|cuarto|quinto|sexto|s[eé]ptimo|octavo|noveno|d[eé]cimo|und[eé]cimo|duod[eé]cimo)\.?)(?:\s*\n+)",
+        r"\1 ",
+        text,
+        flags=re.MULTILINE | re.IGNORECASE,
+    )
+    text = re.sub(
+        r"^(PAR[AÁ]GRAFO(?:\s+(?:\d+|primero|segundo|tercero|cuarto|quinto|sexto|s[eé]ptimo|octavo|noveno|d[eé]cimo))?(?:\s*\.?\s*[º°])?\.?\:?)\s*(?:\n+)",
+        r"\1 ",
+        text,
+        flags=re.MULTILINE | re.IGNORECASE,
+    )
+    return text.strip()
+
+
+# DocumentCleaner as it was before PATTERNS were compiled into fused passes (rule_engine
+# pattern_steps) and its helpers moved to module constants: the class up to clean_text, copied
+# verbatim. Tests compare today's cleaner, fused and reference=True, with it. Do not edit.
+class DocumentCleanerV1:
+
+    def __init__(self):
+        # Common patterns to remove
+        self.patterns = PATTERNS
+    
+    # Normalize whitespace: collapse multiple spaces, tabs, and newlines into a single space or newline.
+    def normalize_whitespace(self, text: str) -> str:
+        text = re.sub(r'[ \t]+\n', '\n', text)
+        text = re.sub(r'\n[ \t]+', '\n', text)
+        text = re.sub(r'\n{3,}', '\n\n', text)
+        return text
+    
+    # Remove lines that are too short, except for protected ones (like "I", "V", "X" which might be legal references).
+    def remove_short_lines(self, text: str, min_len: int = 3) -> str:
+        protected = {'I', 'V', 'X', 'L', 'C'}
+        lines = []
+
+        for line in text.split('\n'):
+            stripped = line.strip()
+            if stripped in protected or len(stripped) >= min_len:
+                lines.append(stripped)
+
+        return '\n'.join(lines)
+
+    # Auxiliary function to cut text before the index section, which often contains navigation and UI elements.
+    def cut_before_index(self, text: str) -> str:
+        pattern = r'Í\s*N\s*D\s*I\s*C\s*E\s*\[Mostrar\]'
+        match = re.search(pattern, text, flags=re.IGNORECASE)
+        if match:
+            return text[match.end():]
+        return text
+
+    # Auxiliary function to remove the SUIN-Juriscol disclaimer that appears at the end of documents, which is not relevant for content and can be very long.
+    def remove_suin_disclaimer(self, text: str) -> str:
+        pattern = (
+            r'Los datos publicados en SUIN-Juriscol'
+            r'[\s\S]*?'
+            r'(Ministerio\.?)'
+        )
+        return re.sub(pattern, '', text, flags=re.IGNORECASE)
+
+    # Auxiliary function to protect legal structure elements like article and paragraph numbering from being broken by cleaning steps. This is crucial to maintain the integrity of the legal document's structure.
+    def protect_legal_structure(self, text: str) -> str:
+        # Fix broken article numbering (e.g., "Artículo 1\n." -> "Artículo 1.")
+        text = re.sub(r'(Art[ií]culo\s+\d+[º°]?)\s*\n\s*\.', r'\g<1>.', text, flags=re.IGNORECASE)
+        
+        # Fix cases where the dot is on its own line
+        text = re.sub(r'(Art[ií]culo\s+\d+[º°]?)\s*\n\s*\.\s*\n', r'\g<1>.\n', text, flags=re.IGNORECASE)
+        
+        # Fix broken paragraph with ordinal number (e.g., "Parágrafo\n1º" -> "Parágrafo 1º")
+        text = re.sub(
+            r'(Par[áa]grafo)\s*\n\s*(\d+[º°]?|Primero|Segundo|Tercero|Cuarto|Quinto|Sexto|S[ée]ptimo|Octavo|Noveno|D[ée]cimo|transitorio\s+\d+[º°]?)',
+            r'\g<1> \g<2>',
+            text,
+            flags=re.IGNORECASE
+        )
+        
+        # Fix paragraph with ordinal and dot on separate line (e.g., "Parágrafo 1º\n." -> "Parágrafo 1º.")
+        text = re.sub(
+            r'(Par[áa]grafo\s+(?:\d+[º°]?|Primero|Segundo|Tercero|Cuarto|Quinto|Sexto|S[ée]ptimo|Octavo|Noveno|D[ée]cimo|transitorio\s+\d+[º°]?))\s*\n\s*\.',
+            r'\g<1>.',
+            text,
+            flags=re.IGNORECASE
+        )
+        
+        # Fix cases where the dot is on its own line for paragraphs
+        text = re.sub(
+            r'(Par[áa]grafo\s+(?:\d+[º°]?|Primero|Segundo|Tercero|Cuarto|Quinto|Sexto|S[ée]ptimo|Octavo|Noveno|D[ée]cimo|transitorio\s+\d+[º°]?))\s*\n\s*\.\s*\n',
+            r'\g<1>.\n',
+            text,
+            flags=re.IGNORECASE
+        )
+        
+        # Add newlines before articles, chapters, paragraphs, and "DECRETA:" to ensure they are recognized as separate sections. This helps maintain the logical structure of the document and improves readability.
+        patterns = {
+            r'^\s*Art[ií]culo\s+\d+[º°]?\.?': r'\n\n\g<0>\n',
+            r'^\s*Cap[ií]tulo\s+[IVXLC]+': r'\n\n\g<0>\n',
+            r'^\s*Par[áa]grafo(\s+(?:\d+[º°]?|Primero|Segundo|Tercero|Cuarto|Quinto|Sexto|S[ée]ptimo|Octavo|Noveno|D[ée]cimo|transitorio\s+\d+[º°]?))?\.?': r'\n\g<0>\n',
+            r'^\s*DECRETA:': r'\n\nDECRETA:\n'
+        }
+
+        for p, rpl in patterns.items():
+            text = re.sub(p, rpl, text, flags=re.IGNORECASE)
+
+        return text
+    
+    # Main function to clean text by applying all cleaning steps in a logical order. This function ensures that the document is cleaned while preserving the essential legal structure and content, making it suitable for use in RAG systems.
+    def clean_text(self, text: str) -> str:
+        
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        text = self.cut_before_index(text)
+        text = self.remove_suin_disclaimer(text)
+        text = self.protect_legal_structure(text)
+        
+        for _, patterns in self.patterns.items():
+            for pattern in patterns:
+                text = re.sub(
+                    pattern,
+                    '',
+                    text,
+                    flags=re.IGNORECASE | re.MULTILINE
+                )
+
+        text = self.normalize_whitespace(text)
+        text = self.remove_short_lines(text)
+
+        return text.strip()
@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+import pytest
+
+# The scripts import each other the way they are run: ProcessHTMLs modules as siblings,
+# CleanlinessMetrics/TextRules from Scripts/, and processPDFs as Scripts.ProcessPDFs; the
+# benchmark corpus generator gives extra synthetic pages
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / "Scripts", ROOT / "Scripts" / "ProcessHTMLs", ROOT / "Scripts" / "Benchmarks"):
+    sys.path.insert(0, str(path))
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+# Checked-in SUIN-like HTML pages: (doc_id, html)
+@pytest.fixture(scope="session")
+def html_samples():
+    return [(path.stem, path.read_text(encoding="utf-8")) for path in sorted((DATA_DIR / "html").glob("*.html"))]
+
+
+# Raw body of every sample page, as extract_with_soup hands it to normalize_body
+@pytest.fixture(scope="session")
+def raw_bodies(html_samples):
+    from preprocessHTMLs import extract_with_soup
+    return [extract_with_soup(html)[1] for _, html in html_samples]
+
+
+# Text extracted by pdfium from checked-in gazette PDFs (pages joined by a blank line, \r\n kept)
+@pytest.fixture(scope="session")
+def pdf_texts():
+    texts = []
+    for path in sorted((DATA_DIR / "pdf_text").glob("*.txt")):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            texts.append((path.stem, f.read()))
+    return texts
@@ -0,0 +1,8 @@
+from preprocessHTMLs import extract_with_soup
+from synthetic_corpus import generate_html
+
+
+# Raw bodies of `count` pages of the benchmark generator (Scripts/Benchmarks), for coverage
+# beyond the checked-in sample; the same seeds give the same pages
+def synthetic_bodies(count: int, articles: int = 25):
+    return [extract_with_soup(generate_html(seed, articles))[1] for seed in range(count)]
@@ -0,0 +1,94 @@
+import random
+import pytest
+from Scripts.ProcessPDFs.processPDFs import DocumentCleaner
+from baseline_reference import DocumentCleanerV1
+
+# Removing a phrase can join the halves of another one: the patterns applied one by one remove
+# it only when it comes later in its category, so the fused pass has to notice and redo the
+# group. The other cases cover the anchored ".*" patterns, line-anchored patterns, patterns of
+# different categories on the same line and the index/disclaimer cuts.
+EDGE_CASES = [
+    "",
+    "Descargar eCompartir este documenton Word\nLectura Compartir este documentode voz\n",
+    "Ir al portal SUIN-JuriscolAyúdanos a mejorar Ir al portal SUIN-Juriscol\r\nResponder Encuesta",
+    "Texto antes\nCurso SUIN-Juriscol\nOtro Curso caracteristicas del curso\n  Curso Calidad Normativa  \nfin de constitucionalidad y nulidad\n",
+    "Inscripciones abiertas hasta el 5/10\nPÁGINA 3 DE 10 y Página 4 de 10\n12\n---\n© Derechos\nconfidential draft\n",
+    "Ver https://www.suin-juriscol.gov.co/x y www.ejemplo.com\nDIARIO OFICIAL. AÑO CXL No. 45.123 PAG. 7\n",
+    "12/05/2020, 10:30 a. m. Consulta\n3/7\nE S T A D O D E V I G E N C I A: Vigente\n",
+    "Menú\nÍ N D I C E [Mostrar]\nArtículo 1\n.\nTexto del artículo.\nParágrafo\n1º\n.\nTexto.\n",
+    "DECRETA:\nLos datos publicados en SUIN-Juriscol son de carácter informativo del Ministerio.\nArtículo 2. Texto.",
+    "R E S U M E N D E M O D I F I C A C I O N E S [Mostrar]\nJURISPRUDENCIA[Mostrar]\nL E G I S L A C I Ó N A N T E R I O R [Mostrar]",
+    "El Presidente del Honorable Senado\nEl Secretario General del Honorable Senado\nI\nV\nab\n",
+]
+
+LINES = [
+    "ARTÍCULO 5o. El presente decreto rige a partir de su publicación.",
+    "Artículo 12\n.",
+    "Parágrafo\nPrimero\n.",
+    "Capítulo IV",
+    "DECRETA:",
+    "Página 2 de 9",
+    "PAG. 14",
+    "DIARIO OFICIAL. Edición 45.000",
+    "Edición de 24 páginas",
+    "https://www.suin-juriscol.gov.co/viewDocument.asp?id=1",
+    "14/03/2021, 09:15 Norma",
+    "7",
+    "____",
+    "Curso SUIN-Juriscol",
+    "Guardar en PDF o imprimir la norma",
+    "Descargar en Word",
+    "Compartir este documento",
+    "[Mostrar]",
+    "I",
+    "xy",
+]
+
+
+# Texts mixing legal lines, pattern phrases and fragments of them, with \r\n or \n line ends
+def synthetic_texts(count):
+    rng = random.Random(19)
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(5, 40)):
+            line = rng.choice(LINES)
+            if rng.random() < 0.2:
+                cut = rng.randrange(len(line) + 1)
+                line = line[:cut] + rng.choice(LINES) + line[cut:]
+            parts.append(line)
+        texts.append(rng.choice(["\n", "\r\n"]).join(parts))
+    return texts
+
+
+@pytest.fixture(scope="module")
+def cleaners():
+    return DocumentCleaner(), DocumentCleanerV1()
+
+
+def assert_same_as_v1(cleaners, text):
+    cleaner, v1 = cleaners
+    expected = v1.clean_text(text)
+    assert cleaner.clean_text(text) == expected
+    assert cleaner.clean_text(text, reference=True) == expected
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_same_as_v1_on_edge_cases(cleaners, text):
+    assert_same_as_v1(cleaners, text)
+
+
+def test_same_as_v1_on_pdf_text(cleaners, pdf_texts):
+    for _, text in pdf_texts:
+        assert_same_as_v1(cleaners, text)
+
+
+def test_same_as_v1_on_synthetic_text(cleaners):
+    for text in synthetic_texts(200):
+        assert_same_as_v1(cleaners, text)
+
+
+# The sample HTML bodies carry SUIN navigation text the PDF patterns are written for
+def test_same_as_v1_on_page_bodies(cleaners, raw_bodies):
+    for body in raw_bodies:
+        assert_same_as_v1(cleaners, body)
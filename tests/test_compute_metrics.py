@@ -0,0 +1,60 @@
+import pytest
+from CleanlinessMetrics.compute_metrics import (
+    compute_quality_score,
+    compute_quality_score_reference,
+    compute_ratios,
+    fragmented_words_ratio,
+    header_integrity_ratio,
+    short_lines_ratio,
+)
+from synthetic_pages import synthetic_bodies
+from text_normalization import normalize_body
+
+# Texts around what the single scan counts differently from the V1 regexes: empty and blank
+# texts, fragments of every length next to longer words and digits, headers split across lines
+# or starting inside another header, short lines with surrounding spaces, and other whitespace
+EDGE_CASES = [
+    "",
+    "\n\n  \n",
+    "a b c",
+    "a b",
+    "x y z w v palabra a b c d\ne f g",
+    "A R T I C U L O 5. Texto\nP A R Á G R A F O",
+    "ab c d e fg\n1 2 3\né ñ ü",
+    "ARTÍCULO\n5. Texto partido\nART. 6 Texto\nARTICULO 7 1. numeral\nCAPÍTULO IV\nPARÁGRAFO\n",
+    "a) literal\n(ii) romano\n1.1. numeral\nINCISO a\nNUMERAL 3\nTRANSITORIOS\nDISPOSICIÓN GENERAL\n",
+    "  ab  \n\tcd\t\nxyz\n a \nlínea larga de texto\r\nfin\r\n",
+    "a\tb\tc\x0bd e f g",
+]
+
+
+def assert_same_ratios(text):
+    assert compute_ratios(text) == (
+        short_lines_ratio(text),
+        fragmented_words_ratio(text),
+        header_integrity_ratio(text),
+    )
+    assert compute_quality_score(text) == compute_quality_score_reference(text)
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_same_as_v1_on_edge_cases(text):
+    assert_same_ratios(text)
+
+
+# Cleaned bodies (what the pipeline scores) and raw ones (far more fragments and short lines)
+def test_same_as_v1_on_sample_pages(raw_bodies):
+    for body in raw_bodies:
+        assert_same_ratios(normalize_body(body))
+        assert_same_ratios(body)
+
+
+def test_same_as_v1_on_synthetic_pages():
+    for body in synthetic_bodies(20):
+        assert_same_ratios(normalize_body(body))
+        assert_same_ratios(body)
+
+
+def test_same_as_v1_on_pdf_text(pdf_texts):
+    for _, text in pdf_texts:
+        assert_same_ratios(text)
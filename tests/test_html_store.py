@@ -0,0 +1,55 @@
+import threading
+from html_store import DirectoryStore, ShardStore, open_html_store
+
+
+def pages(count):
+    return {f"{i}": f"<html><body>Documento {i % 7} " + "texto " * (i % 7 * 50) + "</body></html>" for i in range(count)}
+
+
+def test_concurrent_puts_store_each_page_once(tmp_path):
+    store = ShardStore(tmp_path, shard_size=4096)
+    docs = pages(200)
+    items = list(docs.items())
+
+    def put(chunk):
+        for doc_id, html in chunk:
+            store.put(doc_id, html)
+
+    threads = [threading.Thread(target=put, args=(items[i::8],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.count() == len(docs)
+    assert dict(store.iter_documents()) == docs
+    blobs = store.conn.execute("SELECT COUNT(*), SUM(length) FROM blobs").fetchone()
+    assert blobs[0] == len(set(docs.values()))
+    assert blobs[1] == sum(path.stat().st_size for path in tmp_path.glob("shard-*"))
+    store.close()
+
+
+def test_compression_runs_outside_the_lock(tmp_path):
+    store = ShardStore(tmp_path)
+    held = []
+    compress = store.compress
+    store.compress = lambda data: held.append(store.lock.locked()) or compress(data)
+
+    store.put("1", "<html>uno</html>")
+    store.put("2", "<html>uno</html>")
+    store.put("3", "<html>tres</html>")
+
+    assert held == [False, False]
+    assert store.get("2") == "<html>uno</html>"
+    store.close()
+
+
+def test_open_html_store(tmp_path):
+    assert isinstance(open_html_store(tmp_path), DirectoryStore)
+    shards = open_html_store(tmp_path, storage="shards")
+    assert isinstance(shards, ShardStore)
+    shards.close()
+    # An existing archive is reopened whatever storage is asked for
+    reopened = open_html_store(tmp_path)
+    assert isinstance(reopened, ShardStore)
+    reopened.close()
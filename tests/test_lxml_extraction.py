@@ -0,0 +1,40 @@
+import pytest
+from lxml_extraction import extract_with_lxml
+from preprocessHTMLs import extract_document, extract_with_soup
+from synthetic_corpus import generate_html
+
+# Small well-formed pages around what the pruning rules handle: metadata spans inside a hidden
+# block, hidden and TOC subtrees, boilerplate tags, entities, <br/> and inline markup
+EDGE_CASES = [
+    "<html><body><div style='display:none'><span field='tipo'>LEY</span><span field='numero'>100</span>"
+    "<p>oculto</p></div><p>ARTÍCULO 1. Texto &amp; m&aacute;s<br/>segunda l&iacute;nea</p></body></html>",
+    "<html><head><title>t</title><script>var a = '<p>x</p>';</script></head><body><nav>menú</nav>"
+    "<div id='toc'><table><tr><td>Artículo 1</td></tr></table></div><p>Cuerpo <b>en</b> <i>negrita</i></p>"
+    "<footer>pie</footer></body></html>",
+    "<html><body><div class='slider main'><p>curso</p></div><span class='toctoggle'>[Mostrar]</span>"
+    "<p style='VISIBILITY: hidden'>oculto</p><table><tr><td>ARTÍCULO 2.</td><td>Texto</td></tr></table>"
+    "<span field='subtipo'>LEY ORDINARIA</span>final</body></html>",
+    "<p>Sin html ni body</p><p>ARTICULO 3 Texto.</p>",
+]
+
+
+def test_same_extraction_on_sample_pages(html_samples):
+    for _, html in html_samples:
+        assert extract_with_lxml(html) == extract_with_soup(html)
+
+
+def test_same_extraction_on_synthetic_pages():
+    for seed in range(20):
+        html = generate_html(seed, 25)
+        assert extract_with_lxml(html) == extract_with_soup(html)
+
+
+@pytest.mark.parametrize("html", EDGE_CASES)
+def test_same_extraction_on_edge_cases(html):
+    assert extract_with_lxml(html) == extract_with_soup(html)
+
+
+# Header fields, cleaned body and metrics: what ends up in the TXT output
+def test_same_document_on_sample_pages(html_samples):
+    for _, html in html_samples:
+        assert extract_document(html, parser="lxml") == extract_document(html, parser="html.parser")
@@ -0,0 +1,69 @@
+import json
+import numpy as np
+import pytest
+from html_store import ShardStore
+from near_duplicates import DUPLICATE_REPORT_NAME, LSH_RECALL, candidate_probability, doc_order, lsh_parameters
+from preprocessHTMLs import process_directory
+
+THRESHOLDS = [0.5, 0.7, 0.8, 0.85, 0.9, 0.95]
+
+
+@pytest.mark.parametrize("threshold", THRESHOLDS)
+def test_pairs_at_the_threshold_become_candidates(threshold):
+    bands, rows = lsh_parameters(128, threshold)
+    assert bands * rows <= 128
+    assert candidate_probability(threshold, bands, rows) >= LSH_RECALL
+    assert (1 / bands) ** (1 / rows) < threshold
+
+
+# Signature pairs agreeing on exactly `threshold` of their positions, at random positions
+@pytest.mark.parametrize("threshold", [0.8, 0.9])
+def test_simulated_recall_at_the_threshold(threshold):
+    bands, rows = lsh_parameters(128, threshold)
+    rng = np.random.RandomState(23)
+    trials = 4000
+    hits = 0
+    for _ in range(trials):
+        equal = np.zeros(128, dtype=bool)
+        equal[rng.choice(128, int(round(threshold * 128)), replace=False)] = True
+        banded = equal[:bands * rows].reshape(bands, rows)
+        hits += bool(banded.all(axis=1).any())
+    assert hits / trials >= LSH_RECALL - 0.02
+
+
+def test_doc_order():
+    assert sorted(["91000", "b", "1000", "91", "a10"], key=doc_order) == ["91", "1000", "91000", "a10", "b"]
+
+
+# Each sample page under a high id, and a near copy (one word changed) under a lower one
+def near_duplicate_pages(html_samples):
+    pages = []
+    for index, (stem, html) in enumerate(html_samples):
+        pages.append((f"9{stem}", html))
+        pages.append((f"{index + 1}{stem}", html.replace(" de ", " del ", 1)))
+    return pages
+
+
+def dedup_report(tmp_path, name, pages):
+    input_dir = tmp_path / name / "html"
+    store = ShardStore(input_dir)
+    for doc_id, html in pages:
+        store.put(doc_id, html)
+    store.close()
+    output_dir = tmp_path / name / "dataCleaned" / "Laws"
+    process_directory(input_dir, output_dir, dedup=True)
+    with open(output_dir / DUPLICATE_REPORT_NAME, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# The shard archive lists pages in the order they were stored; the clusters must not follow it
+def test_clusters_do_not_depend_on_input_order(tmp_path, html_samples):
+    pages = near_duplicate_pages(html_samples)
+    forward = dedup_report(tmp_path, "forward", pages)
+    backward = dedup_report(tmp_path, "backward", pages[::-1])
+
+    assert forward == backward
+    assert forward["duplicates"] == len(html_samples)
+    for cluster in forward["clusters"]:
+        ids = [cluster["canonical"]] + [duplicate["doc_id"] for duplicate in cluster["duplicates"]]
+        assert cluster["canonical"] == min(ids, key=doc_order)
@@ -0,0 +1,100 @@
+import gzip
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from sitemap_stream import iter_sitemap_elements, iter_sitemap_entries
+
+
+def urlset(*locs):
+    entries = "".join(f"<url><loc>{loc}</loc><lastmod>2024-01-0{i + 1}</lastmod></url>" for i, loc in enumerate(locs))
+    return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'.encode()
+
+
+def sitemapindex(*locs):
+    entries = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'.encode()
+
+
+# Serves the sitemaps in `routes` (path -> (body, headers)); paths in `cut_short` answer their
+# first request with half of the promised body and close the connection
+@pytest.fixture
+def server():
+    routes = {}
+    cut_short = set()
+    hits = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            hits[self.path] = hits.get(self.path, 0) + 1
+            if self.path not in routes:
+                self.send_response(404)
+                self.end_headers()
+                return
+            body, headers = routes[self.path]
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.path in cut_short and hits[self.path] == 1:
+                self.wfile.write(body[:len(body) // 2])
+                self.close_connection = True
+                return
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield base, routes, cut_short, hits
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def entries(url):
+    with requests.Session() as session:
+        return list(iter_sitemap_entries(session, url, headers={}, timeout=5))
+
+
+def test_gzip_is_detected_by_magic_bytes():
+    body = urlset("https://a/1", "https://a/2")
+    plain = list(iter_sitemap_elements(io.BytesIO(body)))
+    assert list(iter_sitemap_elements(io.BytesIO(gzip.compress(body)))) == plain
+    assert plain == [("url", "https://a/1", "2024-01-01"), ("url", "https://a/2", "2024-01-02")]
+
+
+def test_index_with_gzip_children_served_any_way(server):
+    base, routes, _, _ = server
+    body = urlset(f"{base}/doc?id=1", f"{base}/doc?id=2")
+    routes["/index.xml"] = (sitemapindex(f"{base}/gz", f"{base}/plain.xml.gz", f"{base}/encoded"), {})
+    # gzip file without a .gz suffix, a ".gz" that is plain XML, and Content-Encoding: gzip
+    routes["/gz"] = (gzip.compress(urlset(f"{base}/doc?id=1")), {"Content-Type": "application/octet-stream"})
+    routes["/plain.xml.gz"] = (urlset(f"{base}/doc?id=2", f"{base}/doc?id=1"), {})
+    routes["/encoded"] = (gzip.compress(body.replace(b"id=2", b"id=3")), {"Content-Encoding": "gzip"})
+
+    assert [url for url, _ in entries(f"{base}/index.xml")] == [
+        f"{base}/doc?id=1", f"{base}/doc?id=2", f"{base}/doc?id=3",
+    ]
+
+
+def test_download_cut_short_is_retried(server):
+    base, routes, cut_short, hits = server
+    routes["/sitemap.xml"] = (urlset(*(f"{base}/doc?id={i}" for i in range(200))), {})
+    cut_short.add("/sitemap.xml")
+
+    assert len(entries(f"{base}/sitemap.xml")) == 200
+    assert hits["/sitemap.xml"] == 2
+
+
+def test_missing_child_is_skipped_but_missing_root_raises(server):
+    base, routes, _, _ = server
+    routes["/index.xml"] = (sitemapindex(f"{base}/missing.xml", f"{base}/ok.xml"), {})
+    routes["/ok.xml"] = (urlset(f"{base}/doc?id=1"), {})
+
+    assert [url for url, _ in entries(f"{base}/index.xml")] == [f"{base}/doc?id=1"]
+    with pytest.raises(requests.HTTPError):
+        entries(f"{base}/missing.xml")
@@ -0,0 +1,69 @@
+import pytest
+from baseline_reference import normalize_body_v1
+from synthetic_pages import synthetic_bodies
+from text_normalization import iter_body_chunks, normalize_body, normalize_body_chunked
+
+# One line per family of rules: control characters and spacing, spaced-out and split article
+# headers, money and decimals, list markers, dates, signatures, split words and quotes
+EDGE_CASES = [
+    "Texto\x00con\x07control\xa0y\ufffd espacios\t\r  raros ( )\n\n\nfin",
+    "A R T I C U L O\n5°\nEl presente decreto rige.\nARTICULO\n12\nTexto.",
+    "Art.\n3o.\nTexto del artículo.\nPARÁGRAFO 1°.\nTexto del parágrafo.\nPARÁGRAFO\ntransitorio.",
+    "DECRETA: Artículo 1. Texto.\nRESUELVE:ARTICULO 2 Texto.",
+    "Valor de 2_50 y 0-04 pesos.\ncon\n$\n1.250.000\nTotal\n0\n02\n1\n°",
+    "1.\nPrimer numeral.\n1.1\nSubnumeral.\n(ii)\nRomano.\na.\nLiteral.\nb)\nOtro; c) tercero.",
+    "Texto,\nsigue aquí\n:\nDespués\n.\nfin\n;\nb) literal\n(\nver\n)\npal\na\nbra",
+    "Bogotá, Septiembre\n9 de\n1890\nEl Ministro de Hacienda,\nCARLOS\nPÉREZ\n- El Presidente\n\"\n\"cita\"",
+    "I\nN\nDICE\n-\n—\n \n;\nTabla\n25\nConcepto\n1.000,50\nDel total\n1.000 De los",
+]
+
+
+def test_matches_baseline_on_sample_pages(raw_bodies):
+    for body in raw_bodies:
+        assert normalize_body(body) == normalize_body_v1(body)
+
+
+def test_matches_baseline_without_body_rules(raw_bodies):
+    for body in raw_bodies:
+        assert normalize_body(body, apply_body_rules=False) == normalize_body_v1(body, apply_body_rules=False)
+
+
+def test_matches_baseline_on_synthetic_pages():
+    for body in synthetic_bodies(20):
+        assert normalize_body(body) == normalize_body_v1(body)
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_matches_baseline_on_edge_cases(text):
+    assert normalize_body(text) == normalize_body_v1(text)
+    assert normalize_body(text, apply_body_rules=False) == normalize_body_v1(text, apply_body_rules=False)
+
+
+# Chunks only end before an article header that follows a plain sentence line, so the short
+# sample pages split a few times and the synthetic ones several times below 8192
+CHUNK_SIZES = [64, 256, 1024, 8192]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_chunked_matches_whole_document(raw_bodies, chunk_size):
+    for body in raw_bodies:
+        assert normalize_body_chunked(body, chunk_size) == normalize_body(body)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_chunked_matches_whole_document_on_synthetic_pages(chunk_size):
+    for body in synthetic_bodies(20):
+        assert normalize_body_chunked(body, chunk_size) == normalize_body(body)
+
+
+# A long code as one body: the sample pages one after another
+def test_chunked_matches_whole_document_on_long_body(raw_bodies):
+    body = "\n".join(raw_bodies * 4)
+    assert sum(1 for _ in iter_body_chunks(body, 4096)) > 1
+    assert normalize_body_chunked(body, 4096) == normalize_body(body)
+
+
+# The comparisons above must actually cover chunked bodies
+def test_bodies_are_split_into_chunks(raw_bodies):
+    assert any(sum(1 for _ in iter_body_chunks(body, 256)) > 1 for body in raw_bodies)
+    assert all(sum(1 for _ in iter_body_chunks(body, 1024)) > 1 for body in synthetic_bodies(20))